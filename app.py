@@ -1,423 +1,113 @@
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, g, request, jsonify, send_file, render_template, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest
+import io
 import json
 import os
-from datetime import datetime, timedelta
-import random
-from fpdf import FPDF
+import time
+
+from app.engine.exports import JSON_EXPORT_VERSION, PDF_LAYOUTS, PDF_VERSION, export_plan_json, generate_pdf
+from app.engine.formats import SPARSE_FORMAT
+from app.engine.payloads import PAYLOAD_FORMATS, format_payload
+from app.engine.planner import PlanEngine
+from app.utils.artifact_cache import artifact_cache, artifact_key, etag_for, etag_matches
+from app.utils.candidate_pool import candidate_pool_cache
+from app.utils.catalog import get_catalog
+from app.utils.compression import COMPRESSION_MIN_SIZE, choose_encoding, compress, compressible
+from app.utils.export_jobs import QueueFull, export_jobs
+from app.utils.lru import LRUCache
+from app.utils.metrics import CONTENT_TYPE, observe_request, render_metrics, stage_timer
+from app.utils.plan_store import MAX_PLAN_LIST_SIZE, plan_store
+from app.utils.profiling import (
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    PROFILE_QUERY_PARAM,
+    PROFILE_REPORT_PATH,
+    RequestProfile,
+    profile_store,
+    profiling_enabled,
+    token_matches,
+)
+from app.utils.serialization import encode_json
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Load exercise data
-def load_exercises():
-    """Load exercises from JSON file."""
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        print(f"Current directory: {current_dir}")  # Debug log
-        
-        # Try all possible paths
-        possible_paths = [
-            os.path.join(current_dir, "app", "data", "exercises.json"),
-            os.path.join(current_dir, "data", "exercises.json"),
-            os.path.join("app", "data", "exercises.json"),
-            os.path.join("data", "exercises.json"),
-            "exercises.json"
-        ]
-        
-        for path in possible_paths:
-            print(f"Trying path: {path}")  # Debug log
-            if os.path.exists(path):
-                print(f"Found exercises file at: {path}")  # Debug log
-                with open(path, 'r') as f:
-                    exercises = json.load(f)
-                    print(f"Loaded {len(exercises)} exercises")  # Debug log
-                    return exercises
-        
-        raise FileNotFoundError(f"Could not find exercises.json in any of these locations: {', '.join(possible_paths)}")
-    except Exception as e:
-        print(f"Error loading exercises: {str(e)}")  # Debug log
-        raise
-
-# Filter exercises based on equipment, type, level, and muscle group
-def filter_exercises(exercises, equipment, exercise_type=None, level=None, muscle_group=None):
-    """Filter exercises based on equipment, type, level, and muscle group."""
-      # Filter exercises that match any equipment in the list or have no equipment requirement
-    filtered = [ex for ex in exercises if ex["equipment"] in equipment or ex["equipment"] == "bodyweight" or ex["equipment"] == "none"]
-    
-    # If type is specified, filter by type
-    if exercise_type:
-        filtered = [ex for ex in filtered if ex["type"] == exercise_type]
-    
-    # If level is specified, filter by level
-    if level:
-        # For "intermediate" users, include beginner exercises too
-        if level == "intermediate":
-            filtered = [ex for ex in filtered if ex["level"] in ["beginner", "intermediate"]]
-        # For "advanced" users, include all levels
-        elif level == "advanced":
-            pass  # Keep all exercises
-        # For "beginner" users, only include beginner exercises
-        else:
-            filtered = [ex for ex in filtered if ex["level"] == "beginner"]
-    
-    # If muscle group is specified, filter by muscle group
-    if muscle_group:
-        filtered = [ex for ex in filtered if ex["muscle_group"] == muscle_group]
-    
-    return filtered
+# Equipment that every user is assumed to have
+FREE_EQUIPMENT = ("bodyweight", "none")
 
-# Create exercise object with progressive overload
-def create_exercise_object(exercise_data, session_number=1, week_number=1):
-    """Create an exercise object with progressive overload based on session and week number."""
-    exercise_obj = {}
-    
-    # Copy the name
-    exercise_obj["name"] = exercise_data["name"]
-    
-    # If exercise has sets and reps, include them
-    if "sets" in exercise_data:
-        # Apply progressive overload: increase sets by 1 in week 3 and 4
-        sets = exercise_data["sets"]
-        if week_number >= 3:
-            sets += 1
-        exercise_obj["sets"] = sets
-    
-    if "reps" in exercise_data:
-        # Apply progressive overload: increase reps by 2 every week
-        if isinstance(exercise_data["reps"], int):
-            reps = exercise_data["reps"] + (week_number - 1) * 2
-            exercise_obj["reps"] = reps
-        else:
-            exercise_obj["reps"] = exercise_data["reps"]
-    
-    # If exercise has duration, include it
-    if "duration" in exercise_data:
-        exercise_obj["duration"] = exercise_data["duration"]
-    
-    # Add rest time for main exercises
-    if exercise_data["type"] == "main":
-        exercise_obj["rest"] = "60s"
-        
-        # For intermediate and advanced, add tempo
-        if exercise_data["level"] in ["intermediate", "advanced"]:
-            exercise_obj["tempo"] = "2-1-1"
-    
-    return exercise_obj
+# Largest number of profiles accepted by the batch endpoint
+MAX_BATCH_SIZE = int(os.environ.get("WORKOUT_MAX_BATCH_SIZE", 1000))
 
-# Select push exercises (chest, shoulders, and triceps)
-def select_push_exercises(exercises, equipment, level, count=3):
-    """Select push exercises (chest, shoulders, and triceps)."""
-    chest_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="chest")
-    shoulder_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="shoulders")
-    
-    # Try to select a balanced mix
-    selected = []
-    if chest_exercises:
-        selected.extend(random.sample(chest_exercises, min(2, len(chest_exercises))))
-    if shoulder_exercises:
-        selected.extend(random.sample(shoulder_exercises, min(1, len(shoulder_exercises))))
-    
-    # If we don't have enough, add more from any group
-    all_push = chest_exercises + shoulder_exercises
-    remaining = count - len(selected)
-    if remaining > 0 and all_push:
-        # Make sure we don't select duplicates
-        remaining_options = [ex for ex in all_push if ex not in selected]
-        if remaining_options:
-            selected.extend(random.sample(remaining_options, min(remaining, len(remaining_options))))
-    
-    return selected
+# Streamed batches are generated lazily, so they may be much larger
+MAX_STREAM_BATCH_SIZE = int(os.environ.get("WORKOUT_MAX_STREAM_BATCH_SIZE", 100000))
 
-# Select pull exercises (back and biceps)
-def select_pull_exercises(exercises, equipment, level, count=3):
-    """Select pull exercises (back and biceps)."""
-    back_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="back")
-    arm_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="arms")
-    
-    # Try to select a balanced mix
-    selected = []
-    if back_exercises:
-        selected.extend(random.sample(back_exercises, min(2, len(back_exercises))))
-    if arm_exercises:
-        selected.extend(random.sample(arm_exercises, min(1, len(arm_exercises))))
-    
-    # If we don't have enough, add more from any group
-    all_pull = back_exercises + arm_exercises
-    remaining = count - len(selected)
-    if remaining > 0 and all_pull:
-        # Make sure we don't select duplicates
-        remaining_options = [ex for ex in all_pull if ex not in selected]
-        if remaining_options:
-            selected.extend(random.sample(remaining_options, min(remaining, len(remaining_options))))
-    
-    return selected
+# Recently generated plans by plan ID
+plan_cache = LRUCache(maxsize=int(os.environ.get("WORKOUT_PLAN_CACHE_SIZE", 256)))
 
-# Select leg exercises
-def select_leg_exercises(exercises, equipment, level, count=3):
-    """Select leg exercises."""
-    leg_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="legs")
-    
-    selected = []
-    if leg_exercises:
-        selected.extend(random.sample(leg_exercises, min(count, len(leg_exercises))))
-    
-    return selected
+# Parse the exercise catalog once at startup
+get_catalog()
 
-# Select core exercises
-def select_core_exercises(exercises, equipment, level, count=2):
-    """Select core exercises."""
-    core_exercises = filter_exercises(exercises, equipment, exercise_type="main", level=level, muscle_group="core")
-    
-    selected = []
-    if core_exercises:
-        selected.extend(random.sample(core_exercises, min(count, len(core_exercises))))
-    
-    return selected
+# The Flask app serves sparse plans (only the fields each exercise uses)
+engine = PlanEngine(SPARSE_FORMAT, plan_cache, FREE_EQUIPMENT, store=plan_store)
 
-# Select warmup exercises
-def select_warmup_exercises(exercises, equipment, count=3):
-    """Select warmup exercises."""
-    warmup_exercises = filter_exercises(exercises, equipment, exercise_type="warmup")
-    
-    selected = []
-    if warmup_exercises:
-        selected.extend(random.sample(warmup_exercises, min(count, len(warmup_exercises))))
-    
-    return selected
+# Request metrics
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-# Select cooldown exercises
-def select_cooldown_exercises(exercises, equipment, count=3):
-    """Select cooldown exercises."""
-    cooldown_exercises = filter_exercises(exercises, equipment, exercise_type="cooldown")
-    
-    selected = []
-    if cooldown_exercises:
-        selected.extend(random.sample(cooldown_exercises, min(count, len(cooldown_exercises))))
-    
-    return selected
+@app.after_request
+def record_request_metrics(response):
+    # Label by route template (not the raw path) to keep the series count bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else "other"
+    start = g.get("request_start")
+    if start is not None:
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - start)
+    return response
 
-# Generate workout plan
-def generate_workout_plan(user_profile):
-    """Generate a 12-session workout plan based on user profile."""
-    exercises = load_exercises()
-    
-    # Determine start date (first Monday from today)
-    today = datetime.now().date()
-    days_until_monday = (7 - today.weekday()) % 7
-    if days_until_monday == 0:
-        days_until_monday = 7  # If today is Monday, start next Monday
-    start_date = today + timedelta(days=days_until_monday)
-    
-    # Create workout sessions
-    sessions = []
-    session_count = user_profile["days_per_week"] * 4  # 4 weeks
-    
-    # Create workout split
-    if user_profile["days_per_week"] == 3:
-        # Push-Pull-Legs split
-        workout_split = ["push", "pull", "legs"] * 4
-    elif user_profile["days_per_week"] == 4:
-        # Upper-Lower split
-        workout_split = ["upper", "lower", "upper", "lower"] * 3
-    else:
-        # Full body workouts
-        workout_split = ["full"] * session_count
-    
-    for i in range(session_count):
-        session_number = i + 1
-        week_number = (i // user_profile["days_per_week"]) + 1
-        split_type = workout_split[i]
-        
-        # Determine workout day date (skipping weekends if days_per_week <= 5)
-        if user_profile["days_per_week"] <= 5:
-            days_to_add = i
-            # Add extra days for weekends
-            days_to_add += (i // 5) * 2
-            session_date = start_date + timedelta(days=days_to_add)
-        else:
-            session_date = start_date + timedelta(days=i)
-        
-        # Select exercises based on split type and generate workout
-        main_exercises = []
-        
-        if split_type == "push":
-            main_exercises = select_push_exercises(exercises, user_profile["equipment"], user_profile["experience"], 3)
-            # Add 1 core exercise
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        elif split_type == "pull":
-            main_exercises = select_pull_exercises(exercises, user_profile["equipment"], user_profile["experience"], 3)
-            # Add 1 core exercise
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        elif split_type == "legs":
-            main_exercises = select_leg_exercises(exercises, user_profile["equipment"], user_profile["experience"], 3)
-            # Add 1 core exercise
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        elif split_type == "upper":
-            # Select 2 push and 2 pull
-            main_exercises = select_push_exercises(exercises, user_profile["equipment"], user_profile["experience"], 2)
-            main_exercises.extend(select_pull_exercises(exercises, user_profile["equipment"], user_profile["experience"], 2))
-            # Add 1 core
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        elif split_type == "lower":
-            # Select 4 leg exercises
-            main_exercises = select_leg_exercises(exercises, user_profile["equipment"], user_profile["experience"], 4)
-            # Add 1 core
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        else:  # full body
-            # Select 1 push, 1 pull, 1 leg, 1 core
-            main_exercises = select_push_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1)
-            main_exercises.extend(select_pull_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-            main_exercises.extend(select_leg_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-            main_exercises.extend(select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 1))
-        
-        # Select warmup exercises
-        warmup_exercises = select_warmup_exercises(exercises, user_profile["equipment"], 3)
-        
-        # Select cooldown exercises
-        cooldown_exercises = select_cooldown_exercises(exercises, user_profile["equipment"], 3)
-        
-        # Create Exercise objects with progressive overload
-        main_exercise_objects = [
-            create_exercise_object(ex, session_number, week_number) for ex in main_exercises
-        ]
-        warmup_exercise_objects = [
-            create_exercise_object(ex, session_number, week_number) for ex in warmup_exercises
-        ]
-        cooldown_exercise_objects = [
-            create_exercise_object(ex, session_number, week_number) for ex in cooldown_exercises
-        ]
-        
-        # Create optional circuit or superset for intermediate and advanced users
-        circuit_exercises = None
-        if user_profile["experience"] in ["intermediate", "advanced"] and session_number % 3 == 0:
-            # Create a circuit with 3 exercises
-            circuit_candidates = select_core_exercises(exercises, user_profile["equipment"], user_profile["experience"], 3)
-            circuit_exercises = [
-                create_exercise_object(ex, session_number, week_number) for ex in circuit_candidates
-            ]
-        
-        # Create workout section
-        workout_section = {
-            "warmup": warmup_exercise_objects,
-            "main": main_exercise_objects,
-            "cooldown": cooldown_exercise_objects
-        }
-        
-        # Add circuit if created
-        if circuit_exercises:
-            workout_section["circuit"] = circuit_exercises
-        
-        # Create workout session
-        workout_session = {
-            "session": session_number,
-            "date": session_date.strftime("%Y-%m-%d"),
-            "sections": workout_section
-        }
-        
-        sessions.append(workout_session)
-    
-    return sessions
+# Response compression (registered after the metrics hook, so it runs first and its time is measured)
+@app.after_request
+def compress_response(response):
+    # gzip/brotli for JSON bodies, negotiated from Accept-Encoding; streamed and file responses pass through
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if (encoding is None or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code in (204, 304)
+            or not compressible(response.mimetype)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
 
-# Generate plan JSON
-def generate_plan_json(user_profile):
-    """Generate the complete workout plan as a dictionary."""
-    sessions = generate_workout_plan(user_profile)
-    
-    workout_plan = {
-        "client_name": user_profile["name"],
-        "goal": user_profile["goal"],
-        "experience": user_profile["experience"],
-        "sessions": sessions
-    }
-    
-    return workout_plan
+# Request profiling
+def profile_token():
+    """Admin token sent with the current request, if any."""
+    return request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
 
-# Generate PDF
-def generate_pdf(workout_plan):
-    """Generate a PDF of the workout plan."""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Set up the title
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, f"Workout Plan for {workout_plan['client_name']}", 0, 1, "C")
-    
-    # Add some info
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, f"Goal: {workout_plan['goal'].replace('_', ' ').title()}", 0, 1)
-    pdf.cell(0, 10, f"Experience: {workout_plan['experience'].title()}", 0, 1)
-    
-    # Add each session
-    for session in workout_plan["sessions"]:
-        pdf.add_page()
-        
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, f"Session {session['session']} - {session['date']}", 0, 1)
-        
-        # Warmup section
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "Warm-Up", 0, 1)
-        
-        pdf.set_font("Arial", "", 10)
-        for exercise in session["sections"]["warmup"]:
-            description = exercise["name"]
-            if "sets" in exercise and "reps" in exercise:
-                description += f" - {exercise['sets']} sets x {exercise['reps']} reps"
-            elif "duration" in exercise:
-                description += f" - {exercise['duration']}"
-            pdf.cell(0, 8, description, 0, 1)
-        
-        # Main section
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "Main Exercises", 0, 1)
-        
-        pdf.set_font("Arial", "", 10)
-        for exercise in session["sections"]["main"]:
-            description = exercise["name"]
-            if "sets" in exercise and "reps" in exercise:
-                description += f" - {exercise['sets']} sets x {exercise['reps']} reps"
-                if "rest" in exercise:
-                    description += f", Rest: {exercise['rest']}"
-                if "tempo" in exercise:
-                    description += f", Tempo: {exercise['tempo']}"
-            pdf.cell(0, 8, description, 0, 1)
-        
-        # Circuit section (if available)
-        if "circuit" in session["sections"] and session["sections"]["circuit"]:
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 10, "Circuit (Complete 3 rounds)", 0, 1)
-            
-            pdf.set_font("Arial", "", 10)
-            for exercise in session["sections"]["circuit"]:
-                description = exercise["name"]
-                if "sets" in exercise and "reps" in exercise:
-                    description += f" - {exercise['reps']} reps"
-                elif "duration" in exercise:
-                    description += f" - {exercise['duration']}"
-                pdf.cell(0, 8, description, 0, 1)
-        
-        # Cooldown section
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "Cool-Down", 0, 1)
-        
-        pdf.set_font("Arial", "", 10)
-        for exercise in session["sections"]["cooldown"]:
-            description = exercise["name"]
-            if "duration" in exercise:
-                description += f" - {exercise['duration']}"
-            pdf.cell(0, 8, description, 0, 1)
-    
-    # Save the PDF
-    output_path = "workout_plan.pdf"
-    pdf.output(output_path)
-    
-    return output_path
+def start_request_profile():
+    # Profile requests carrying the admin token
+    if token_matches(profile_token()) and not request.path.startswith(PROFILE_REPORT_PATH):
+        request_profile = RequestProfile(f"{request.method} {request.path}")
+        if request_profile.start():
+            g.request_profile = request_profile
+
+def stop_request_profile(response):
+    request_profile = g.pop("request_profile", None)
+    if request_profile is not None:
+        request_profile.stop()
+        response.headers[PROFILE_ID_HEADER] = request_profile.profile_id
+    return response
+
+# Hooks are only registered when an admin token is configured, so normal requests pay nothing
+if profiling_enabled():
+    app.before_request(start_request_profile)
+    app.after_request(stop_request_profile)
 
 # API routes
 @app.route('/')
@@ -430,14 +120,23 @@ def api_info():
         "message": "Welcome to the Workout Plan Generator API",
         "endpoints": [
             "/generate-workout-plan",
+            "/generate-workout-plan/stream",
+            "/generate-workout-plans/batch",
+            "/generate-workout-plans/batch/stream",
             "/generate-workout-pdf",
-            "/export-workout-json"
+            "/generate-workout-pdf/jobs",
+            "/generate-workout-pdf/jobs/<job_id>",
+            "/export-workout-json",
+            "/plans",
+            "/plans/<plan_id>",
+            "/plans/<plan_id>/pdf",
+            "/plans/<plan_id>/weeks/<week_number>"
         ]
     })
 
 @app.route('/generate-workout-plan', methods=['POST'])
 def generate_workout_plan_route():
-    """Generate a workout plan based on the user profile. Returns the workout plan as JSON."""
+    """Generate a workout plan based on the user profile. Returns the workout plan as JSON (format=compact or normalized for smaller payloads)."""
     try:
         # Handle both JSON and form data
         if request.is_json:
@@ -457,18 +156,130 @@ def generate_workout_plan_route():
         # Validate equipment is a list
         if not isinstance(user_profile['equipment'], list):
             return jsonify({"error": "Equipment must be a list"}), 400
+        
+        payload_format, error = read_payload_format()
+        if error:
+            return error
             
-        workout_plan = generate_plan_json(user_profile)
-        return jsonify(workout_plan)
+        workout_plan = engine.generate_plan(user_profile)
+        with stage_timer("encode_json"):
+            content = encode_json(format_payload(workout_plan, payload_format, engine.plan_format.compact))
+        return Response(content, mimetype="application/json")
     except json.JSONDecodeError as e:
         return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+    except (ValueError, TypeError) as e:
+        # Profile values the engine cannot plan with, such as an unsupported number of weeks
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error generating workout plan: {str(e)}")  # Debug log
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate-workout-plan/stream', methods=['POST'])
+def stream_workout_plan_route():
+    """Generate a workout plan based on the user profile. Streams a header line and one line per session as NDJSON."""
+    try:
+        user_profile = request.get_json(force=True)
+        
+        # Validate required fields
+        required_fields = ['name', 'goal', 'experience', 'equipment', 'days_per_week']
+        if not isinstance(user_profile, dict):
+            return jsonify({"error": "Expected a user profile object"}), 400
+        missing_fields = [field for field in required_fields if field not in user_profile]
+        if missing_fields:
+            return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+        
+        # Validate equipment is a list
+        if not isinstance(user_profile['equipment'], list):
+            return jsonify({"error": "Equipment must be a list"}), 400
+        
+        return Response(stream_with_context(engine.iter_plan_ndjson(user_profile)), mimetype="application/x-ndjson")
+    except BadRequest as e:
+        return jsonify({"error": f"Invalid JSON format: {e.description}"}), 400
+
+def read_payload_format():
+    """Read and validate the format of a JSON response (standard, compact or normalized). Returns (format, error_response)."""
+    payload_format = request.values.get('format', 'standard')
+    if payload_format not in PAYLOAD_FORMATS:
+        return None, (jsonify({"error": f"Format must be one of: {', '.join(PAYLOAD_FORMATS)}"}), 400)
+    return payload_format, None
+
+def read_batch_profiles(max_size):
+    """Read and validate the profile list of a batch request. Returns (profiles, error_response)."""
+    payload = request.get_json(force=True)
+    user_profiles = payload.get('profiles') if isinstance(payload, dict) else payload
+    
+    if not isinstance(user_profiles, list):
+        return None, (jsonify({"error": "Expected a list of user profiles"}), 400)
+    if len(user_profiles) > max_size:
+        return None, (jsonify({"error": f"Batch too large: at most {max_size} profiles per request"}), 413)
+    
+    # Validate every profile before generating anything
+    required_fields = ['name', 'goal', 'experience', 'equipment', 'days_per_week']
+    for position, user_profile in enumerate(user_profiles):
+        if not isinstance(user_profile, dict):
+            return None, (jsonify({"error": f"Profile {position}: expected an object"}), 400)
+        missing_fields = [field for field in required_fields if field not in user_profile]
+        if missing_fields:
+            return None, (jsonify({"error": f"Profile {position}: missing required fields: {', '.join(missing_fields)}"}), 400)
+        if not isinstance(user_profile['equipment'], list):
+            return None, (jsonify({"error": f"Profile {position}: equipment must be a list"}), 400)
+    
+    return user_profiles, None
+
+@app.route('/generate-workout-plans/batch', methods=['POST'])
+def generate_workout_plans_batch_route():
+    """Generate workout plans for a list of user profiles. Returns {"plans": [...]} in request order."""
+    try:
+        user_profiles, error = read_batch_profiles(MAX_BATCH_SIZE)
+        if error:
+            return error
+        payload_format, error = read_payload_format()
+        if error:
+            return error
+        
+        workout_plans = engine.generate_plans(user_profiles)
+        with stage_timer("encode_json"):
+            content = encode_json({"plans": [format_payload(workout_plan, payload_format, engine.plan_format.compact) for workout_plan in workout_plans]})
+        return Response(content, mimetype="application/json")
+    except BadRequest as e:
+        return jsonify({"error": f"Invalid JSON format: {e.description}"}), 400
+    except (ValueError, TypeError) as e:
+        # Profile values the engine cannot plan with, such as an unsupported number of weeks
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error generating workout plans: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/generate-workout-plans/batch/stream', methods=['POST'])
+def stream_workout_plans_batch_route():
+    """Generate workout plans for a list of user profiles. Streams one plan per line as NDJSON."""
+    try:
+        user_profiles, error = read_batch_profiles(MAX_STREAM_BATCH_SIZE)
+        if error:
+            return error
+        
+        return Response(stream_with_context(engine.iter_plans_ndjson(user_profiles)), mimetype="application/x-ndjson")
+    except BadRequest as e:
+        return jsonify({"error": f"Invalid JSON format: {e.description}"}), 400
+
+def artifact_response(workout_plan, kind, version, render, mimetype, download_name, *options):
+    """Serve an export of a plan from the on-disk artifact cache, rendering and storing it on a miss."""
+    key = artifact_key(kind, workout_plan, version, *options)
+    if etag_matches(request.headers.get('If-None-Match'), etag_for(key)):
+        return Response(status=304, headers={"ETag": etag_for(key)})
+    
+    artifact = artifact_cache.open(key, kind)
+    if artifact is None:
+        content = render(workout_plan, *options)
+        artifact_cache.put(key, kind, content)
+        return send_file(io.BytesIO(content), mimetype=mimetype, download_name=download_name, etag=key)
+    
+    # Sent from the open file through the server's file wrapper (sendfile under gunicorn)
+    return send_file(artifact, mimetype=mimetype, download_name=download_name, etag=key)
+
 @app.route('/generate-workout-pdf', methods=['POST'])
 def generate_workout_pdf_route():
-    """Generate a workout plan based on the user profile. Returns the workout plan as a PDF file."""
+    """Generate a workout plan based on the user profile. Returns the workout plan as a PDF file (layout=compact for several sessions per page)."""
     try:
         # Handle both JSON and form data
         if request.is_json:
@@ -489,19 +300,89 @@ def generate_workout_pdf_route():
         if not isinstance(user_profile['equipment'], list):
             return jsonify({"error": "Equipment must be a list"}), 400
             
-        workout_plan = generate_plan_json(user_profile)
-        pdf_path = generate_pdf(workout_plan)
-        
-        return send_file(pdf_path, download_name="workout_plan.pdf")
+        # Validate the layout
+        layout = request.values.get('layout', 'standard')
+        if layout not in PDF_LAYOUTS:
+            return jsonify({"error": f"Layout must be one of: {', '.join(PDF_LAYOUTS)}"}), 400
+            
+        workout_plan = engine.generate_plan(user_profile)
+        return artifact_response(workout_plan, "pdf", PDF_VERSION, generate_pdf, "application/pdf", "workout_plan.pdf", layout)
     except json.JSONDecodeError as e:
         return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+    except (ValueError, TypeError) as e:
+        # Profile values the engine cannot plan with, such as an unsupported number of weeks
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error generating PDF: {str(e)}")  # Debug log
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate-workout-pdf/jobs', methods=['POST'])
+def submit_workout_pdf_job_route():
+    """Generate a workout plan and queue its PDF export. Returns the job (202) to poll at its status_url, or 429 when the queue is full."""
+    try:
+        # Handle both JSON and form data
+        if request.is_json:
+            user_profile = request.json
+        else:
+            user_profile_str = request.form.get('user_profile', '{}')
+            user_profile = json.loads(user_profile_str)
+        
+        # Validate required fields
+        required_fields = ['name', 'goal', 'experience', 'equipment', 'days_per_week']
+        missing_fields = [field for field in required_fields if field not in user_profile]
+        if missing_fields:
+            return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+        
+        # Validate equipment is a list
+        if not isinstance(user_profile['equipment'], list):
+            return jsonify({"error": "Equipment must be a list"}), 400
+            
+        # Validate the layout
+        layout = request.values.get('layout', 'standard')
+        if layout not in PDF_LAYOUTS:
+            return jsonify({"error": f"Layout must be one of: {', '.join(PDF_LAYOUTS)}"}), 400
+            
+        workout_plan = engine.generate_plan(user_profile)
+        job = export_jobs.submit(workout_plan, layout)
+        
+        result = job.to_dict()
+        result["status_url"] = f"/generate-workout-pdf/jobs/{job.job_id}"
+        return jsonify(result), 202 if job.pending else 200
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    except json.JSONDecodeError as e:
+        return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+    except (ValueError, TypeError) as e:
+        # Profile values the engine cannot plan with, such as an unsupported number of weeks
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error queueing PDF export: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/generate-workout-pdf/jobs/<job_id>')
+def workout_pdf_job_route(job_id):
+    """Poll a PDF export job: 202 with its status while pending, the PDF once done."""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.pending:
+        return jsonify(job.to_dict()), 202, {"Retry-After": "1"}
+    if job.status == "failed":
+        return jsonify({"error": f"Export failed: {job.error}"}), 500
+    
+    if job.content is not None:
+        response = send_file(io.BytesIO(job.content), mimetype="application/pdf", download_name="workout_plan.pdf", etag=job_id)
+    else:
+        artifact = artifact_cache.open(job_id, "pdf")
+        if artifact is None:
+            return jsonify({"error": "Export expired; submit the job again"}), 404
+        response = send_file(artifact, mimetype="application/pdf", download_name="workout_plan.pdf", etag=job_id)
+    response.headers["Server-Timing"] = job.server_timing()
+    return response
+
 @app.route('/export-workout-json', methods=['POST'])
 def export_workout_json_route():
-    """Generate a workout plan based on the user profile. Returns the workout plan as a downloadable JSON file."""
+    """Generate a workout plan based on the user profile. Returns the workout plan as a downloadable JSON file (format=compact or normalized without whitespace or null fields)."""
     try:
         # Handle both JSON and form data
         if request.is_json:
@@ -521,20 +402,123 @@ def export_workout_json_route():
         # Validate equipment is a list
         if not isinstance(user_profile['equipment'], list):
             return jsonify({"error": "Equipment must be a list"}), 400
-            
-        workout_plan = generate_plan_json(user_profile)
-        
-        # Save the JSON to a file
-        with open("workout_plan.json", "w") as f:
-            json.dump(workout_plan, f, indent=4, default=str)
         
-        return send_file("workout_plan.json", download_name="workout_plan.json")
+        payload_format, error = read_payload_format()
+        if error:
+            return error
+            
+        workout_plan = engine.generate_plan(user_profile)
+        return artifact_response(workout_plan, "json", JSON_EXPORT_VERSION, export_plan_json, "application/json", "workout_plan.json", payload_format)
     except json.JSONDecodeError as e:
         return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+    except (ValueError, TypeError) as e:
+        # Profile values the engine cannot plan with, such as an unsupported number of weeks
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error generating JSON file: {str(e)}")  # Debug log
         return jsonify({"error": str(e)}), 500
 
+@app.route('/plans', methods=['POST'])
+def create_plan_route():
+    """Register a workout plan without generating it. Returns the plan ID, seed and length."""
+    try:
+        user_profile = request.get_json(force=True)
+        
+        # Validate required fields
+        required_fields = ['name', 'goal', 'experience', 'equipment', 'days_per_week']
+        if not isinstance(user_profile, dict):
+            return jsonify({"error": "Expected a user profile object"}), 400
+        missing_fields = [field for field in required_fields if field not in user_profile]
+        if missing_fields:
+            return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+        
+        # Validate equipment is a list
+        if not isinstance(user_profile['equipment'], list):
+            return jsonify({"error": "Equipment must be a list"}), 400
+        
+        return jsonify(engine.plan(user_profile).header())
+    except BadRequest as e:
+        return jsonify({"error": f"Invalid JSON format: {e.description}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/plans')
+def list_plans_route():
+    """List stored plans (ID, client name, creation time), newest first; ?client_name= for one client's plans."""
+    limit = request.args.get('limit', 50, type=int)
+    if not 1 <= limit <= MAX_PLAN_LIST_SIZE:
+        return jsonify({"error": f"limit must be from 1 to {MAX_PLAN_LIST_SIZE}"}), 400
+    try:
+        return jsonify({"plans": engine.find_plans(request.args.get('client_name'), limit)})
+    except Exception as e:
+        print(f"Error listing plans: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/plans/<plan_id>')
+def plan_route(plan_id):
+    """Return a generated plan by ID from the plan store (format=compact or normalized for smaller payloads)."""
+    payload_format, error = read_payload_format()
+    if error:
+        return error
+    try:
+        workout_plan = engine.load_plan(plan_id)
+        if workout_plan is None:
+            return jsonify({"error": "Plan not found"}), 404
+        with stage_timer("encode_json"):
+            content = encode_json(format_payload(workout_plan, payload_format, engine.plan_format.compact))
+        return Response(content, mimetype="application/json")
+    except Exception as e:
+        print(f"Error loading plan: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/plans/<plan_id>/pdf')
+def plan_pdf_route(plan_id):
+    """Return a generated plan by ID as a PDF file (layout=compact for several sessions per page)."""
+    layout = request.args.get('layout', 'standard')
+    if layout not in PDF_LAYOUTS:
+        return jsonify({"error": f"Layout must be one of: {', '.join(PDF_LAYOUTS)}"}), 400
+    try:
+        workout_plan = engine.load_plan(plan_id)
+        if workout_plan is None:
+            return jsonify({"error": "Plan not found"}), 404
+        return artifact_response(workout_plan, "pdf", PDF_VERSION, generate_pdf, "application/pdf", "workout_plan.pdf", layout)
+    except Exception as e:
+        print(f"Error generating PDF: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/plans/<plan_id>/weeks/<int:week_number>')
+def plan_week_route(plan_id, week_number):
+    """Return the sessions of one week of a plan, generating only that week."""
+    workout_plan = engine.get_plan(plan_id)
+    if workout_plan is None:
+        return jsonify({"error": "Plan not found"}), 404
+    if not 1 <= week_number <= workout_plan.weeks:
+        return jsonify({"error": f"Week {week_number} is outside this {workout_plan.weeks}-week plan"}), 404
+    try:
+        with stage_timer("sessions"):
+            sessions = workout_plan.week(week_number)
+        with stage_timer("encode_json"):
+            content = encode_json({"plan_id": plan_id, "week": week_number, "weeks": workout_plan.weeks, "sessions": sessions})
+        return Response(content, mimetype="application/json")
+    except Exception as e:
+        print(f"Error generating plan week: {str(e)}")  # Debug log
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/metrics')
+def metrics_route():
+    """Request, stage, cache and catalog metrics in the Prometheus text format."""
+    caches = {"candidate_pool": candidate_pool_cache, "plan": plan_cache, "plan_index": engine.plans, "artifact": artifact_cache, "plan_store": plan_store}
+    pools = {"export_jobs": export_jobs.stats()}
+    return Response(render_metrics(get_catalog(), caches, pools), content_type=CONTENT_TYPE)
+
+@app.route(PROFILE_REPORT_PATH + '/<profile_id>')
+def profile_route(profile_id):
+    """Text report of a profiled request (requires the admin token)."""
+    report = profile_store.get(profile_id) if token_matches(profile_token()) else None
+    if report is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(report, mimetype="text/plain")
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 8000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,255 @@
+"""
+Bulk plan generation from a file of profiles, spread over worker processes.
+
+    python -m app.bulk profiles.csv --output plans.jsonl
+    python -m app.bulk profiles.jsonl --output plans.jsonl --pdf-dir pdfs --layout compact
+    cat profiles.jsonl | python -m app.bulk - --format jsonl > plans.jsonl
+
+Profiles are read as a stream (JSONL, one profile object per line, or CSV with
+a header row; CSV equipment lists are separated by ";"), generated in chunks by
+a pool of worker processes and written as one plan per line in input order.
+Only a few chunks are in flight at a time, so memory stays flat however long
+the input is. Progress goes to stderr; profiles that fail validation are
+reported (to --errors as JSONL when given) and the exit status is 1.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.engine.exports import PDF_LAYOUTS
+from app.models.models import UserProfile
+from app.utils import workout_generator as generator
+from app.utils.serialization import encode_json
+
+# CSV columns that hold lists, and their item separator
+CSV_LIST_FIELDS = ("equipment",)
+CSV_LIST_SEPARATOR = ";"
+
+# Errors listed on stderr when there is no --errors file
+MAX_ERRORS_SHOWN = 10
+
+def init_worker(save_plans: bool) -> None:
+    """
+    Set up a worker process: plans are generated once each, so caching them or
+    indexing them for week lookups would only cost memory.
+    """
+    generator.engine.plan_cache.maxsize = 0
+    generator.engine.plans.maxsize = 0
+    if not save_plans:
+        generator.engine.store = None
+
+def parse_profile(record: Any) -> Dict[str, Any]:
+    """Turn a JSONL line or a CSV row into profile fields."""
+    if isinstance(record, str):
+        profile = json.loads(record)
+        if not isinstance(profile, dict):
+            raise ValueError("Expected a user profile object")
+        return profile
+
+    profile = {}
+    for field, value in record.items():
+        if field is None:
+            raise ValueError("Row has more values than the header has columns")
+        value = (value or "").strip()
+        if not value:
+            continue  # Empty cells fall back to the model defaults
+        if field in CSV_LIST_FIELDS:
+            value = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        profile[field] = value
+    return profile
+
+def error_message(error: Exception) -> str:
+    """One-line description of why a profile failed."""
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'profile'}: {item['msg']}" for item in error.errors())
+    return str(error)
+
+def generate_chunk(records: List[Tuple[int, Any]],
+                   pdf_dir: Optional[str] = None,
+                   layout: str = "standard") -> Tuple[bytes, int, int, List[Dict[str, Any]]]:
+    """
+    Generate the plans of one chunk of (line number, record) pairs in a worker.
+    Returns the JSONL bytes, the number of plans and of PDFs written, and the failed records.
+    """
+    lines = []
+    pdfs = 0
+    errors = []
+    for line_number, record in records:
+        try:
+            user_profile = UserProfile(**parse_profile(record))
+            workout_plan = generator.generate_plan_json(user_profile)
+        except (ValidationError, ValueError, TypeError) as e:
+            errors.append({"line": line_number, "error": error_message(e)})
+            continue
+        lines.append(encode_json(workout_plan))
+
+        if pdf_dir is not None:
+            # Spread the files over subdirectories so no directory gets huge
+            directory = os.path.join(pdf_dir, workout_plan["plan_id"][:2])
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{workout_plan['plan_id']}.pdf"), "wb") as f:
+                f.write(generator.generate_pdf(workout_plan, layout))
+            pdfs += 1
+
+    if generator.engine.store is not None:
+        # Pool workers exit without running atexit hooks, so commit the chunk's plans now
+        generator.engine.store.close()
+
+    content = b"\n".join(lines) + b"\n" if lines else b""
+    return content, len(lines), pdfs, errors
+
+def read_records(stream: io.TextIOBase, input_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, record) for every profile in the input, reading it lazily."""
+    if input_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_number, line
+
+def read_chunks(records: Iterator[Tuple[int, Any]], chunk_size: int) -> Iterator[List[Tuple[int, Any]]]:
+    """Group records into lists of chunk_size."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def input_format_for(path: str, input_format: Optional[str]) -> str:
+    """The input format: as given, or from the file extension."""
+    if input_format:
+        return input_format
+    if path.lower().endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+class Progress:
+    """Counters of a run, reported on stderr at most every `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.plans = 0
+        self.errors = 0
+        self.pdfs = 0
+        self.bytes = 0
+
+    def add(self, content: bytes, plans: int, pdfs: int, errors: int) -> None:
+        self.plans += plans
+        self.errors += errors
+        self.pdfs += pdfs
+        self.bytes += len(content)
+        now = time.perf_counter()
+        if self.interval > 0 and now - self.last_report >= self.interval:
+            self.last_report = now
+            print(f"{self.plans} plans, {self.errors} errors, {self.rate():.0f} plans/s", file=sys.stderr)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def rate(self) -> float:
+        elapsed = self.elapsed()
+        return self.plans / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """Final throughput stats."""
+        return {
+            "plans": self.plans,
+            "errors": self.errors,
+            "pdfs": self.pdfs,
+            "output_bytes": self.bytes,
+            "seconds": round(self.elapsed(), 3),
+            "plans_per_second": round(self.rate(), 1),
+        }
+
+def run(records: Iterator[Tuple[int, Any]],
+        output: io.BufferedIOBase,
+        errors_output: Optional[io.TextIOBase],
+        workers: int,
+        chunk_size: int,
+        max_pending: int,
+        pdf_dir: Optional[str],
+        layout: str,
+        save_plans: bool,
+        progress: Progress) -> None:
+    """Generate every profile in records and write the plans in input order."""
+    errors_shown = 0
+    pending = deque()
+
+    def write_oldest():
+        nonlocal errors_shown
+        content, plans, pdfs, errors = pending.popleft().result()
+        output.write(content)
+        for error in errors:
+            if errors_output is not None:
+                errors_output.write(json.dumps(error) + "\n")
+            elif errors_shown < MAX_ERRORS_SHOWN:
+                print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+                errors_shown += 1
+        progress.add(content, plans, pdfs, len(errors))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(save_plans,)) as executor:
+        for chunk in read_chunks(records, chunk_size):
+            # Bounded in-flight work: wait for the oldest chunk before reading further
+            while len(pending) >= max_pending:
+                write_oldest()
+            pending.append(executor.submit(generate_chunk, chunk, pdf_dir, layout))
+            while pending and pending[0].done():
+                write_oldest()
+        while pending:
+            write_oldest()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate workout plans in bulk from a CSV or JSONL file of profiles")
+    parser.add_argument("input", help="profiles file, or - for stdin")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format (default: from the file extension)")
+    parser.add_argument("--output", default="-", help="JSONL file for the plans (default: stdout)")
+    parser.add_argument("--errors", help="JSONL file for profiles that could not be generated")
+    parser.add_argument("--pdf-dir", help="also write each plan as <pdf-dir>/<id[:2]>/<plan_id>.pdf")
+    parser.add_argument("--layout", choices=PDF_LAYOUTS, default="standard", help="PDF layout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=200, help="profiles per task sent to a worker")
+    parser.add_argument("--max-pending", type=int, help="chunks in flight at once (default: 2 per worker)")
+    parser.add_argument("--progress", type=float, default=5.0, help="seconds between progress lines (0 for none)")
+    parser.add_argument("--save-plans", action="store_true", help="also save the plans to the plan store")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+    max_pending = args.max_pending or 2 * args.workers
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+
+    input_format = input_format_for(args.input, args.format)
+    progress = Progress(args.progress)
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    errors_output = open(args.errors, "w") if args.errors else None
+    try:
+        run(read_records(stream, input_format), output, errors_output, args.workers, args.chunk_size,
+            max_pending, args.pdf_dir, args.layout, args.save_plans, progress)
+    finally:
+        for f in (stream, output, errors_output):
+            if f is not None and f not in (sys.stdin, sys.stdout.buffer):
+                f.close()
+
+    print(json.dumps(progress.summary()), file=sys.stderr)
+    return 1 if progress.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
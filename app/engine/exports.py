@@ -0,0 +1,37 @@
+import json
+from typing import Dict
+
+from app.engine.payloads import PAYLOAD_FORMATS, format_payload
+from app.engine.pdf_render import PDF_LAYOUTS, PdfDocument, layout_plan
+from app.utils.metrics import stage_timer
+from app.utils.serialization import encode_json
+
+# Bump when an export's output changes, so cached artifacts of the old layout are not served
+JSON_EXPORT_VERSION = 1
+PDF_VERSION = 3
+
+def export_plan_json(workout_plan: Dict, payload_format: str = "standard") -> bytes:
+    """
+    Serialize the workout plan for download and return it as bytes: indented
+    as before for the standard format, without whitespace for compact and normalized.
+    """
+    with stage_timer("export_json"):
+        if payload_format == "standard":
+            return json.dumps(workout_plan, indent=4, default=str).encode("utf-8")
+        return encode_json(format_payload(workout_plan, payload_format))
+
+def layout_pdf(workout_plan: Dict, layout: str = "standard") -> PdfDocument:
+    """
+    Lay out the workout plan as a PDF document (not yet rendered): one session per
+    page, or with layout="compact" as many session tables per page as fit.
+    Works with every plan format: a field counts only when it is present and not None.
+    """
+    return layout_plan(workout_plan, layout)
+
+def generate_pdf(workout_plan: Dict, layout: str = "standard") -> bytes:
+    """Generate a PDF of the workout plan and return it as bytes."""
+    with stage_timer("pdf_layout"):
+        document = layout_pdf(workout_plan, layout)
+    
+    with stage_timer("pdf_output"):
+        return document.output()
@@ -0,0 +1,74 @@
+from datetime import date
+from typing import List, Dict, Any, Optional
+
+from app.engine.progression import PROGRESSION_SCHEMES, STANDARD_SCHEME, prescription
+
+DEFAULT_SCHEME = STANDARD_SCHEME.name
+
+# Sections every session has, and sections only some sessions get
+REQUIRED_SECTIONS = ("warmup", "main", "cooldown")
+OPTIONAL_SECTIONS = ("circuit", "superset")
+
+def exercise_fields(exercise_data: Dict[str, Any],
+                    week_number: int = 1,
+                    scheme: str = DEFAULT_SCHEME) -> Dict[str, Any]:
+    """Return the fields of an exercise with progressive overload based on week number and progression scheme."""
+    return PROGRESSION_SCHEMES[scheme].prescribe(exercise_data, week_number)
+
+class PlanFormat:
+    """
+    Output layer of the plan engine: turns the exercises picked for a session
+    into the JSON-ready shape a front end serves.
+    """
+
+    name = None
+    # Whether plans already leave out None fields (so a compact payload is the plan itself)
+    compact = False
+
+    def exercise(self,
+                 exercise_data: Dict[str, Any],
+                 session_number: int,
+                 week_number: int,
+                 scheme: str = DEFAULT_SCHEME) -> Dict[str, Any]:
+        """
+        Format one exercise for the given session and week. Catalog exercises
+        return a shared entry of their progression table, which must not be mutated.
+        """
+        return prescription(exercise_data, week_number, self.name, scheme)
+
+    def session(self,
+                session_number: int,
+                session_date: date,
+                sections: Dict[str, Optional[List[Dict[str, Any]]]]) -> Dict[str, Any]:
+        """Format a session from its already formatted sections."""
+        raise NotImplementedError
+
+class FullFormat(PlanFormat):
+    """Shaped like the pydantic models' model_dump(): every field present (None when unset), ISO dates."""
+
+    name = "full"
+
+    def session(self, session_number, session_date, sections):
+        formatted = {section: sections[section] for section in REQUIRED_SECTIONS}
+        for section in OPTIONAL_SECTIONS:
+            formatted[section] = sections.get(section) or None
+        return {"session": session_number, "date": session_date.isoformat(), "sections": formatted}
+
+class SparseFormat(PlanFormat):
+    """Only the fields that apply to each exercise, and optional sections only when present."""
+
+    name = "sparse"
+    compact = True
+
+    def session(self, session_number, session_date, sections):
+        formatted = {section: sections[section] for section in REQUIRED_SECTIONS}
+        for section in OPTIONAL_SECTIONS:
+            if sections.get(section):
+                formatted[section] = sections[section]
+        return {"session": session_number, "date": session_date.isoformat(), "sections": formatted}
+
+FULL_FORMAT = FullFormat()
+SPARSE_FORMAT = SparseFormat()
+
+# Output formats by name
+PLAN_FORMATS = {plan_format.name: plan_format for plan_format in (FULL_FORMAT, SPARSE_FORMAT)}
@@ -0,0 +1,74 @@
+from typing import Dict, Any, List
+
+# JSON payload formats a plan can be returned in:
+# standard - the plan as generated (full-format plans carry None for every unset field)
+# compact - None exercise fields and empty session sections left out
+# normalized - compact, with each distinct exercise listed once under "exercises"
+#              and sessions referring to them by index
+PAYLOAD_FORMATS = ("standard", "compact", "normalized")
+
+def compact_exercise(exercise: Dict[str, Any]) -> Dict[str, Any]:
+    """The exercise without its None fields (precomputed for progression table entries)."""
+    compact = getattr(exercise, "compact", None)
+    if compact is not None:
+        return compact
+    if None not in exercise.values():
+        return exercise  # Sparse-format exercises are compact already
+    return {field: value for field, value in exercise.items() if value is not None}
+
+def map_exercises(workout_plan: Dict[str, Any], convert) -> List[Dict[str, Any]]:
+    """
+    The plan's sessions with every exercise replaced by convert(exercise) and
+    None sections left out. Exercise dicts are shared table entries, so they are never mutated.
+    """
+    return [
+        dict(session, sections={
+            name: [convert(exercise) for exercise in exercises]
+            for name, exercises in session["sections"].items()
+            if exercises is not None
+        })
+        for session in workout_plan["sessions"]
+    ]
+
+def compact_plan(workout_plan: Dict[str, Any]) -> Dict[str, Any]:
+    """The plan without None fields."""
+    return dict(workout_plan, sessions=map_exercises(workout_plan, compact_exercise))
+
+def normalize_plan(workout_plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The compact plan with every distinct exercise prescription listed once under
+    "exercises" and session sections holding indexes into that list.
+    """
+    exercises = []
+    indexes = {}
+    # Sessions share exercise dicts, so most lookups are answered by identity
+    by_identity = {}
+
+    def exercise_index(exercise):
+        index = by_identity.get(id(exercise))
+        if index is None:
+            fields = compact_exercise(exercise)
+            key = tuple(fields.items())
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = len(exercises)
+                exercises.append(fields)
+            by_identity[id(exercise)] = index
+        return index
+
+    sessions = map_exercises(workout_plan, exercise_index)
+    normalized = {field: value for field, value in workout_plan.items() if field != "sessions"}
+    normalized["exercises"] = exercises
+    normalized["sessions"] = sessions
+    return normalized
+
+def format_payload(workout_plan: Dict[str, Any], payload_format: str = "standard", compact: bool = False) -> Dict[str, Any]:
+    """
+    The plan in one of PAYLOAD_FORMATS (standard returns it unchanged, and so
+    does compact for plans of a compact format such as sparse).
+    """
+    if payload_format == "compact" and not compact:
+        return compact_plan(workout_plan)
+    if payload_format == "normalized":
+        return normalize_plan(workout_plan)
+    return workout_plan
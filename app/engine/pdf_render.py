@@ -0,0 +1,370 @@
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from fpdf.fonts import fpdf_charwidths
+
+# Page geometry in points: A4 with FPDF's default 1 cm margins and 1 mm cell padding
+MM = 72 / 25.4
+PAGE_WIDTH = 210 * MM
+PAGE_HEIGHT = 297 * MM
+MARGIN = 10 * MM
+CELL_MARGIN = 1 * MM
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+# Lines that would reach into this margin (FPDF's 2 cm auto page break) go to the next page
+BOTTOM_MARGIN = 20 * MM
+
+# Core fonts need no embedding: resource name, base font and FPDF metrics key
+FONTS = {
+    "regular": ("F1", "Helvetica", "helvetica"),
+    "bold": ("F2", "Helvetica-Bold", "helveticaB"),
+}
+
+# Sections in the order they are printed, with their headings
+SECTION_ORDER = ("warmup", "main", "circuit", "cooldown")
+SECTION_TITLES = {
+    "warmup": "Warm-Up",
+    "main": "Main Exercises",
+    "circuit": "Circuit (Complete 3 rounds)",
+    "cooldown": "Cool-Down",
+}
+COMPACT_SECTION_TITLES = {
+    "warmup": "Warm-Up",
+    "main": "Main",
+    "circuit": "Circuit (3 rounds)",
+    "cooldown": "Cool-Down",
+}
+
+PDF_LAYOUTS = ("standard", "compact")
+
+def win_ansi(text: str) -> str:
+    """
+    Text in the core fonts' WinAnsiEncoding (cp1252), one character per byte: dashes,
+    curly quotes, bullets and the euro sign map to their codes, and characters the
+    encoding lacks (such as CJK) become "?".
+    """
+    return text.encode("cp1252", "replace").decode("latin-1")
+
+def pdf_string(text: str) -> str:
+    """Escape text for a PDF string literal in page content."""
+    text = win_ansi(text)
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", "\\r") + ")"
+
+def text_width(text: str, font: str, size: float) -> float:
+    """Width of a line of text in points."""
+    widths = fpdf_charwidths[FONTS[font][2]]
+    return sum(widths.get(char, 0) for char in win_ansi(text)) * size / 1000
+
+def pdf_text_string(text: str) -> bytes:
+    """A PDF text string for document metadata: UTF-16 with a byte order mark unless plain ASCII, so any script survives."""
+    if text.isascii():
+        return pdf_string(text).encode("ascii")
+    return b"<FEFF" + text.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+class TextStyle:
+    """A font at a size with a line height, with its operators formatted once."""
+
+    __slots__ = ("font", "size", "line_height", "select", "baseline", "step")
+
+    def __init__(self, font: str, size: float, line_height_mm: float):
+        self.font = font
+        self.size = size
+        self.line_height = line_height_mm * MM
+        self.select = f"/{FONTS[font][0]} {size:.2f} Tf"
+        # Baseline within a line, placed like FPDF's cell(): half the line height plus 30% of the font size
+        self.baseline = self.line_height / 2 + 0.3 * size
+        self.step = f"0 {-self.line_height:.2f} Td"
+
+TITLE = TextStyle("bold", 16, 10)
+INFO = TextStyle("regular", 12, 10)
+SESSION_HEADING = TextStyle("bold", 14, 10)
+SECTION_HEADING = TextStyle("bold", 12, 10)
+BODY = TextStyle("regular", 10, 8)
+
+COMPACT_SESSION_HEADING = TextStyle("bold", 11, 7)
+COMPACT_LABEL = TextStyle("bold", 9, 5)
+COMPACT_BODY = TextStyle("regular", 9, 5)
+# Width of the section label column of the compact table, and the gap left after each session
+COMPACT_LABEL_WIDTH = 32 * MM
+COMPACT_SESSION_GAP = 4 * MM
+
+# Every section heading as a ready-made string literal
+SECTION_LITERALS = {section: pdf_string(title) for section, title in SECTION_TITLES.items()}
+COMPACT_SECTION_LITERALS = {section: pdf_string(title) for section, title in COMPACT_SECTION_TITLES.items()}
+
+def describe_exercise(section: str, exercise: Dict[str, Any]) -> str:
+    """One line of text for an exercise in a section (a field counts only when present and not None)."""
+    description = exercise["name"]
+    sets = exercise.get("sets")
+    reps = exercise.get("reps")
+    if section == "main":
+        if sets is not None and reps is not None:
+            description += f" - {sets} sets x {reps} reps"
+            if exercise.get("rest") is not None:
+                description += f", Rest: {exercise['rest']}"
+            if exercise.get("tempo") is not None:
+                description += f", Tempo: {exercise['tempo']}"
+    elif section == "cooldown":
+        if exercise.get("duration") is not None:
+            description += f" - {exercise['duration']}"
+    elif sets is not None and reps is not None:
+        if section == "circuit":
+            description += f" - {reps} reps"
+        else:
+            description += f" - {sets} sets x {reps} reps"
+    elif exercise.get("duration") is not None:
+        description += f" - {exercise['duration']}"
+    return description
+
+@lru_cache(maxsize=4096)
+def exercise_literal(section: str, fields: Tuple[Tuple[str, Any], ...]) -> str:
+    """
+    The escaped line of an exercise, cached: plans repeat the same exercises at the
+    same progression, so most lines are formatted once per process.
+    """
+    return pdf_string(describe_exercise(section, dict(fields)))
+
+class PdfDocument:
+    """
+    Minimal PDF writer for text-only pages in the core fonts. Pages are added as
+    finished content streams; output() writes the objects, xref table and trailer.
+    """
+
+    def __init__(self, title: str = "", compress: bool = True):
+        self.title = title
+        self.compress = compress
+        self.pages: List[str] = []
+
+    def add_page(self, content: str) -> None:
+        self.pages.append(content)
+
+    def output(self) -> bytes:
+        """Render the document to bytes."""
+        chunks = [b"%PDF-1.4\n"]
+        offsets = []
+        position = len(chunks[0])
+
+        def add_object(body: bytes) -> int:
+            nonlocal position
+            offsets.append(position)
+            chunk = b"%d 0 obj\n" % len(offsets) + body + b"\nendobj\n"
+            chunks.append(chunk)
+            position += len(chunk)
+            return len(offsets)
+
+        # Objects 1 and 2: the page tree and the shared resources, with fonts as 3 and 4
+        page_count = len(self.pages)
+        first_page = 3 + len(FONTS)
+        kids = " ".join(f"{first_page + 2 * i} 0 R" for i in range(page_count))
+        add_object(
+            f"<< /Type /Pages /Kids [{kids}] /Count {page_count} "
+            f"/MediaBox [0 0 {PAGE_WIDTH:.2f} {PAGE_HEIGHT:.2f}] >>".encode("latin-1")
+        )
+        font_refs = " ".join(f"/{name} {3 + i} 0 R" for i, (name, _, _) in enumerate(FONTS.values()))
+        add_object(f"<< /ProcSet [/PDF /Text] /Font << {font_refs} >> >>".encode("latin-1"))
+        for name, base_font, _ in FONTS.values():
+            add_object(
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>".encode("latin-1")
+            )
+
+        for i, content in enumerate(self.pages):
+            add_object(f"<< /Type /Page /Parent 1 0 R /Resources 2 0 R /Contents {first_page + 2 * i + 1} 0 R >>".encode("latin-1"))
+            # Page text is WinAnsi already (see pdf_string)
+            stream = content.encode("latin-1")
+            if self.compress:
+                # Level 1: pages are small, so higher levels cost time for a few bytes
+                stream = zlib.compress(stream, 1)
+                header = b"<< /Filter /FlateDecode /Length %d >>" % len(stream)
+            else:
+                header = b"<< /Length %d >>" % len(stream)
+            add_object(header + b"\nstream\n" + stream + b"\nendstream")
+
+        info = add_object(
+            b"<< /Producer (Workout Plan Generator) /Title " + pdf_text_string(self.title) + b" >>"
+        )
+        catalog = add_object(b"<< /Type /Catalog /Pages 1 0 R >>")
+
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1)]
+        xref.extend(b"%010d 00000 n \n" % offset for offset in offsets)
+        chunks.extend(xref)
+        chunks.append(
+            b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(offsets) + 1, catalog, info, position)
+        )
+        return b"".join(chunks)
+
+class PageFlow:
+    """
+    Lays text out top to bottom over pages. Each block of lines in one style is
+    emitted as a single text object, and a block that would cross the bottom
+    margin continues on a new page.
+    """
+
+    def __init__(self, document: PdfDocument):
+        self.document = document
+        self.parts: Optional[List[str]] = None
+        self.y = 0.0
+
+    def new_page(self) -> None:
+        self.finish_page()
+        self.parts = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def finish_page(self) -> None:
+        if self.parts is not None:
+            self.document.add_page("\n".join(self.parts))
+            self.parts = None
+
+    def ensure_room(self, height: float) -> None:
+        """Start a new page unless the next height points fit on this one."""
+        if self.parts is None or self.y - height < BOTTOM_MARGIN:
+            self.new_page()
+
+    def lines(self, style: TextStyle, literals: Iterable[str], x: float = MARGIN + CELL_MARGIN) -> None:
+        """Write escaped string literals as consecutive lines in one style."""
+        literals = list(literals)
+        while literals:
+            self.ensure_room(style.line_height)
+            fitting = max(1, int((self.y - BOTTOM_MARGIN) // style.line_height))
+            batch, literals = literals[:fitting], literals[fitting:]
+            ops = [f"BT {style.select} {x:.2f} {self.y - style.baseline:.2f} Td {batch[0]} Tj"]
+            step = style.step
+            for literal in batch[1:]:
+                ops.append(f"{step} {literal} Tj")
+            ops.append("ET")
+            self.parts.append(" ".join(ops))
+            self.y -= style.line_height * len(batch)
+
+    def centered(self, style: TextStyle, text: str) -> None:
+        """Write one line centred between the margins."""
+        x = MARGIN + (TEXT_WIDTH - text_width(text, style.font, style.size)) / 2
+        self.ensure_room(style.line_height)
+        self.parts.append(f"BT {style.select} {x:.2f} {self.y - style.baseline:.2f} Td {pdf_string(text)} Tj ET")
+        self.y -= style.line_height
+
+    def table_row_block(self, label_style: TextStyle, body_style: TextStyle, rows: List[Tuple[str, str]]) -> None:
+        """Write (label, text) literal pairs as two columns; empty labels are skipped."""
+        x_label = MARGIN + CELL_MARGIN
+        x_body = MARGIN + COMPACT_LABEL_WIDTH + CELL_MARGIN
+        top = self.y
+        labels = [f"BT {label_style.select}"]
+        bodies = [f"BT {body_style.select}"]
+        for i, (label, text) in enumerate(rows):
+            y = top - i * body_style.line_height - body_style.baseline
+            if label:
+                labels.append(f"1 0 0 1 {x_label:.2f} {y:.2f} Tm {label} Tj")
+            bodies.append(f"1 0 0 1 {x_body:.2f} {y:.2f} Tm {text} Tj")
+        labels.append("ET")
+        bodies.append("ET")
+        self.parts.append(" ".join(labels))
+        self.parts.append(" ".join(bodies))
+        self.y = top - len(rows) * body_style.line_height
+
+    def shade(self, height: float, gray: float = 0.9) -> None:
+        """Fill a band across the text width from the current position down."""
+        self.parts.append(f"{gray:.2f} g {MARGIN:.2f} {self.y - height:.2f} {TEXT_WIDTH:.2f} {height:.2f} re f 0 g")
+
+def session_lines(session: Dict[str, Any]) -> List[Tuple[str, List[str]]]:
+    """(section, exercise line literals) of a session in print order, skipping empty optional sections."""
+    sections = session["sections"]
+    lines = []
+    for section in SECTION_ORDER:
+        exercises = sections.get(section)
+        if exercises or section in ("warmup", "main", "cooldown"):
+            lines.append((section, [exercise_literal(section, tuple(exercise.items())) for exercise in exercises or ()]))
+    return lines
+
+def write_standard_session(flow: PageFlow, heading: str, lines: List[Tuple[str, List[str]]]) -> None:
+    """A session heading, then each section heading and its exercise lines."""
+    flow.lines(SESSION_HEADING, [heading])
+    for section, literals in lines:
+        flow.lines(SECTION_HEADING, [SECTION_LITERALS[section]])
+        flow.lines(BODY, literals)
+
+@lru_cache(maxsize=256)
+def standard_page_template(shape: Tuple[Tuple[str, int], ...]) -> Optional[str]:
+    """
+    Content stream of a session page for a shape (exercise count per section) with
+    %s in place of the heading and exercise lines, laid out once per shape.
+    None when such a session does not fit on one page.
+    """
+    document = PdfDocument()
+    flow = PageFlow(document)
+    flow.new_page()
+    write_standard_session(flow, "%s", [(section, ["%s"] * count) for section, count in shape])
+    flow.finish_page()
+    return document.pages[0] if len(document.pages) == 1 else None
+
+def layout_standard(flow: PageFlow, workout_plan: Dict) -> None:
+    """One session per page, as the original FPDF layout printed it."""
+    for session in workout_plan["sessions"]:
+        heading = pdf_string(f"Session {session['session']} - {session['date']}")
+        lines = session_lines(session)
+        template = standard_page_template(tuple((section, len(literals)) for section, literals in lines))
+        if template is None:
+            flow.new_page()
+            write_standard_session(flow, heading, lines)
+        else:
+            flow.finish_page()
+            flow.document.add_page(template % (heading, *chain.from_iterable(literals for _, literals in lines)))
+
+def write_compact_session(flow: PageFlow, heading: str, lines: List[Tuple[str, List[str]]]) -> None:
+    """A shaded session heading over a two-column table of section labels and exercise lines."""
+    rows = []
+    for section, literals in lines:
+        label = COMPACT_SECTION_LITERALS[section]
+        for literal in literals:
+            rows.append((label, literal))
+            label = ""
+    flow.shade(COMPACT_SESSION_HEADING.line_height)
+    flow.lines(COMPACT_SESSION_HEADING, [heading])
+    flow.table_row_block(COMPACT_LABEL, COMPACT_BODY, rows)
+
+@lru_cache(maxsize=256)
+def compact_block_template(shape: Tuple[Tuple[str, int], ...]) -> str:
+    """
+    Content of a compact session table for a shape, laid out once with its top at
+    y=0 and %s in place of the heading and exercise lines; placed on a page by translation.
+    """
+    flow = PageFlow(PdfDocument())
+    flow.parts = []
+    flow.y = 0.0
+    write_compact_session(flow, "%s", [(section, ["%s"] * count) for section, count in shape])
+    return "\n".join(flow.parts)
+
+def layout_compact(flow: PageFlow, workout_plan: Dict) -> None:
+    """Sessions as consecutive tables, as many per page as fit (a session is never split)."""
+    for session in workout_plan["sessions"]:
+        heading = pdf_string(f"Session {session['session']} - {session['date']}")
+        lines = session_lines(session)
+        template = compact_block_template(tuple((section, len(literals)) for section, literals in lines))
+        height = COMPACT_SESSION_HEADING.line_height + sum(len(literals) for _, literals in lines) * COMPACT_BODY.line_height
+        flow.ensure_room(height)
+        content = template % (heading, *chain.from_iterable(literals for _, literals in lines))
+        flow.parts.append(f"q 1 0 0 1 0 {flow.y:.2f} cm\n{content}\nQ")
+        flow.y -= height + COMPACT_SESSION_GAP
+
+def layout_plan(workout_plan: Dict, layout: str = "standard") -> PdfDocument:
+    """Lay out a workout plan as a PdfDocument in one of PDF_LAYOUTS."""
+    if layout not in PDF_LAYOUTS:
+        raise ValueError(f"Unknown PDF layout {layout!r} (expected one of {', '.join(PDF_LAYOUTS)})")
+
+    document = PdfDocument(title=f"Workout Plan for {workout_plan['client_name']}")
+    flow = PageFlow(document)
+
+    # Title page header: client, goal and experience
+    flow.new_page()
+    flow.centered(TITLE, f"Workout Plan for {workout_plan['client_name']}")
+    flow.lines(INFO, [
+        pdf_string(f"Goal: {workout_plan['goal'].replace('_', ' ').title()}"),
+        pdf_string(f"Experience: {workout_plan['experience'].title()}"),
+    ])
+
+    if layout == "compact":
+        flow.y -= COMPACT_SESSION_GAP
+        layout_compact(flow, workout_plan)
+    else:
+        layout_standard(flow, workout_plan)
+    flow.finish_page()
+    return document
@@ -0,0 +1,417 @@
+import random
+from datetime import date, timedelta
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from app.engine.formats import PlanFormat
+from app.engine.progression import scheme_for_goal
+from app.engine.selection import DEFAULT_FREE_EQUIPMENT, pick_exercises
+from app.engine.splits import (
+    CIRCUIT_COUNT,
+    COOLDOWN_COUNT,
+    DEFAULT_WEEKS,
+    MAX_WEEKS,
+    WARMUP_COUNT,
+    ScheduledSession,
+    plan_schedule,
+)
+from app.utils.candidate_pool import CandidatePool, get_candidate_pool
+from app.utils.catalog import get_catalog
+from app.utils.lru import LRUCache
+from app.utils.metrics import stage_timer
+from app.utils.plan_cache import PLAN_INDEX_SIZE, make_plan_id, new_seed, next_monday
+from app.utils.plan_store import HEADER_FORMAT, PlanStore
+from app.utils.serialization import encode_json
+
+# Plan fields sent on the first line of a streamed plan
+NDJSON_HEADER_FIELDS = ("plan_id", "seed", "client_name", "goal", "experience")
+
+def load_exercises():
+    """Load exercises from the shared catalog (parsed once, reloaded when the file changes)."""
+    return get_catalog().exercises
+
+def profile_fields(user_profile: Any) -> Dict[str, Any]:
+    """Return a profile as a plain dict, whether it is a UserProfile model or already a dict."""
+    if isinstance(user_profile, dict):
+        return user_profile
+    return user_profile.model_dump()
+
+def plan_seed(profile: Dict[str, Any]) -> int:
+    """Return the profile's seed, or a fresh one if it did not send a usable seed."""
+    seed = profile.get("seed")
+    if isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0:
+        return seed
+    return new_seed()
+
+def plan_weeks(profile: Dict[str, Any]) -> int:
+    """Return the program length in weeks asked for by the profile (default 4)."""
+    weeks = profile.get("weeks")
+    if weeks is None:
+        return DEFAULT_WEEKS
+    if not isinstance(weeks, int) or isinstance(weeks, bool) or not 1 <= weeks <= MAX_WEEKS:
+        raise ValueError(f"weeks must be a whole number from 1 to {MAX_WEEKS}")
+    return weeks
+
+def session_rng(seed: int, session_number: int) -> random.Random:
+    """
+    Random stream of one session, derived from the plan seed and the session
+    number, so any session can be generated without generating the ones before it.
+    """
+    return random.Random((seed << 16) | session_number)
+
+class LazyPlan:
+    """
+    A plan whose sessions are generated on demand. Every session depends only on
+    the profile, the seed and its place in the schedule, so a week of a 24-week
+    program costs the same as a week of a 4-week one.
+    """
+
+    def __init__(self,
+                 engine: "PlanEngine",
+                 profile: Dict[str, Any],
+                 seed: int,
+                 start_date: date,
+                 pool: Optional[CandidatePool] = None):
+        self.engine = engine
+        self.profile = profile
+        self.seed = seed
+        self.start_date = start_date
+        self.weeks = plan_weeks(profile)
+        self.days_per_week = profile["days_per_week"]
+        self.plan_id = make_plan_id(profile, seed, start_date, self.weeks)
+        self._pool = pool
+
+    @property
+    def pool(self) -> CandidatePool:
+        """Candidate pool of the plan, looked up on first use."""
+        if self._pool is None:
+            self._pool = self.engine.candidate_pool(self.profile)
+        return self._pool
+
+    @pool.setter
+    def pool(self, pool: CandidatePool) -> None:
+        self._pool = pool
+
+    @property
+    def schedule(self) -> Tuple[ScheduledSession, ...]:
+        """Session slots of the whole plan (shared, compiled once per days_per_week and weeks)."""
+        return plan_schedule(self.days_per_week, self.weeks)
+
+    def __len__(self) -> int:
+        return self.days_per_week * self.weeks
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_sessions()
+
+    def header(self) -> Dict[str, Any]:
+        """Plan fields without the sessions."""
+        return {
+            "plan_id": self.plan_id,
+            "seed": self.seed,
+            "client_name": self.profile["name"],
+            "goal": self.profile["goal"],
+            "experience": self.profile["experience"],
+            "weeks": self.weeks,
+            "days_per_week": self.days_per_week,
+            "session_count": len(self)
+        }
+
+    def iter_sessions(self, first: int = 1, last: Optional[int] = None) -> Iterator[Dict]:
+        """Generate sessions first..last (1-based, inclusive; default: to the end of the plan)."""
+        return self.engine.iter_scheduled_sessions(
+            self.profile, self.schedule[first - 1:last], self.pool, self.seed, self.start_date
+        )
+
+    def record(self) -> Dict[str, Any]:
+        """What the plan store keeps to rebuild the plan in another process."""
+        return {
+            "plan_id": self.plan_id,
+            "client_name": self.profile["name"],
+            "profile": self.profile,
+            "seed": self.seed,
+            "start_date": self.start_date.isoformat(),
+        }
+
+    def sessions(self, first: int = 1, last: Optional[int] = None) -> List[Dict]:
+        """Sessions first..last as a list."""
+        return list(self.iter_sessions(first, last))
+
+    def week(self, week_number: int) -> List[Dict]:
+        """
+        The sessions of one week. Taken from the cached full plan when there is one,
+        otherwise only that week's sessions are generated.
+        """
+        if not 1 <= week_number <= self.weeks:
+            raise ValueError(f"Week {week_number} is outside this {self.weeks}-week plan")
+        first = (week_number - 1) * self.days_per_week + 1
+        last = week_number * self.days_per_week
+
+        workout_plan = self.engine.plan_cache.get(self.plan_id)
+        if workout_plan is not None:
+            return workout_plan["sessions"][first - 1:last]
+        return self.sessions(first, last)
+
+class PlanEngine:
+    """
+    Plan generation shared by the FastAPI and Flask front ends. Each front end
+    creates one engine with its output format, the equipment every user is
+    assumed to have, its plan cache and optionally a persistent plan store;
+    selection, caching and timing are common.
+    """
+
+    def __init__(self,
+                 plan_format: PlanFormat,
+                 plan_cache: LRUCache,
+                 free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT,
+                 validator: Optional[Callable[..., Any]] = None,
+                 validate: bool = False,
+                 store: Optional[PlanStore] = None):
+        self.plan_format = plan_format
+        self.plan_cache = plan_cache
+        # Generated plans are written here and read back by ID from any process
+        self.store = store
+        self.free_equipment = tuple(free_equipment)
+        # Called as validator(**plan) when validation is on, e.g. a pydantic model
+        self.validator = validator
+        self.validate = validate
+        # Lazy plans by plan ID, for fetching single weeks later
+        self.plans = LRUCache(maxsize=PLAN_INDEX_SIZE)
+
+    def candidate_pool(self, profile: Dict[str, Any], exercises: Optional[List[Dict[str, Any]]] = None) -> CandidatePool:
+        """Candidate exercises for a profile, filtered once for the whole plan."""
+        if exercises is None:
+            exercises = load_exercises()
+        return get_candidate_pool(exercises, profile["equipment"], profile["experience"], self.free_equipment)
+
+    def plan(self,
+             user_profile: Any,
+             pool: Optional[CandidatePool] = None,
+             start_date: Optional[date] = None) -> LazyPlan:
+        """
+        Create a lazy plan for a profile and register it by plan ID, in this process
+        and in the plan store. Nothing is generated until its sessions or weeks are asked for.
+        """
+        profile = profile_fields(user_profile)
+        if start_date is None:
+            # Plans start on the first Monday from today
+            start_date = next_monday()
+        lazy_plan = LazyPlan(self, profile, plan_seed(profile), start_date, pool)
+        if self.store is not None and lazy_plan.plan_id not in self.plans:
+            # So that a week can be fetched from whichever worker process gets the request
+            self.store.put(HEADER_FORMAT, lazy_plan.record())
+        self.plans.put(lazy_plan.plan_id, lazy_plan)
+        return lazy_plan
+
+    def get_plan(self, plan_id: str) -> Optional[LazyPlan]:
+        """
+        A registered plan: from this process, or rebuilt from the plan store when
+        another process registered it. None if it is unknown.
+        """
+        lazy_plan = self.plans.get(plan_id)
+        if lazy_plan is None and self.store is not None:
+            with stage_timer("plan_store"):
+                record = self.store.get(HEADER_FORMAT, plan_id)
+            if record is not None:
+                lazy_plan = LazyPlan(self, record["profile"], record["seed"], date.fromisoformat(record["start_date"]))
+                self.plans.put(plan_id, lazy_plan)
+        return lazy_plan
+
+    def iter_sessions(self,
+                      user_profile: Any,
+                      pool: Optional[CandidatePool] = None,
+                      seed: Optional[int] = None,
+                      start_date: Optional[date] = None) -> Iterator[Dict]:
+        """
+        Generate the workout sessions of a plan one at a time in the engine's format.
+        Each session draws from its own random stream derived from the seed (default:
+        the profile's seed), so the same seed and start date always produce the same plan.
+        """
+        profile = profile_fields(user_profile)
+        if seed is None:
+            seed = plan_seed(profile)
+        if start_date is None:
+            start_date = next_monday()
+        schedule = plan_schedule(profile["days_per_week"], plan_weeks(profile))
+        return self.iter_scheduled_sessions(profile, schedule, pool, seed, start_date)
+
+    def iter_scheduled_sessions(self,
+                                profile: Dict[str, Any],
+                                schedule: Iterable[ScheduledSession],
+                                pool: Optional[CandidatePool],
+                                seed: int,
+                                start_date: date) -> Iterator[Dict]:
+        """Generate the given session slots of a plan."""
+        plan_format = self.plan_format
+
+        if pool is None:
+            pool = self.candidate_pool(profile)
+
+        # Circuits are for intermediate and advanced users
+        circuits = profile["experience"] in ["intermediate", "advanced"]
+        # Sets, reps and rest follow the goal's progression scheme
+        scheme = scheme_for_goal(profile["goal"])
+
+        for scheduled in schedule:
+            session_number = scheduled.session_number
+            week_number = scheduled.week_number
+            rng = session_rng(seed, session_number)
+
+            # The template picks the main exercises of its split straight from the pool
+            main_exercises = scheduled.template.pick_main(pool, rng)
+            warmup_exercises = pick_exercises(pool.warmup, WARMUP_COUNT, rng)
+            cooldown_exercises = pick_exercises(pool.cooldown, COOLDOWN_COUNT, rng)
+
+            # Create exercise entries with progressive overload
+            sections = {
+                "warmup": [plan_format.exercise(ex, session_number, week_number, scheme) for ex in warmup_exercises],
+                "main": [plan_format.exercise(ex, session_number, week_number, scheme) for ex in main_exercises],
+                "cooldown": [plan_format.exercise(ex, session_number, week_number, scheme) for ex in cooldown_exercises],
+            }
+
+            if circuits and scheduled.circuit:
+                circuit_candidates = pick_exercises(pool.core, CIRCUIT_COUNT, rng)
+                sections["circuit"] = [
+                    plan_format.exercise(ex, session_number, week_number, scheme) for ex in circuit_candidates
+                ]
+
+            session_date = start_date + timedelta(days=scheduled.day_offset)
+            yield plan_format.session(session_number, session_date, sections)
+
+    def generate_plan(self,
+                      user_profile: Any,
+                      pool: Optional[CandidatePool] = None,
+                      validate: Optional[bool] = None) -> Dict:
+        """
+        Generate the complete workout plan as a dictionary.
+        Plans are cached by plan ID (profile, weeks, seed and start date), so a preview
+        followed by PDF and JSON exports with the returned seed is generated once.
+        The returned dict may be shared with the cache and must not be mutated.
+        """
+        lazy_plan = self.plan(user_profile, pool)
+        # Only a plan asked for by its seed can have been generated before
+        seeded = lazy_plan.seed == lazy_plan.profile.get("seed")
+        return self.complete_plan(lazy_plan, validate, lookup_store=seeded)
+
+    def complete_plan(self,
+                      lazy_plan: LazyPlan,
+                      validate: Optional[bool] = None,
+                      lookup_store: bool = True) -> Dict:
+        """
+        The complete plan of a lazy plan: from the plan cache, from the plan store,
+        or generated (and then cached and stored).
+        """
+        plan_id = lazy_plan.plan_id
+
+        workout_plan = self.plan_cache.get(plan_id)
+        if workout_plan is not None:
+            return workout_plan
+        if lookup_store:
+            workout_plan = self.stored_plan(plan_id)
+            if workout_plan is not None:
+                return workout_plan
+
+        # Each stage is timed separately for /metrics
+        if lazy_plan._pool is None:
+            with stage_timer("catalog"):
+                exercises = load_exercises()
+            with stage_timer("candidate_pool"):
+                lazy_plan.pool = self.candidate_pool(lazy_plan.profile, exercises)
+
+        with stage_timer("sessions"):
+            sessions = lazy_plan.sessions()
+
+        workout_plan = {
+            "plan_id": plan_id,
+            "seed": lazy_plan.seed,
+            "client_name": lazy_plan.profile["name"],
+            "goal": lazy_plan.profile["goal"],
+            "experience": lazy_plan.profile["experience"],
+            "sessions": sessions
+        }
+
+        if self.validator is not None and (self.validate if validate is None else validate):
+            with stage_timer("validate"):
+                self.validator(**workout_plan)
+
+        self.plan_cache.put(plan_id, workout_plan)
+        if self.store is not None:
+            self.store.put(self.plan_format.name, workout_plan)
+
+        return workout_plan
+
+    def stored_plan(self, plan_id: str) -> Optional[Dict]:
+        """A plan from the plan store (cached once read), or None."""
+        if self.store is None:
+            return None
+        with stage_timer("plan_store"):
+            workout_plan = self.store.get(self.plan_format.name, plan_id)
+        if workout_plan is not None:
+            self.plan_cache.put(plan_id, workout_plan)
+        return workout_plan
+
+    def load_plan(self, plan_id: str) -> Optional[Dict]:
+        """
+        A complete plan by ID: cached, stored by any process, or generated from a
+        plan registered with plan() by any process. None when the ID is unknown.
+        """
+        workout_plan = self.plan_cache.get(plan_id)
+        if workout_plan is None:
+            workout_plan = self.stored_plan(plan_id)
+        if workout_plan is None:
+            lazy_plan = self.get_plan(plan_id)
+            if lazy_plan is not None:
+                workout_plan = self.complete_plan(lazy_plan, lookup_store=False)
+        return workout_plan
+
+    def find_plans(self, client_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Stored plans (ID, client name, creation time), newest first, optionally of one client."""
+        if self.store is None:
+            return []
+        return self.store.find(self.plan_format.name, client_name, limit)
+
+    def generate_plans(self, user_profiles: List[Any]) -> List[Dict]:
+        """Generate plans for many profiles, sharing one candidate pool per (equipment, experience, days_per_week) group."""
+        exercises = load_exercises()
+        profiles = [profile_fields(user_profile) for user_profile in user_profiles]
+
+        groups = {}
+        for position, profile in enumerate(profiles):
+            key = (frozenset(profile["equipment"]), profile["experience"], profile["days_per_week"])
+            groups.setdefault(key, []).append(position)
+
+        plans = [None] * len(profiles)
+        for positions in groups.values():
+            pool = self.candidate_pool(profiles[positions[0]], exercises)
+            for position in positions:
+                plans[position] = self.generate_plan(profiles[position], pool)
+
+        return plans
+
+    def iter_plan_ndjson(self, user_profile: Any, pool: Optional[CandidatePool] = None) -> Iterator[bytes]:
+        """
+        Stream a plan as newline-delimited JSON: a header line with the plan ID,
+        seed and client fields, then one line per session as soon as it is generated.
+        """
+        lazy_plan = self.plan(user_profile, pool)
+        header = lazy_plan.header()
+
+        yield encode_json({field: header[field] for field in NDJSON_HEADER_FIELDS}) + b"\n"
+
+        try:
+            for session in lazy_plan:
+                yield encode_json(session) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield encode_json({"error": str(e)}) + b"\n"
+
+    def iter_plans_ndjson(self, user_profiles: Iterable[Any]) -> Iterator[bytes]:
+        """Stream one complete plan per line, generating each plan only when it is about to be sent."""
+        exercises = load_exercises()
+
+        try:
+            for user_profile in user_profiles:
+                profile = profile_fields(user_profile)
+                pool = self.candidate_pool(profile, exercises)
+                yield encode_json(self.generate_plan(profile, pool)) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield encode_json({"error": str(e)}) + b"\n"
@@ -0,0 +1,136 @@
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+# Field order of Exercise.model_dump()
+EXERCISE_FIELDS = ("name", "sets", "reps", "rest", "tempo", "duration")
+
+# Programs progress in blocks of this many weeks; longer programs repeat the
+# block, so reps stay in a sensible range over a 24-week program
+BLOCK_WEEKS = 4
+
+class ProgressionScheme:
+    """
+    How the prescription of a main exercise changes over a block for one kind
+    of goal: its rep range, how fast reps are added, when a set is added and
+    the rest between sets. Warmups and cooldowns always use the standard scheme.
+    """
+
+    def __init__(self,
+                 name: str,
+                 rep_scale: float = 1.0,
+                 min_reps: int = 1,
+                 reps_per_week: int = 2,
+                 extra_set_week: Optional[int] = 3,
+                 rest: str = "60s"):
+        self.name = name
+        self.rep_scale = rep_scale
+        self.min_reps = min_reps
+        self.reps_per_week = reps_per_week
+        self.extra_set_week = extra_set_week
+        self.rest = rest
+
+    def prescribe(self, exercise_data: Dict[str, Any], week_number: int) -> Dict[str, Any]:
+        """Return the fields of an exercise with progressive overload for the given week."""
+        block_week = (week_number - 1) % BLOCK_WEEKS + 1
+        main = exercise_data["type"] == "main"
+        scheme = self if main else STANDARD_SCHEME
+
+        exercise_obj = {"name": exercise_data["name"]}
+
+        if "sets" in exercise_data:
+            # Add a set from the scheme's extra set week
+            sets = exercise_data["sets"]
+            if scheme.extra_set_week is not None and block_week >= scheme.extra_set_week:
+                sets += 1
+            exercise_obj["sets"] = sets
+
+        if "reps" in exercise_data:
+            reps = exercise_data["reps"]
+            if isinstance(reps, int):
+                # Move the base reps into the scheme's range, then add reps every week
+                if scheme.rep_scale != 1.0:
+                    reps = max(scheme.min_reps, int(reps * scheme.rep_scale + 0.5))
+                reps += (block_week - 1) * scheme.reps_per_week
+            exercise_obj["reps"] = reps
+
+        if "duration" in exercise_data:
+            exercise_obj["duration"] = exercise_data["duration"]
+
+        # Add rest time for main exercises
+        if main:
+            exercise_obj["rest"] = scheme.rest
+
+            # For intermediate and advanced, add tempo
+            if exercise_data["level"] in ["intermediate", "advanced"]:
+                exercise_obj["tempo"] = "2-1-1"
+
+        return exercise_obj
+
+STANDARD_SCHEME = ProgressionScheme("standard")
+
+PROGRESSION_SCHEMES = {scheme.name: scheme for scheme in (
+    STANDARD_SCHEME,
+    # Heavier work: about half the reps, added slowly, an extra set from week 2 and longer rest
+    ProgressionScheme("strength", rep_scale=0.5, min_reps=3, reps_per_week=1, extra_set_week=2, rest="120s"),
+    # Lighter work: half again as many reps, added faster, no extra set and short rest
+    ProgressionScheme("endurance", rep_scale=1.5, reps_per_week=3, extra_set_week=None, rest="30s"),
+)}
+
+# Goals with their own progression; every other goal uses the standard scheme
+GOAL_SCHEMES = {
+    "strength": "strength",
+    "endurance": "endurance",
+}
+
+def scheme_for_goal(goal: Any) -> str:
+    """Name of the progression scheme for a goal (a Goal enum member or its value)."""
+    return GOAL_SCHEMES.get(getattr(goal, "value", goal), STANDARD_SCHEME.name)
+
+class FullPrescription(dict):
+    """
+    Every Exercise field, None when unset, carrying its compact form (the same
+    fields without the Nones) so compact payloads need not rebuild it per plan.
+    """
+
+    __slots__ = ("compact",)
+
+def full_shape(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Every Exercise field, None when unset."""
+    prescription_obj = FullPrescription((field, fields.get(field)) for field in EXERCISE_FIELDS)
+    prescription_obj.compact = {field: fields[field] for field in EXERCISE_FIELDS if field in fields}
+    return prescription_obj
+
+def sparse_shape(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the fields that apply."""
+    return fields
+
+# Output shapes of the plan formats, by format name
+PRESCRIPTION_SHAPES = {"full": full_shape, "sparse": sparse_shape}
+
+def progression_table(exercise_data: Dict[str, Any]) -> Dict[Tuple[str, str], Tuple[Dict[str, Any], ...]]:
+    """
+    Prescriptions of one exercise for every week of a block, by (format name,
+    scheme name). The entries are shared by every session that uses the
+    exercise, so they must not be mutated.
+    """
+    table = {}
+    for scheme_name, scheme in PROGRESSION_SCHEMES.items():
+        weeks = [scheme.prescribe(exercise_data, week_number) for week_number in range(1, BLOCK_WEEKS + 1)]
+        for format_name, shape in PRESCRIPTION_SHAPES.items():
+            table[format_name, scheme_name] = tuple(shape(fields) for fields in weeks)
+    return table
+
+def build_progression_tables(records: Iterable[Any]) -> None:
+    """Attach a progression table to every catalog record (run once per catalog load)."""
+    for record in records:
+        record.progression = progression_table(record)
+
+def prescription(exercise_data: Dict[str, Any], week_number: int, format_name: str, scheme_name: str) -> Dict[str, Any]:
+    """
+    An exercise's prescription for a week in a format's shape: the shared table
+    entry for catalog records, computed on the spot for plain exercise dicts.
+    """
+    table = getattr(exercise_data, "progression", None)
+    if table is not None:
+        return table[format_name, scheme_name][(week_number - 1) % BLOCK_WEEKS]
+    fields = PROGRESSION_SCHEMES[scheme_name].prescribe(exercise_data, week_number)
+    return PRESCRIPTION_SHAPES[format_name](fields)
@@ -0,0 +1,122 @@
+import random
+from typing import List, Dict, Any, Iterable
+
+from app.utils.candidate_pool import get_candidate_pool
+from app.utils.exercise_index import allowed_levels
+
+# Equipment every user is assumed to have
+DEFAULT_FREE_EQUIPMENT = ("bodyweight",)
+
+def filter_exercises(exercises: List[Dict[str, Any]], 
+                    equipment: List[str], 
+                    exercise_type: str = None,
+                    level: str = None,
+                    muscle_group: str = None,
+                    free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT):
+    """Filter exercises based on equipment, type, level, and muscle group."""
+    
+    # Catalog lists carry a precomputed index, so only the matching buckets are visited
+    index = getattr(exercises, "exercise_index", None)
+    if index is not None:
+        allowed_equipment = set(equipment)
+        allowed_equipment.update(free_equipment)
+        positions = index.lookup(allowed_equipment, exercise_type, allowed_levels(level), muscle_group)
+        return [exercises[i] for i in positions]
+    
+    # Filter exercises that match any equipment in the list or need no equipment
+    filtered = [ex for ex in exercises if ex["equipment"] in equipment or ex["equipment"] in free_equipment]
+    
+    # If type is specified, filter by type
+    if exercise_type:
+        filtered = [ex for ex in filtered if ex["type"] == exercise_type]
+    
+    # If level is specified, filter by level
+    levels = allowed_levels(level)
+    if levels is not None:
+        filtered = [ex for ex in filtered if ex["level"] in levels]
+    
+    # If muscle group is specified, filter by muscle group
+    if muscle_group:
+        filtered = [ex for ex in filtered if ex["muscle_group"] == muscle_group]
+    
+    return filtered
+
+def pick_balanced_exercises(primary: List[Dict[str, Any]], 
+                            secondary: List[Dict[str, Any]], 
+                            count: int,
+                            rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Pick 2 exercises from the primary group and 1 from the secondary, topped up to count."""
+    # Try to select a balanced mix
+    selected = []
+    if primary:
+        selected.extend(rng.sample(primary, min(2, len(primary))))
+    if secondary:
+        selected.extend(rng.sample(secondary, min(1, len(secondary))))
+    
+    # If we don't have enough, add more from any group
+    all_options = primary + secondary
+    remaining = count - len(selected)
+    if remaining > 0 and all_options:
+        # Make sure we don't select duplicates (identity set instead of comparing whole exercises)
+        chosen = {id(ex) for ex in selected}
+        remaining_options = [ex for ex in all_options if id(ex) not in chosen]
+        if remaining_options:
+            selected.extend(rng.sample(remaining_options, min(remaining, len(remaining_options))))
+    
+    return selected
+
+def pick_exercises(options: List[Dict[str, Any]], count: int, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Pick up to count distinct exercises from a candidate list."""
+    selected = []
+    if options:
+        selected.extend(rng.sample(options, min(count, len(options))))
+    
+    return selected
+
+def select_push_exercises(exercises: List[Dict[str, Any]], 
+                         equipment: List[str], 
+                         level: str, 
+                         count: int = 3,
+                         free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select push exercises (chest, shoulders, and triceps)."""
+    pool = get_candidate_pool(exercises, equipment, level, free_equipment)
+    return pick_balanced_exercises(pool.chest, pool.shoulders, count)
+
+def select_pull_exercises(exercises: List[Dict[str, Any]], 
+                         equipment: List[str], 
+                         level: str, 
+                         count: int = 3,
+                         free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select pull exercises (back and biceps)."""
+    pool = get_candidate_pool(exercises, equipment, level, free_equipment)
+    return pick_balanced_exercises(pool.back, pool.arms, count)
+
+def select_leg_exercises(exercises: List[Dict[str, Any]], 
+                         equipment: List[str], 
+                         level: str, 
+                         count: int = 3,
+                         free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select leg exercises."""
+    return pick_exercises(get_candidate_pool(exercises, equipment, level, free_equipment).legs, count)
+
+def select_core_exercises(exercises: List[Dict[str, Any]], 
+                         equipment: List[str], 
+                         level: str, 
+                         count: int = 2,
+                         free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select core exercises."""
+    return pick_exercises(get_candidate_pool(exercises, equipment, level, free_equipment).core, count)
+
+def select_warmup_exercises(exercises: List[Dict[str, Any]],
+                            equipment: List[str],
+                            count: int = 3,
+                            free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select warmup exercises."""
+    return pick_exercises(get_candidate_pool(exercises, equipment, None, free_equipment).warmup, count)
+
+def select_cooldown_exercises(exercises: List[Dict[str, Any]],
+                              equipment: List[str],
+                              count: int = 3,
+                              free_equipment: Iterable[str] = DEFAULT_FREE_EQUIPMENT) -> List[Dict[str, Any]]:
+    """Select cooldown exercises."""
+    return pick_exercises(get_candidate_pool(exercises, equipment, None, free_equipment).cooldown, count)
@@ -0,0 +1,104 @@
+from functools import lru_cache
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.engine.selection import pick_balanced_exercises, pick_exercises
+
+# Main exercise slots per split: (primary group, secondary group or None, count).
+# Two groups mean "2 from the primary, 1 from the secondary, topped up from both".
+# Adding a split is a new entry here (and in SPLIT_ROTATIONS to schedule it).
+SPLIT_DEFINITIONS = {
+    "push": (("chest", "shoulders", 3), ("core", None, 1)),
+    "pull": (("back", "arms", 3), ("core", None, 1)),
+    "legs": (("legs", None, 3), ("core", None, 1)),
+    "upper": (("chest", "shoulders", 2), ("back", "arms", 2), ("core", None, 1)),
+    "lower": (("legs", None, 4), ("core", None, 1)),
+    "full": (("chest", "shoulders", 1), ("back", "arms", 1), ("legs", None, 1), ("core", None, 1)),
+}
+
+# Weekly split rotation by days per week; anything else is full body
+SPLIT_ROTATIONS = {
+    3: ("push", "pull", "legs"),
+    4: ("upper", "lower"),
+}
+DEFAULT_ROTATION = ("full",)
+
+# Program length in weeks: 4 unless the profile asks for a longer program
+DEFAULT_WEEKS = 4
+MAX_WEEKS = 24
+
+# Exercises per warmup, cooldown and circuit
+WARMUP_COUNT = 3
+COOLDOWN_COUNT = 3
+CIRCUIT_COUNT = 3
+
+# Every third session gets a circuit (for intermediate and advanced users)
+CIRCUIT_EVERY = 3
+
+class SessionTemplate:
+    """
+    A split compiled for direct execution: the pool attributes to read and the
+    picker to call for every main exercise slot, resolved once instead of per session.
+    """
+
+    __slots__ = ("name", "slots")
+
+    def __init__(self, name: str, definition: Tuple[Tuple[str, Optional[str], int], ...]):
+        self.name = name
+        self.slots = tuple(
+            (attrgetter(primary), attrgetter(secondary) if secondary else None, count)
+            for primary, secondary, count in definition
+        )
+
+    def pick_main(self, pool, rng) -> List[Dict[str, Any]]:
+        """Pick the main exercises of one session from a candidate pool."""
+        selected = []
+        for primary, secondary, count in self.slots:
+            if secondary is None:
+                selected.extend(pick_exercises(primary(pool), count, rng))
+            else:
+                selected.extend(pick_balanced_exercises(primary(pool), secondary(pool), count, rng))
+        return selected
+
+    def __repr__(self) -> str:
+        return f"SessionTemplate({self.name!r})"
+
+SESSION_TEMPLATES = {name: SessionTemplate(name, definition) for name, definition in SPLIT_DEFINITIONS.items()}
+
+class ScheduledSession:
+    """One session slot of a plan: its number, week, day offset, template and whether it has a circuit."""
+
+    __slots__ = ("session_number", "week_number", "day_offset", "template", "circuit")
+
+    def __init__(self, session_number: int, week_number: int, day_offset: int, template: SessionTemplate, circuit: bool):
+        self.session_number = session_number
+        self.week_number = week_number
+        self.day_offset = day_offset
+        self.template = template
+        self.circuit = circuit
+
+def split_schedule(days_per_week: int, session_count: int) -> List[str]:
+    """Split type for every session of a plan."""
+    rotation = SPLIT_ROTATIONS.get(days_per_week, DEFAULT_ROTATION)
+    return [rotation[i % len(rotation)] for i in range(session_count)]
+
+def day_offset(days_per_week: int, session_index: int) -> int:
+    """Days from the plan's start date to a session (skipping weekends if days_per_week <= 5)."""
+    if days_per_week <= 5:
+        return session_index + (session_index // 5) * 2
+    return session_index
+
+@lru_cache(maxsize=64)
+def plan_schedule(days_per_week: int, weeks: int = DEFAULT_WEEKS) -> Tuple[ScheduledSession, ...]:
+    """The session slots of a plan, compiled once per (days_per_week, weeks)."""
+    session_count = days_per_week * weeks
+    return tuple(
+        ScheduledSession(
+            session_number=i + 1,
+            week_number=(i // days_per_week) + 1,
+            day_offset=day_offset(days_per_week, i),
+            template=SESSION_TEMPLATES[split_type],
+            circuit=(i + 1) % CIRCUIT_EVERY == 0,
+        )
+        for i, split_type in enumerate(split_schedule(days_per_week, session_count))
+    )
@@ -0,0 +1,256 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only this engine needs it
+    np = None
+
+from app.engine.planner import PlanEngine, load_exercises, plan_seed, plan_weeks, profile_fields
+from app.engine.progression import scheme_for_goal
+from app.engine.splits import CIRCUIT_COUNT, COOLDOWN_COUNT, SPLIT_DEFINITIONS, WARMUP_COUNT, plan_schedule
+from app.utils.candidate_pool import MAIN_MUSCLE_GROUPS
+from app.utils.exercise_index import IndexedExerciseList, allowed_levels
+from app.utils.lru import LRUCache
+from app.utils.metrics import stage_timer
+from app.utils.plan_cache import make_plan_id, next_monday
+
+# Name mixed into plan IDs: the same seed draws a different plan here than in the PlanEngine
+ENGINE_NAME = "vector"
+
+def require_numpy():
+    """Raise a helpful error when numpy is not installed."""
+    if np is None:
+        raise ImportError("The vectorized engine requires numpy (pip install numpy)")
+
+class VectorCatalog:
+    """Catalog code columns as NumPy arrays, with mask-based candidate pools."""
+
+    def __init__(self, exercises: IndexedExerciseList):
+        require_numpy()
+        self.exercises = exercises
+        self.tables = exercises.columns.tables
+        self.codes = {
+            field: np.array(codes, dtype=np.uint16) for field, codes in exercises.columns.codes.items()
+        }
+
+    def mask(self, field: str, values: Iterable[str]) -> "np.ndarray":
+        """Boolean mask of exercises whose field is one of values."""
+        table = self.tables[field]
+        codes = [table.codes[value] for value in values if value in table.codes]
+        return np.isin(self.codes[field], codes)
+
+    def pools(self, equipment: Iterable[str], level: Optional[str], free_equipment: Iterable[str]) -> Dict[str, "np.ndarray"]:
+        """Exercise ids per candidate group for one (equipment, level) profile, as CandidatePool filters them."""
+        allowed = self.mask("equipment", set(equipment).union(free_equipment))
+        main = allowed & self.mask("type", ("main",))
+        levels = allowed_levels(level)
+        if levels is not None:
+            main &= self.mask("level", levels)
+
+        pools = {
+            muscle_group: np.flatnonzero(main & self.mask("muscle_group", (muscle_group,)))
+            for muscle_group in MAIN_MUSCLE_GROUPS
+        }
+        pools["warmup"] = np.flatnonzero(allowed & self.mask("type", ("warmup",)))
+        pools["cooldown"] = np.flatnonzero(allowed & self.mask("type", ("cooldown",)))
+        return pools
+
+_vector_catalogs = LRUCache(maxsize=2)
+
+def get_vector_catalog(exercises: Optional[List[Dict[str, Any]]] = None) -> VectorCatalog:
+    """Return the VectorCatalog for the given (default: current) catalog, building it once."""
+    if exercises is None:
+        exercises = load_exercises()
+    if not isinstance(exercises, IndexedExerciseList):
+        return VectorCatalog(IndexedExerciseList(exercises))
+
+    entry = _vector_catalogs.get(id(exercises), valid=lambda entry: entry[0] is exercises)
+    if entry is not None:
+        return entry[1]
+    vector_catalog = VectorCatalog(exercises)
+    _vector_catalogs.put(id(exercises), (exercises, vector_catalog))
+    return vector_catalog
+
+def random_keys(rngs: Sequence["np.random.Generator"], rows: int, size: int) -> "np.ndarray":
+    """
+    Uniform sort keys for rows draws from a pool of size exercises, for every plan
+    from its own generator, stacked plan by plan into (plans * rows, size).
+    """
+    if not rngs:
+        return np.empty((0, size))
+    return np.concatenate([rng.random((rows, size)) for rng in rngs])
+
+def smallest_keys(keys: "np.ndarray", count: int) -> "np.ndarray":
+    """
+    Columns of the count smallest keys of every row, in key order: a uniform draw
+    without replacement. argpartition keeps this linear in the pool size per row.
+    """
+    count = min(count, keys.shape[1])
+    if count <= 0:
+        return np.empty((keys.shape[0], 0), dtype=np.intp)
+    if count < keys.shape[1]:
+        picked = np.argpartition(keys, count - 1, axis=1)[:, :count]
+    else:
+        picked = np.broadcast_to(np.arange(count), keys.shape)
+    order = np.argsort(np.take_along_axis(keys, picked, axis=1), axis=1)
+    return np.take_along_axis(picked, order, axis=1)
+
+def sample_rows(rngs: Sequence["np.random.Generator"], pool: "np.ndarray", rows: int, count: int) -> "np.ndarray":
+    """Vectorized pick_exercises: up to count distinct ids from pool for each of rows sessions of every plan."""
+    return pool[smallest_keys(random_keys(rngs, rows, len(pool)), count)]
+
+def sample_balanced_rows(rngs: Sequence["np.random.Generator"],
+                         primary: "np.ndarray",
+                         secondary: "np.ndarray",
+                         rows: int,
+                         count: int) -> "np.ndarray":
+    """Vectorized pick_balanced_exercises: 2 primary + 1 secondary, topped up to count from the rest of both."""
+    primary_keys = random_keys(rngs, rows, len(primary))
+    secondary_keys = random_keys(rngs, rows, len(secondary))
+    primary_picks = smallest_keys(primary_keys, 2)
+    secondary_picks = smallest_keys(secondary_keys, 1)
+    selected = np.concatenate((primary[primary_picks], secondary[secondary_picks]), axis=1)
+
+    remaining = count - selected.shape[1]
+    if remaining > 0:
+        # Top up from the exercises not picked yet: mask the picked keys out and take the next smallest
+        keys = np.concatenate((primary_keys, secondary_keys), axis=1)
+        np.put_along_axis(keys, primary_picks, np.inf, axis=1)
+        np.put_along_axis(keys, secondary_picks + len(primary), np.inf, axis=1)
+        available = keys.shape[1] - selected.shape[1]
+        extra = smallest_keys(keys, min(remaining, available))
+        selected = np.concatenate((selected, np.concatenate((primary, secondary))[extra]), axis=1)
+    return selected
+
+class VectorEngine:
+    """
+    NumPy batch generation for a PlanEngine: the same plan identity, seeds, output
+    format, free equipment and validation, but every session of a group of similar
+    profiles is drawn in a few array operations instead of a random.sample call per
+    slot. Each plan draws from its own generator seeded with the plan seed, so a seed
+    reproduces its plan whatever else is in the batch. Requires the optional numpy dependency.
+    """
+
+    def __init__(self, engine: PlanEngine):
+        require_numpy()
+        self.engine = engine
+
+    def generate_plans(self,
+                       user_profiles: Sequence[Any],
+                       exercises: Optional[List[Dict[str, Any]]] = None,
+                       validate: Optional[bool] = None) -> List[Dict]:
+        """
+        Generate plans for many profiles, returned in input order. Profiles sharing
+        equipment, experience, days per week and weeks are drawn together.
+        """
+        vector_catalog = get_vector_catalog(exercises)
+        start_date = next_monday()
+        profiles = [profile_fields(user_profile) for user_profile in user_profiles]
+
+        groups = defaultdict(list)
+        for position, profile in enumerate(profiles):
+            key = (frozenset(profile["equipment"]), profile["experience"], profile["days_per_week"], plan_weeks(profile))
+            groups[key].append(position)
+
+        plans = [None] * len(profiles)
+        for (equipment, experience, days_per_week, weeks), positions in groups.items():
+            pools = vector_catalog.pools(equipment, experience, self.engine.free_equipment)
+            members = [profiles[position] for position in positions]
+            group_plans = self.generate_group(vector_catalog.exercises, pools, members, days_per_week, weeks, start_date)
+            for position, workout_plan in zip(positions, group_plans):
+                plans[position] = workout_plan
+
+        if self.engine.validator is not None and (self.engine.validate if validate is None else validate):
+            with stage_timer("validate"):
+                for workout_plan in plans:
+                    self.engine.validator(**workout_plan)
+        return plans
+
+    def generate_plan(self, user_profile: Any, validate: Optional[bool] = None) -> Dict:
+        """Generate a single plan with the vectorized engine."""
+        return self.generate_plans([user_profile], validate=validate)[0]
+
+    def generate_group(self,
+                       records: IndexedExerciseList,
+                       pools: Dict[str, "np.ndarray"],
+                       profiles: List[Dict[str, Any]],
+                       days_per_week: int,
+                       weeks: int,
+                       start_date: date) -> List[Dict]:
+        """Draw every session of every plan in a group of profiles with the same candidate pools and schedule."""
+        plan_format = self.engine.plan_format
+        schedule = plan_schedule(days_per_week, weeks)
+        seeds = [plan_seed(profile) for profile in profiles]
+        rngs = [np.random.default_rng(seed) for seed in seeds]
+        plan_count = len(profiles)
+        session_count = len(schedule)
+
+        # Sessions of each split, in order of first appearance, so every plan consumes its generator in the same order
+        sessions_by_split = {}
+        for index, scheduled in enumerate(schedule):
+            sessions_by_split.setdefault(scheduled.template.name, []).append(index)
+
+        # main[split] -> (plans, sessions of that split, exercises) id array
+        main = {}
+        for split_type, session_indexes in sessions_by_split.items():
+            rows = len(session_indexes)
+            draws = []
+            for primary, secondary, count in SPLIT_DEFINITIONS[split_type]:
+                if secondary is None:
+                    draws.append(sample_rows(rngs, pools[primary], rows, count))
+                else:
+                    draws.append(sample_balanced_rows(rngs, pools[primary], pools[secondary], rows, count))
+            selected = np.concatenate(draws, axis=1)
+            main[split_type] = selected.reshape(plan_count, rows, selected.shape[1])
+
+        warmups = sample_rows(rngs, pools["warmup"], session_count, WARMUP_COUNT)
+        warmups = warmups.reshape(plan_count, session_count, warmups.shape[1])
+        cooldowns = sample_rows(rngs, pools["cooldown"], session_count, COOLDOWN_COUNT)
+        cooldowns = cooldowns.reshape(plan_count, session_count, cooldowns.shape[1])
+
+        # Circuits are for intermediate and advanced users, on the sessions the schedule marks
+        circuit_sessions = []
+        if profiles[0]["experience"] in ["intermediate", "advanced"]:
+            circuit_sessions = [index for index, scheduled in enumerate(schedule) if scheduled.circuit]
+        circuits = sample_rows(rngs, pools["core"], len(circuit_sessions), CIRCUIT_COUNT)
+        circuits = circuits.reshape(plan_count, len(circuit_sessions), circuits.shape[1])
+        circuit_slot = {session_index: slot for slot, session_index in enumerate(circuit_sessions)}
+
+        split_slot = {}
+        for session_indexes in sessions_by_split.values():
+            for slot, session_index in enumerate(session_indexes):
+                split_slot[session_index] = slot
+
+        plans = []
+        for plan_index, profile in enumerate(profiles):
+            # Sets, reps and rest follow the goal's progression scheme
+            scheme = scheme_for_goal(profile["goal"])
+            sessions = []
+            for index, scheduled in enumerate(schedule):
+                session_number = scheduled.session_number
+                week_number = scheduled.week_number
+
+                def entries(exercise_ids: "np.ndarray") -> List[Dict[str, Any]]:
+                    return [plan_format.exercise(records[i], session_number, week_number, scheme) for i in exercise_ids.tolist()]
+
+                sections = {
+                    "warmup": entries(warmups[plan_index, index]),
+                    "main": entries(main[scheduled.template.name][plan_index, split_slot[index]]),
+                    "cooldown": entries(cooldowns[plan_index, index]),
+                }
+                if index in circuit_slot:
+                    sections["circuit"] = entries(circuits[plan_index, circuit_slot[index]])
+                session_date = start_date + timedelta(days=scheduled.day_offset)
+                sessions.append(plan_format.session(session_number, session_date, sections))
+
+            plans.append({
+                "plan_id": make_plan_id(profile, seeds[plan_index], start_date, weeks, engine=ENGINE_NAME),
+                "seed": seeds[plan_index],
+                "client_name": profile["name"],
+                "goal": profile["goal"],
+                "experience": profile["experience"],
+                "sessions": sessions
+            })
+        return plans
@@ -1,11 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import workout
+from app.utils.artifact_cache import artifact_cache
+from app.utils.candidate_pool import candidate_pool_cache
+from app.utils.catalog import get_catalog
+from app.utils.compression import CompressionMiddleware
+from app.utils.executors import pool_stats, shutdown_pools
+from app.utils.export_jobs import export_jobs
+from app.utils.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.utils.plan_cache import plan_cache
+from app.utils.plan_store import plan_store
+from app.utils.workout_generator import engine
+from app.utils.profiling import (
+    PROFILE_HEADER,
+    PROFILE_QUERY_PARAM,
+    PROFILE_REPORT_PATH,
+    ProfilingMiddleware,
+    profile_store,
+    profiling_enabled,
+    token_matches,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the generation, PDF and export job worker pools
+    shutdown_pools()
+    export_jobs.shutdown()
+    # Write the plans still queued for the plan store
+    plan_store.close()
 
 app = FastAPI(
     title="Workout Plan Generator",
     description="A mini AI engine that generates personalized workout plans",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS
@@ -17,6 +49,19 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# gzip/brotli for JSON and NDJSON responses, negotiated from Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+# Request latency and status per route for /metrics (compression time included)
+app.add_middleware(MetricsMiddleware)
+
+# Per-request cProfile for requests carrying the admin token (only installed when one is configured)
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
+# Parse the exercise catalog once at startup
+get_catalog()
+
 # Include routers
 app.include_router(workout.router, tags=["workout"])
 
@@ -27,7 +72,44 @@ async def root():
         "docs": "/docs",
         "endpoints": [
             "/generate-workout-plan",
+            "/generate-workout-plan/stream",
+            "/generate-workout-plans/batch",
+            "/generate-workout-plans/batch/stream",
             "/generate-workout-pdf",
-            "/export-workout-json"
+            "/generate-workout-pdf/jobs",
+            "/export-workout-json",
+            "/plans",
+            "/plans/{plan_id}",
+            "/plans/{plan_id}/pdf",
+            "/plans/{plan_id}/weeks/{week_number}"
         ]
     }
+
+@app.get("/stats")
+async def stats():
+    """Catalog, cache and worker pool counters."""
+    return {
+        "catalog": get_catalog().stats(),
+        "candidate_pool_cache": candidate_pool_cache.stats(),
+        "plan_cache": plan_cache.stats(),
+        "plan_index": engine.plans.stats(),
+        "plan_store": plan_store.stats(),
+        "artifact_cache": artifact_cache.stats(),
+        "pools": pool_stats(),
+        "export_jobs": export_jobs.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Request, stage, cache, catalog and pool metrics in the Prometheus text format."""
+    caches = {"candidate_pool": candidate_pool_cache, "plan": plan_cache, "plan_index": engine.plans, "artifact": artifact_cache, "plan_store": plan_store}
+    return Response(content=render_metrics(get_catalog(), caches, dict(pool_stats(), export_jobs=export_jobs.stats())), media_type=CONTENT_TYPE)
+
+@app.get(PROFILE_REPORT_PATH + "/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, request: Request):
+    """Text report of a profiled request (requires the admin token)."""
+    token = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY_PARAM)
+    report = profile_store.get(profile_id) if token_matches(token) else None
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
@@ -28,6 +28,9 @@ class UserProfile(BaseModel):
     experience: Experience
     equipment: List[str]
     days_per_week: int = Field(..., ge=1, le=7)
+    # Program length; longer programs can be fetched a week at a time from /plans
+    weeks: int = Field(4, ge=1, le=24)
+    seed: Optional[int] = Field(None, ge=0)
 
 class Exercise(BaseModel):
     name: str
@@ -50,6 +53,9 @@ class WorkoutSession(BaseModel):
     sections: WorkoutSection
 
 class WorkoutPlan(BaseModel):
+    # Set by every plan producer (PlanEngine and VectorEngine) from the plan identity
+    plan_id: str
+    seed: int
     client_name: str
     goal: str
     experience: str
@@ -1,61 +1,296 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
-from typing import Dict
+from typing import BinaryIO, Callable, Dict, List, Literal, Optional
 
 from app.models.models import UserProfile
-from app.utils.workout_generator import generate_plan_json, generate_pdf
+from app.utils.artifact_cache import artifact_cache, artifact_key, etag_for, etag_matches
+from app.utils.executors import TaskPool, json_pool, pdf_pool
+from app.utils.export_jobs import QueueFull, export_jobs
+from app.utils.metrics import stage_timer
+from app.utils.plan_store import MAX_PLAN_LIST_SIZE
+from app.utils.serialization import encode_json
+from app.utils.workout_generator import (
+    PAYLOAD_FORMATS,
+    JSON_EXPORT_VERSION,
+    PDF_VERSION,
+    create_plan,
+    find_plans,
+    format_payload,
+    get_plan,
+    load_plan,
+    generate_plan_json,
+    generate_plans_json,
+    generate_week_json,
+    generate_pdf,
+    export_plan_json,
+    iter_plan_ndjson,
+    iter_plans_ndjson,
+)
+
+# Largest number of profiles accepted by the batch endpoint
+MAX_BATCH_SIZE = int(os.environ.get("WORKOUT_MAX_BATCH_SIZE", 1000))
+
+# Streamed batches are generated lazily, so they may be much larger
+MAX_STREAM_BATCH_SIZE = int(os.environ.get("WORKOUT_MAX_STREAM_BATCH_SIZE", 100000))
 
 router = APIRouter()
 
+# ?format= of the JSON endpoints: standard, compact (no null fields) or
+# normalized (exercises listed once and referenced by index)
+PayloadFormat = Literal[PAYLOAD_FORMATS]
+
+# Read size when streaming a cached artifact
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+
+def artifact_file_response(artifact: BinaryIO, media_type: str, headers: Dict[str, str]) -> StreamingResponse:
+    """Stream an artifact from its open file (which stays readable even if it is evicted meanwhile), closing it at the end."""
+    headers = dict(headers)
+    headers["Content-Length"] = str(os.fstat(artifact.fileno()).st_size)
+
+    def chunks():
+        with artifact:
+            yield from iter(lambda: artifact.read(ARTIFACT_CHUNK_SIZE), b"")
+
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+async def artifact_response(request: Request,
+                            workout_plan: Dict,
+                            kind: str,
+                            version: int,
+                            render: Callable[[Dict], bytes],
+                            pool: TaskPool,
+                            media_type: str,
+                            filename: str,
+                            *options: str) -> Response:
+    """
+    Serve an export of a plan from the on-disk artifact cache, rendering and storing
+    it on a miss (options are passed on to render). The ETag is the artifact's
+    content key, so a client that already has this exact export gets a 304.
+    """
+    key = artifact_key(kind, workout_plan, version, *options)
+    headers = {"ETag": etag_for(key)}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    artifact = artifact_cache.open(key, kind)
+    if artifact is not None:
+        # Streamed from disk instead of being rendered again
+        return artifact_file_response(artifact, media_type, headers)
+
+    content = await pool.run(render, workout_plan, *options)
+    artifact_cache.put(key, kind, content)
+    return Response(content=content, media_type=media_type, headers=headers)
+
 @router.post("/generate-workout-plan", response_model=Dict)
-async def generate_workout_plan(user_profile: UserProfile):
+async def generate_workout_plan(user_profile: UserProfile,
+                                payload_format: PayloadFormat = Query("standard", alias="format")):
     """
     Generate a workout plan based on the user profile.
-    Returns the workout plan as JSON.
+    Returns the workout plan as JSON (?format=compact or normalized for smaller payloads).
     """
     try:
-        workout_plan = generate_plan_json(user_profile)
-        return workout_plan
+        workout_plan = await json_pool.run(generate_plan_json, user_profile)
+        # Plans are plain JSON-ready dicts; encode directly instead of re-validating against response_model
+        with stage_timer("encode_json"):
+            content = encode_json(format_payload(workout_plan, payload_format))
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-workout-plan/stream")
+async def stream_workout_plan(user_profile: UserProfile):
+    """
+    Generate a workout plan based on the user profile.
+    Streams a header line and then one line per session as NDJSON.
+    """
+    return StreamingResponse(iter_plan_ndjson(user_profile), media_type="application/x-ndjson")
+
+@router.post("/generate-workout-plans/batch", response_model=Dict)
+async def generate_workout_plans_batch(user_profiles: List[UserProfile],
+                                       payload_format: PayloadFormat = Query("standard", alias="format")):
+    """
+    Generate workout plans for a list of user profiles in one request.
+    Returns {"plans": [...]} in request order, each in the requested ?format=.
+    """
+    if len(user_profiles) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {MAX_BATCH_SIZE} profiles per request")
+    try:
+        workout_plans = await json_pool.run(generate_plans_json, user_profiles)
+        with stage_timer("encode_json"):
+            content = encode_json({"plans": [format_payload(workout_plan, payload_format) for workout_plan in workout_plans]})
+        return Response(content=content, media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate-workout-plans/batch/stream")
+async def stream_workout_plans_batch(user_profiles: List[UserProfile]):
+    """
+    Generate workout plans for a list of user profiles.
+    Streams one complete plan per line as NDJSON, in request order.
+    """
+    if len(user_profiles) > MAX_STREAM_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {MAX_STREAM_BATCH_SIZE} profiles per request")
+    return StreamingResponse(iter_plans_ndjson(user_profiles), media_type="application/x-ndjson")
+
 @router.post("/generate-workout-pdf")
-async def generate_workout_pdf(user_profile: UserProfile):
+async def generate_workout_pdf(user_profile: UserProfile,
+                               request: Request,
+                               layout: Literal["standard", "compact"] = "standard"):
     """
     Generate a workout plan based on the user profile.
-    Returns the workout plan as a PDF file.
+    Returns the workout plan as a PDF file (cached on disk, with an ETag):
+    one session per page, or with ?layout=compact several session tables per page.
     """
     try:
-        workout_plan = generate_plan_json(user_profile)
-        pdf_path = generate_pdf(workout_plan)
-        
-        return FileResponse(
-            path=pdf_path, 
-            filename="workout_plan.pdf", 
-            media_type="application/pdf"
+        workout_plan = await json_pool.run(generate_plan_json, user_profile)
+        return await artifact_response(
+            request, workout_plan, "pdf", PDF_VERSION, generate_pdf, pdf_pool,
+            "application/pdf", "workout_plan.pdf", layout
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-workout-pdf/jobs")
+async def submit_workout_pdf_job(user_profile: UserProfile, layout: Literal["standard", "compact"] = "standard"):
+    """
+    Generate a workout plan and queue its PDF export without waiting for it.
+    Returns the job (202, or 200 when the PDF is already cached); poll its status_url.
+    Returns 429 when the export queue is full.
+    """
+    try:
+        workout_plan = await json_pool.run(generate_plan_json, user_profile)
+        job = export_jobs.submit(workout_plan, layout)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    content = job.to_dict()
+    content["status_url"] = f"/generate-workout-pdf/jobs/{job.job_id}"
+    return JSONResponse(content, status_code=202 if job.pending else 200)
+
+@router.get("/generate-workout-pdf/jobs/{job_id}")
+async def get_workout_pdf_job(job_id: str, request: Request):
+    """
+    Poll a PDF export job. Returns 202 with the job status while it is queued or
+    running, and the PDF (with its ETag and a Server-Timing header) once it is done.
+    """
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.pending:
+        return JSONResponse(job.to_dict(), status_code=202, headers={"Retry-After": "1"})
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Export failed: {job.error}")
+    
+    headers = {"ETag": etag_for(job_id), "Server-Timing": job.server_timing()}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    headers["Content-Disposition"] = 'attachment; filename="workout_plan.pdf"'
+    if job.content is not None:
+        return Response(content=job.content, media_type="application/pdf", headers=headers)
+    artifact = artifact_cache.open(job_id, "pdf")
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Export expired; submit the job again")
+    return artifact_file_response(artifact, "application/pdf", headers)
+
 @router.post("/export-workout-json")
-async def export_workout_json(user_profile: UserProfile):
+async def export_workout_json(user_profile: UserProfile,
+                              request: Request,
+                              payload_format: PayloadFormat = Query("standard", alias="format")):
     """
     Generate a workout plan based on the user profile.
-    Returns the workout plan as a downloadable JSON file.
-    """
-    try:
-        workout_plan = generate_plan_json(user_profile)
-        
-        # Save the JSON to a file
-        with open("workout_plan.json", "w") as f:
-            json.dump(workout_plan, f, indent=4, default=str)
-        
-        return FileResponse(
-            path="workout_plan.json", 
-            filename="workout_plan.json", 
-            media_type="application/json"
+    Returns the workout plan as a downloadable JSON file (cached on disk, with an ETag):
+    indented, or with ?format=compact or normalized without whitespace or null fields.
+    """
+    try:
+        workout_plan = await json_pool.run(generate_plan_json, user_profile)
+        return await artifact_response(
+            request, workout_plan, "json", JSON_EXPORT_VERSION, export_plan_json, json_pool,
+            "application/json", "workout_plan.json", payload_format
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/plans", response_model=Dict)
+async def create_workout_plan(user_profile: UserProfile):
+    """
+    Register a workout plan without generating it.
+    Returns the plan ID, seed and length; fetch sessions from /plans/{plan_id}/weeks/{week_number}.
+    """
+    try:
+        return create_plan(user_profile).header()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/plans", response_model=Dict)
+async def list_workout_plans(client_name: Optional[str] = None,
+                             limit: int = Query(50, ge=1, le=MAX_PLAN_LIST_SIZE)):
+    """
+    List stored plans, newest first, optionally only those of one client.
+    Returns {"plans": [{"plan_id", "client_name", "created"}, ...]}.
+    """
+    try:
+        return {"plans": find_plans(client_name, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/plans/{plan_id}", response_model=Dict)
+async def get_workout_plan(plan_id: str,
+                           payload_format: PayloadFormat = Query("standard", alias="format")):
+    """
+    Return a generated plan by ID, in the requested ?format=. Plans are read from
+    the plan store, so any server process can return a plan generated by another one.
+    """
+    try:
+        workout_plan = await json_pool.run(load_plan, plan_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if workout_plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    with stage_timer("encode_json"):
+        content = encode_json(format_payload(workout_plan, payload_format))
+    return Response(content=content, media_type="application/json")
+
+@router.get("/plans/{plan_id}/pdf")
+async def get_workout_plan_pdf(plan_id: str,
+                               request: Request,
+                               layout: Literal["standard", "compact"] = "standard"):
+    """Return a generated plan by ID as a PDF file (cached on disk, with an ETag)."""
+    try:
+        workout_plan = await json_pool.run(load_plan, plan_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if workout_plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    try:
+        return await artifact_response(
+            request, workout_plan, "pdf", PDF_VERSION, generate_pdf, pdf_pool,
+            "application/pdf", "workout_plan.pdf", layout
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/plans/{plan_id}/weeks/{week_number}", response_model=Dict)
+async def get_workout_plan_week(plan_id: str, week_number: int):
+    """
+    Return the sessions of one week of a plan, generating only that week.
+    Plans created or generated by any server process are found through the plan store.
+    """
+    workout_plan = get_plan(plan_id)
+    if workout_plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    if not 1 <= week_number <= workout_plan.weeks:
+        raise HTTPException(status_code=404, detail=f"Week {week_number} is outside this {workout_plan.weeks}-week plan")
+    try:
+        sessions = await json_pool.run(
+            generate_week_json, workout_plan.profile, workout_plan.seed, workout_plan.start_date, week_number
         )
+        with stage_timer("encode_json"):
+            content = encode_json({"plan_id": plan_id, "week": week_number, "weeks": workout_plan.weeks, "sessions": sessions})
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from app.utils.serialization import encode_json
+
+# Rendered PDF and JSON exports are kept on local disk (shared by all worker processes)
+ARTIFACT_DIR = os.path.abspath(
+    os.environ.get("WORKOUT_ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "workout-artifacts")
+)
+# Disk budget for the artifacts; 0 disables the cache
+ARTIFACT_CACHE_BYTES = int(os.environ.get("WORKOUT_ARTIFACT_CACHE_BYTES", 256 * 1024 * 1024))
+
+# Eviction trims the cache to this fraction of the budget, so it does not run on every write
+EVICTION_TARGET = 0.9
+
+def artifact_key(kind: str, workout_plan: Dict[str, Any], version: int, *options: str) -> str:
+    """Content key of an artifact: a hash of the plan contents, the artifact kind, its renderer version and options."""
+    digest = hashlib.sha256(":".join((kind, str(version), *options, "")).encode("utf-8"))
+    digest.update(encode_json(workout_plan))
+    return digest.hexdigest()
+
+def etag_for(key: str) -> str:
+    """ETag header value of an artifact."""
+    return f'"{key}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header lists the ETag (weak or strong) or is "*"."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or candidate == "*":
+            return True
+    return False
+
+class ArtifactCache:
+    """
+    Size-bounded on-disk cache of rendered artifacts stored under their content key.
+    Hits refresh the file's modification time and eviction removes the oldest files
+    first, so the directory behaves as an LRU even when several processes share it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bytes on disk as of the last scan plus writes since; None until first needed
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path(self, key: str, extension: str) -> str:
+        """File path of an artifact (two-character fan-out keeps directories small)."""
+        return os.path.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        """Path of a cached artifact (marking it recently used), or None."""
+        if not self.enabled:
+            return None
+        path = self.path(key, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def open(self, key: str, extension: str) -> Optional[BinaryIO]:
+        """
+        A cached artifact opened for reading (marking it recently used), or None. Serve
+        from the open file: it stays readable even if an eviction unlinks it meanwhile.
+        """
+        if not self.enabled:
+            return None
+        try:
+            f = open(self.path(key, extension), "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(f.fileno())
+        except OSError:
+            pass  # Only the LRU order suffers
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def put(self, key: str, extension: str, data: bytes) -> Optional[str]:
+        """Store an artifact and return its path (None when the cache is disabled or it does not fit)."""
+        if not self.enabled or len(data) > self.max_bytes:
+            return None
+        path = self.path(key, extension)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file and rename it, so readers never see a partial artifact
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += len(data)
+            over_budget = self._bytes is None or self._bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def scan(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every stored artifact."""
+        entries = []
+        try:
+            buckets = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return entries
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> None:
+        """Delete the least recently used artifacts until the cache is within its budget."""
+        with self._evict_lock:
+            entries = self.scan()
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICTION_TARGET
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    evicted += 1
+            with self._lock:
+                self._bytes = total
+                self.evictions += evicted
+
+    def clear(self) -> None:
+        """Delete every stored artifact and reset the counters."""
+        with self._evict_lock:
+            for _, _, path in self.scan():
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._bytes = 0
+                self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, disk usage and hit/miss counters (scans the directory)."""
+        entries = self.scan() if self.enabled else []
+        lookups = self.hits + self.misses
+        return {
+            "size": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+artifact_cache = ArtifactCache(ARTIFACT_DIR, ARTIFACT_CACHE_BYTES)
@@ -0,0 +1,59 @@
+import os
+from typing import List, Dict, Any, Iterable, Optional
+
+from app.utils.exercise_index import IndexedExerciseList, allowed_levels
+from app.utils.lru import LRUCache
+
+# Muscle groups that get a leveled pool of main exercises
+MAIN_MUSCLE_GROUPS = ("chest", "shoulders", "back", "arms", "legs", "core")
+
+class CandidatePool:
+    """Pre-filtered exercises for one (equipment set, level) profile."""
+
+    __slots__ = MAIN_MUSCLE_GROUPS + ("warmup", "cooldown")
+
+    def __init__(self, exercises: List[Dict[str, Any]], allowed_equipment: frozenset, levels: Optional[tuple]):
+        index = getattr(exercises, "exercise_index", None)
+
+        def collect(exercise_type, levels=None, muscle_group=None):
+            if index is not None:
+                return [exercises[i] for i in index.lookup(allowed_equipment, exercise_type, levels, muscle_group)]
+            return [
+                ex for ex in exercises
+                if ex["equipment"] in allowed_equipment
+                and ex["type"] == exercise_type
+                and (levels is None or ex["level"] in levels)
+                and (muscle_group is None or ex["muscle_group"] == muscle_group)
+            ]
+
+        for muscle_group in MAIN_MUSCLE_GROUPS:
+            setattr(self, muscle_group, collect("main", levels, muscle_group))
+        # Warmups and cooldowns are not filtered by level
+        self.warmup = collect("warmup")
+        self.cooldown = collect("cooldown")
+
+candidate_pool_cache = LRUCache(maxsize=int(os.environ.get("WORKOUT_POOL_CACHE_SIZE", 128)))
+
+def get_candidate_pool(exercises: List[Dict[str, Any]],
+                       equipment: Iterable[str],
+                       level: Optional[str],
+                       free_equipment: Iterable[str] = ("bodyweight",)) -> CandidatePool:
+    """
+    Return the candidate pool for a profile, memoized across requests.
+    Only catalog lists are cached; the entry is rebuilt when the catalog reloads.
+    """
+    allowed_equipment = frozenset(equipment).union(free_equipment)
+    levels = allowed_levels(level)
+
+    if not isinstance(exercises, IndexedExerciseList):
+        return CandidatePool(exercises, allowed_equipment, levels)
+
+    key = (allowed_equipment, levels)
+    # An entry built from an earlier catalog is stale, and counts as a miss
+    entry = candidate_pool_cache.get(key, valid=lambda entry: entry[0] is exercises)
+    if entry is not None:
+        return entry[1]
+
+    pool = CandidatePool(exercises, allowed_equipment, levels)
+    candidate_pool_cache.put(key, (exercises, pool))
+    return pool
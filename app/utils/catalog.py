@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from app.utils.exercise_index import IndexedExerciseList
+
+DEFAULT_EXERCISE_FILE = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "exercises.json")
+)
+
+class ExerciseCatalog:
+    """
+    Exercise catalog that parses the exercise file once and shares the result.
+    The file is re-checked at most every `check_interval` seconds and only
+    re-parsed when its mtime/size changed and its content hash differs.
+    """
+
+    def __init__(self, path: str = DEFAULT_EXERCISE_FILE, check_interval: float = 1.0):
+        self.path = os.path.abspath(path)
+        self.check_interval = check_interval
+
+        # Load/reload event counters
+        self.loads = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._exercises: Optional[List[Dict[str, Any]]] = None
+        self._signature = None
+        self._digest = None
+        self._last_check = 0.0
+
+        self.refresh(force=True)
+
+    @property
+    def exercises(self) -> List[Dict[str, Any]]:
+        """The current exercise list. Callers must treat it as read-only."""
+        self.refresh()
+        return self._exercises
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the exercise file if it changed on disk. Returns True if new data was loaded."""
+        if not force and time.monotonic() - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest == self._digest:
+                # Touched but unchanged
+                self._signature = signature
+                return False
+
+            try:
+                exercises = self._parse(raw)
+            except (ValueError, KeyError):
+                # Keep serving the previous catalog if a reload sees a half-written file
+                if self._exercises is None:
+                    raise
+                self.reload_errors += 1
+                return False
+
+            # Swap in the new data in one step so readers never see a partial catalog
+            first_load = self._exercises is None
+            self._exercises = exercises
+            self._signature = signature
+            self._digest = digest
+            self.version += 1
+            if first_load:
+                self.loads += 1
+            else:
+                self.reloads += 1
+            return True
+
+    def _parse(self, raw: bytes) -> List[Dict[str, Any]]:
+        """Parse the raw exercise file and build its lookup index."""
+        return IndexedExerciseList(json.loads(raw))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return load/reload counters for monitoring."""
+        return {
+            "path": self.path,
+            "version": self.version,
+            "exercise_count": len(self._exercises) if self._exercises is not None else 0,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "digest": self._digest,
+        }
+
+_catalog: Optional[ExerciseCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> ExerciseCatalog:
+    """Return the process-wide exercise catalog, loading it on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ExerciseCatalog()
+    return _catalog
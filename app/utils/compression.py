@@ -0,0 +1,166 @@
+import os
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Responses smaller than this are sent as they are: compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.environ.get("WORKOUT_COMPRESSION_MIN_SIZE", 1024))
+# Fast levels: responses are compressed on every request, and plan JSON is
+# repetitive enough that the top levels gain little over them
+GZIP_LEVEL = int(os.environ.get("WORKOUT_GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.environ.get("WORKOUT_BROTLI_QUALITY", 4))
+
+# Media types worth compressing (PDFs are already deflated)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Content codings we can produce, most preferred first
+CONTENT_CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# gzip container (zlib wbits 16 + 15)
+GZIP_WBITS = 31
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The content coding to use for an Accept-Encoding header, or None to send the response as is."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best = None
+    best_weight = 0.0
+    for coding in CONTENT_CODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        # Ties go to the earlier (preferred) coding
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def compressible(content_type: Optional[str]) -> bool:
+    """Whether responses of this media type are worth compressing."""
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a whole body with a content coding from CONTENT_CODINGS."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def weak_etag(etag: str) -> str:
+    """The ETag marked weak: the compressed body is no longer byte-for-byte the tagged one."""
+    return etag if etag.startswith("W/") else "W/" + etag
+
+class StreamCompressor:
+    """Compresses a streamed body chunk by chunk, flushing each so lines reach the client as they are generated."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def header_value(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    """Value of a header in an ASGI header list (name in lower case), or None."""
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and NDJSON responses with the best coding
+    the client accepts. Whole bodies smaller than COMPRESSION_MIN_SIZE, already
+    encoded bodies and other media types pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(header_value(scope.get("headers", ()), b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the body is worth compressing
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = list(start.get("headers", []))
+                if (header_value(headers, b"content-encoding") is not None
+                        or start["status"] in (204, 304)
+                        or not compressible(header_value(headers, b"content-type"))
+                        or (not more_body and len(body) < COMPRESSION_MIN_SIZE)):
+                    await send(start)
+                    await send(message)
+                    return
+
+                etag = header_value(headers, b"etag")
+                vary = header_value(headers, b"vary")
+                # The length changes, and a streamed body's is unknown until the end
+                headers = [(key, value) for key, value in headers if key.lower() not in (b"content-length", b"etag", b"vary")]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")))
+                if etag is not None:
+                    headers.append((b"etag", weak_etag(etag).encode("latin-1")))
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    await send(dict(start, headers=headers))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = StreamCompressor(encoding)
+                await send(dict(start, headers=headers))
+
+            if compressor is None:
+                await send(message)
+                return
+            data = compressor.compress(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from app.utils.metrics import pool_run_seconds, pool_wait_seconds
+from app.utils.profiling import current_profile, profiled_call
+
+def timed_call(fn: Callable, args: tuple) -> Tuple[Any, float, float]:
+    """Run fn in the worker and report when it started and how long it ran."""
+    started = time.time()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter() - start
+
+class TaskPool:
+    """
+    Thread or process pool for CPU-bound work called from async handlers,
+    with queue depth and per-task timing counters.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: int = 4):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind for {name}: {kind!r} (expected 'thread' or 'process')")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """The underlying executor, created on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        # spawn avoids forking a process that already runs an event loop and threads
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix=f"{self.name}-pool",
+                        )
+        return self._executor
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) in the pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        # A profiled request profiles its pool tasks too, inside the worker
+        request_profile = current_profile.get()
+        if request_profile is not None:
+            fn, args = profiled_call, (fn, args)
+        submitted = time.time()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            result, started, run_seconds = await loop.run_in_executor(self.executor, timed_call, fn, args)
+        except BrokenExecutor:
+            # A crashed worker breaks the whole pool; drop it so the next task gets a fresh one
+            with self._lock:
+                self.in_flight -= 1
+                self.failed += 1
+                if self._executor is not None and getattr(self._executor, "_broken", False):
+                    self._executor = None
+            raise
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+                self.failed += 1
+            raise
+
+        wait_seconds = max(0.0, started - submitted)
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.run_seconds_total += run_seconds
+            self.run_seconds_max = max(self.run_seconds_max, run_seconds)
+            self.wait_seconds_total += wait_seconds
+        pool_run_seconds.observe(run_seconds, self.name)
+        pool_wait_seconds.observe(wait_seconds, self.name)
+        if request_profile is not None:
+            result, worker_stats = result
+            request_profile.add_worker_stats(worker_stats)
+        return result
+
+    def shutdown(self) -> None:
+        """Stop the workers; the pool is recreated if used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool size, queue depth and task timing."""
+        completed = self.completed
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "completed": completed,
+            "failed": self.failed,
+            "run_seconds_avg": self.run_seconds_total / completed if completed else 0.0,
+            "run_seconds_max": self.run_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / completed if completed else 0.0,
+        }
+
+def pool_from_env(name: str, default_kind: str, default_workers: int) -> TaskPool:
+    """Build a pool configured by WORKOUT_<NAME>_POOL and WORKOUT_<NAME>_WORKERS."""
+    prefix = f"WORKOUT_{name.upper()}"
+    return TaskPool(
+        name,
+        kind=os.environ.get(f"{prefix}_POOL", default_kind),
+        max_workers=int(os.environ.get(f"{prefix}_WORKERS", default_workers)),
+    )
+
+# Plan generation is short, so threads are enough; PDF rendering is long and
+# GIL-bound pure Python, so it runs in separate processes by default.
+json_pool = pool_from_env("json", "thread", min(8, (os.cpu_count() or 1) + 2))
+pdf_pool = pool_from_env("pdf", "process", max(1, min(4, os.cpu_count() or 1)))
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Return stats for every task pool."""
+    return {pool.name: pool.stats() for pool in (json_pool, pdf_pool)}
+
+def shutdown_pools() -> None:
+    """Shut down every task pool."""
+    for pool in (json_pool, pdf_pool):
+        pool.shutdown()
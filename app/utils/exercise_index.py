@@ -0,0 +1,79 @@
+from collections import defaultdict
+from heapq import merge
+from itertools import product
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from app.engine.progression import build_progression_tables
+from app.utils.records import compile_exercises
+
+def allowed_levels(level: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Return the exercise levels a user of the given level may do, or None for all levels."""
+    if not level:
+        return None
+    # For "intermediate" users, include beginner exercises too
+    if level == "intermediate":
+        return ("beginner", "intermediate")
+    # For "advanced" users, include all levels
+    if level == "advanced":
+        return None
+    # For "beginner" users, only include beginner exercises
+    return ("beginner",)
+
+class ExerciseIndex:
+    """
+    Exercise positions bucketed by (type, muscle_group, level, equipment).
+    A lookup unions the few buckets matching a profile instead of scanning the catalog.
+    """
+
+    def __init__(self, exercises: List[Dict[str, Any]]):
+        buckets = defaultdict(list)
+        for position, ex in enumerate(exercises):
+            buckets[(ex["type"], ex["muscle_group"], ex["level"], ex["equipment"])].append(position)
+        self._buckets: Dict[Tuple[str, str, str, str], Tuple[int, ...]] = {
+            key: tuple(positions) for key, positions in buckets.items()
+        }
+
+        # Distinct values per key component, used when a component is not filtered on
+        self.types = frozenset(key[0] for key in self._buckets)
+        self.muscle_groups = frozenset(key[1] for key in self._buckets)
+        self.levels = frozenset(key[2] for key in self._buckets)
+        self.equipment = frozenset(key[3] for key in self._buckets)
+
+    def lookup(self,
+               equipment: Iterable[str],
+               exercise_type: Optional[str] = None,
+               levels: Optional[Iterable[str]] = None,
+               muscle_group: Optional[str] = None) -> List[int]:
+        """Return the catalog positions matching the given filters, in catalog order."""
+        types = (exercise_type,) if exercise_type else self.types
+        muscle_groups = (muscle_group,) if muscle_group else self.muscle_groups
+        levels = self.levels if levels is None else levels
+        equipment = self.equipment.intersection(equipment)
+
+        matches = []
+        for key in product(types, muscle_groups, levels, equipment):
+            bucket = self._buckets.get(key)
+            if bucket:
+                matches.append(bucket)
+
+        if len(matches) == 1:
+            return list(matches[0])
+        # Buckets are already sorted, so a k-way merge keeps the catalog order
+        return list(merge(*matches))
+
+class IndexedExerciseList(list):
+    """
+    Compiled exercise catalog: ExerciseRecords whose list position is their id,
+    the columns of interned field codes and the ExerciseIndex built over them.
+    Each record also gets its progression table, so session assembly only looks
+    prescriptions up.
+    """
+
+    __slots__ = ("columns", "exercise_index")
+
+    def __init__(self, exercises: Iterable[Dict[str, Any]]):
+        records, columns = compile_exercises(exercises)
+        build_progression_tables(records)
+        super().__init__(records)
+        self.columns = columns
+        self.exercise_index = ExerciseIndex(self)
@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.engine.exports import PDF_VERSION, generate_pdf
+from app.utils.artifact_cache import artifact_cache, artifact_key
+from app.utils.executors import timed_call
+from app.utils.lru import LRUCache
+from app.utils.metrics import pool_run_seconds, pool_wait_seconds
+
+# PDF export jobs: worker processes, the most jobs queued or running at once
+# (more are refused with 429), and how many finished jobs are remembered
+EXPORT_WORKERS = int(os.environ.get("WORKOUT_EXPORT_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+EXPORT_QUEUE_SIZE = int(os.environ.get("WORKOUT_EXPORT_QUEUE_SIZE", 64))
+EXPORT_JOB_HISTORY = int(os.environ.get("WORKOUT_EXPORT_JOB_HISTORY", 1024))
+
+class QueueFull(Exception):
+    """Raised when the export queue already holds its maximum number of pending jobs."""
+
+class ExportJob:
+    """A PDF export: its status, timing and, once done, where the file is."""
+
+    __slots__ = ("job_id", "layout", "status", "created", "started", "finished", "error", "path", "content")
+
+    def __init__(self, job_id: str, layout: str):
+        self.job_id = job_id
+        self.layout = layout
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        # Path in the artifact cache, or the bytes themselves when the cache is disabled
+        self.path = None
+        self.content = None
+
+    @property
+    def pending(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def queue_seconds(self) -> Optional[float]:
+        """Time from submission until a worker picked the job up."""
+        if self.started is None:
+            return None
+        return max(0.0, self.started - self.created)
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        """Time the worker spent rendering."""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value with the queue and render times in milliseconds."""
+        return f"queue;dur={(self.queue_seconds or 0.0) * 1000:.1f}, render;dur={(self.run_seconds or 0.0) * 1000:.1f}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "layout": self.layout,
+            "created": self.created,
+            "queue_seconds": self.queue_seconds,
+            "run_seconds": self.run_seconds,
+            "error": self.error,
+        }
+
+class ExportJobQueue:
+    """
+    Renders PDFs in background worker processes. Jobs are keyed by the PDF's
+    artifact key, so a repeated export of the same plan joins the existing job,
+    and finished PDFs go to the shared artifact cache.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, history: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.jobs = LRUCache(maxsize=history)
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """The worker processes, started on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def submit(self, workout_plan: Dict, layout: str = "standard") -> ExportJob:
+        """
+        Queue a PDF export of a plan and return its job without waiting. A PDF that is
+        already cached gives a finished job; raises QueueFull when too many are pending.
+        """
+        job_id = artifact_key("pdf", workout_plan, PDF_VERSION, layout)
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status != "failed" and not self.expired(job):
+                return job
+
+            job = ExportJob(job_id, layout)
+            path = artifact_cache.get(job_id, "pdf")
+            if path is not None:
+                job.status = "done"
+                job.path = path
+                job.started = job.finished = job.created
+                self.jobs.put(job_id, job)
+                return job
+
+            if self.in_flight >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"Export queue is full ({self.max_queue} jobs pending)")
+            self.in_flight += 1
+            self.jobs.put(job_id, job)
+
+        try:
+            future = self.executor.submit(timed_call, generate_pdf, (workout_plan, layout))
+        except BaseException as e:
+            self.finish(job, error=e)
+            raise
+        future.add_done_callback(lambda future: self.collect(job, future))
+        return job
+
+    def expired(self, job: ExportJob) -> bool:
+        """Whether a finished job's PDF is gone: evicted from the artifact cache, and not kept in memory."""
+        return job.status == "done" and job.content is None and artifact_cache.get(job.job_id, "pdf") is None
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """
+        A job by ID. Jobs of other server processes are not known here, but their
+        finished PDFs are found in the shared artifact cache.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        path = artifact_cache.get(job_id, "pdf")
+        if path is None:
+            return None
+        job = ExportJob(job_id, None)
+        job.status = "done"
+        job.path = path
+        return job
+
+    def collect(self, job: ExportJob, future: Future) -> None:
+        """Store a finished render (runs on the executor's callback thread)."""
+        try:
+            content, started, run_seconds = future.result()
+        except BaseException as e:
+            if isinstance(e, BrokenExecutor):
+                # A crashed worker breaks the whole pool; drop it so the next job gets a fresh one
+                with self._lock:
+                    if self._executor is not None and getattr(self._executor, "_broken", False):
+                        self._executor = None
+            self.finish(job, error=e)
+            return
+
+        job.started = started
+        try:
+            job.path = artifact_cache.put(job.job_id, "pdf", content)
+        except OSError:
+            job.path = None
+        if job.path is None:
+            job.content = content
+        job.finished = started + run_seconds
+        self.finish(job)
+
+    def finish(self, job: ExportJob, error: Optional[BaseException] = None) -> None:
+        """Mark a job done or failed and record its timing."""
+        if job.started is None:
+            job.started = time.time()
+        if job.finished is None:
+            job.finished = time.time()
+        wait_seconds = job.queue_seconds
+        run_seconds = job.run_seconds
+
+        with self._lock:
+            self.in_flight -= 1
+            if error is None:
+                self.completed += 1
+                self.run_seconds_total += run_seconds
+                self.run_seconds_max = max(self.run_seconds_max, run_seconds)
+                self.wait_seconds_total += wait_seconds
+            else:
+                self.failed += 1
+        if error is None:
+            pool_run_seconds.observe(run_seconds, self.name)
+            pool_wait_seconds.observe(wait_seconds, self.name)
+            job.status = "done"
+        else:
+            job.error = str(error) or type(error).__name__
+            job.status = "failed"
+
+    def shutdown(self) -> None:
+        """Stop the workers; they are started again if another job is submitted."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return worker count, pending jobs and job timing (same fields as the task pools)."""
+        completed = self.completed
+        return {
+            "kind": "process",
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "completed": completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "run_seconds_avg": self.run_seconds_total / completed if completed else 0.0,
+            "run_seconds_max": self.run_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / completed if completed else 0.0,
+        }
+
+export_jobs = ExportJobQueue("export_jobs", EXPORT_WORKERS, EXPORT_QUEUE_SIZE, EXPORT_JOB_HISTORY)
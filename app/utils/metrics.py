@@ -0,0 +1,234 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-second PDF batches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    """Render a Prometheus label set such as {stage="sessions"}."""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+def format_value(value: float) -> str:
+    """Render a sample value the way Prometheus expects it."""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: Any, amount: float = 1) -> None:
+        """Add amount to the series with the given label values."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        """Prometheus text exposition lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{format_labels(self.labelnames, labelvalues)} {format_value(value)}")
+        return lines
+
+class Histogram:
+    """
+    Fixed-bucket histogram with optional labels. An observation is one
+    bisect and a few integer increments, cheap enough for every request.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        """Record one observation for the series with the given label values."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues: Any) -> "Timer":
+        """Context manager that observes the time spent in its block."""
+        return Timer(self, labelvalues)
+
+    def render(self) -> List[str]:
+        """Prometheus text exposition lines (cumulative buckets, _sum and _count)."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labelvalues, (list(series[0]), series[1], series[2]))
+                           for labelvalues, series in self._series.items())
+        bucket_names = self.labelnames + ("le",)
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = format_labels(bucket_names, labelvalues + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Timer:
+    """Times a block with perf_counter and records it in a histogram."""
+
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+def gauge_lines(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, Any], float]],
+                kind: str = "gauge") -> List[str]:
+    """Exposition lines for values read at scrape time, e.g. from a stats() dict."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {format_value(value)}")
+    return lines
+
+request_seconds = Histogram(
+    "workout_request_duration_seconds", "Time to produce a response, by endpoint", ("endpoint", "method")
+)
+requests_total = Counter(
+    "workout_requests_total", "Requests served, by endpoint and status code", ("endpoint", "method", "status")
+)
+stage_seconds = Histogram(
+    "workout_stage_duration_seconds", "Time spent in each plan generation and export stage", ("stage",)
+)
+pool_run_seconds = Histogram(
+    "workout_pool_task_duration_seconds", "Time a worker pool task spent running", ("pool",)
+)
+pool_wait_seconds = Histogram(
+    "workout_pool_wait_duration_seconds", "Time a worker pool task spent queued before it started", ("pool",)
+)
+
+REGISTRY = [request_seconds, requests_total, stage_seconds, pool_run_seconds, pool_wait_seconds]
+
+def stage_timer(stage: str) -> Timer:
+    """Time one stage of plan generation or export (catalog, sessions, encode_json, pdf_render, ...)."""
+    return Timer(stage_seconds, (stage,))
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    """Record one served request."""
+    request_seconds.observe(seconds, endpoint, method)
+    requests_total.inc(endpoint, method, status)
+
+def render_metrics(catalog: Optional[Any] = None,
+                   caches: Optional[Dict[str, Any]] = None,
+                   pools: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """
+    Render every metric in the Prometheus text format. Catalog, cache and pool
+    values are read from their stats() at scrape time, so they cost nothing per request.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    if catalog is not None:
+        stats = catalog.stats()
+        lines.extend(gauge_lines("workout_catalog_exercises", "Exercises in the loaded catalog",
+                                 [({}, stats["exercise_count"])]))
+        lines.extend(gauge_lines("workout_catalog_version", "Catalog version, bumped on every reload",
+                                 [({}, stats["version"])]))
+        lines.extend(gauge_lines("workout_catalog_reloads_total", "Catalog reloads after a file change",
+                                 [({}, stats["reloads"])], kind="counter"))
+        lines.extend(gauge_lines("workout_catalog_reload_errors_total", "Catalog reloads rejected as invalid",
+                                 [({}, stats["reload_errors"])], kind="counter"))
+
+    if caches:
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for field, kind, documentation in (
+            ("size", "gauge", "Entries in the cache"),
+            ("hits", "counter", "Cache lookups that found an entry"),
+            ("misses", "counter", "Cache lookups that found nothing"),
+            ("evictions", "counter", "Entries evicted to stay within the size limit"),
+            ("hit_rate", "gauge", "Fraction of lookups that were hits"),
+        ):
+            name = "workout_cache_" + ("entries" if field == "size" else field)
+            if kind == "counter":
+                name += "_total"
+            lines.extend(gauge_lines(name, documentation,
+                                     [({"cache": cache}, values[field]) for cache, values in stats.items()], kind=kind))
+
+    if pools:
+        for field, kind, documentation in (
+            ("in_flight", "gauge", "Tasks submitted to the pool and not yet finished"),
+            ("queue_depth", "gauge", "Tasks waiting for a free worker"),
+            ("max_workers", "gauge", "Worker count of the pool"),
+            ("completed", "counter", "Tasks that finished successfully"),
+            ("failed", "counter", "Tasks that raised"),
+        ):
+            name = f"workout_pool_{field}" + ("_total" if kind == "counter" else "")
+            lines.extend(gauge_lines(name, documentation,
+                                     [({"pool": pool}, values[field]) for pool, values in pools.items()], kind=kind))
+
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template. It times
+    until the last body chunk is sent, so streamed responses count in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; label unmatched paths together
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "other"
+            observe_request(endpoint, scope["method"], status, time.perf_counter() - start)
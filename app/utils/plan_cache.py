@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+import secrets
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.utils.lru import LRUCache
+
+# Profile fields that determine a plan; the program length, seed and start date are added separately
+PLAN_KEY_FIELDS = ("name", "age", "gender", "goal", "experience", "equipment", "days_per_week")
+
+plan_cache = LRUCache(maxsize=int(os.environ.get("WORKOUT_PLAN_CACHE_SIZE", 256)))
+
+# Plans registered by ID so their weeks can be fetched later; entries hold only
+# the profile and seed, so many more fit than fully generated plans
+PLAN_INDEX_SIZE = int(os.environ.get("WORKOUT_PLAN_INDEX_SIZE", 4096))
+
+def new_seed() -> int:
+    """Draw a fresh seed for a profile that did not send one."""
+    return secrets.randbits(32)
+
+def next_monday(today: Optional[date] = None) -> date:
+    """First Monday after today (a week ahead if today is Monday)."""
+    today = today or datetime.now().date()
+    days_until_monday = (7 - today.weekday()) % 7
+    if days_until_monday == 0:
+        days_until_monday = 7  # If today is Monday, start next Monday
+    return today + timedelta(days=days_until_monday)
+
+def make_plan_id(profile: Dict[str, Any], seed: int, start_date: date, weeks: int, engine: Optional[str] = None) -> str:
+    """
+    Stable plan ID derived from the plan-relevant profile fields, the program length, the seed and the start date.
+    Engines that draw differently from the same seed pass their name, so their plans get IDs of their own.
+    """
+    key = {field: profile.get(field) for field in PLAN_KEY_FIELDS}
+    if engine is not None:
+        key["engine"] = engine
+    # Equipment order does not change the candidate pools
+    key["equipment"] = sorted(set(key["equipment"] or []))
+    key["weeks"] = weeks
+    key["seed"] = seed
+    key["start_date"] = start_date.isoformat()
+    encoded = json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
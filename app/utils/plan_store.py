@@ -0,0 +1,218 @@
+import atexit
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from app.utils.serialization import decode_json, encode_json
+
+# Generated plans are kept in a local SQLite database shared by all worker processes;
+# set WORKOUT_PLAN_STORE to an empty string to disable it
+PLAN_STORE_PATH = os.environ.get("WORKOUT_PLAN_STORE", os.path.join(tempfile.gettempdir(), "workout-plans.sqlite3"))
+# Most plans written in one transaction, and how many may wait for the writer
+# before generating a plan blocks until it catches up
+PLAN_STORE_BATCH_SIZE = int(os.environ.get("WORKOUT_PLAN_STORE_BATCH_SIZE", 256))
+PLAN_STORE_QUEUE_SIZE = int(os.environ.get("WORKOUT_PLAN_STORE_QUEUE_SIZE", 10000))
+# How long the writer waits for more plans before committing a group
+PLAN_STORE_LINGER_MS = float(os.environ.get("WORKOUT_PLAN_STORE_LINGER_MS", 20))
+
+# Format name under which registered plans are kept: not a plan, but the profile,
+# seed and start date any process needs to rebuild it and serve its weeks
+HEADER_FORMAT = "header"
+
+# Most plans listed by one /plans lookup
+MAX_PLAN_LIST_SIZE = 500
+
+# Fast zlib level: plan JSON is repetitive, so it still shrinks several times
+COMPRESS_LEVEL = 1
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS plans (
+        format TEXT NOT NULL,
+        plan_id TEXT NOT NULL,
+        client_name TEXT NOT NULL,
+        created REAL NOT NULL,
+        body BLOB NOT NULL,
+        PRIMARY KEY (format, plan_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS plans_by_client ON plans (format, client_name, created)",
+    "CREATE INDEX IF NOT EXISTS plans_by_created ON plans (format, created)",
+)
+
+class PlanStore:
+    """
+    Generated plans stored in SQLite as zlib-compressed JSON under (format, plan ID).
+    Writes are queued and committed by a background thread in groups of whatever
+    has queued up since the last commit, so a burst of new plans costs one
+    transaction per group instead of one per plan. Queued plans are readable at once.
+    """
+
+    def __init__(self, path: str, batch_size: int, queue_size: int, linger_seconds: float):
+        self.path = path
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.commits = 0
+        self.errors = 0
+
+        # Plans queued but not yet committed, by (format, plan ID)
+        self._pending = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._schema_ready = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened (and the schema created) on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            # WAL lets every worker process read while one of them writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._schema_ready:
+                    with connection:
+                        for statement in SCHEMA:
+                            connection.execute(statement)
+                    self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    def put(self, format_name: str, workout_plan: Dict[str, Any]) -> None:
+        """Queue a plan for writing (blocks only when the writer is a full queue behind)."""
+        if not self.enabled:
+            return
+        item = (format_name, workout_plan["plan_id"], workout_plan["client_name"], time.time(), workout_plan)
+        with self._lock:
+            self._pending[item[:2]] = item
+            if self._writer is None:
+                self._writer = threading.Thread(target=self.write_loop, name="plan-store-writer", daemon=True)
+                self._writer.start()
+        self._queue.put(item)
+
+    def get(self, format_name: str, plan_id: str) -> Optional[Dict[str, Any]]:
+        """A stored plan, or None (one primary key lookup)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._pending.get((format_name, plan_id))
+        if item is not None:
+            workout_plan = item[4]
+        else:
+            row = self.connection().execute(
+                "SELECT body FROM plans WHERE format = ? AND plan_id = ?", (format_name, plan_id)
+            ).fetchone()
+            workout_plan = decode_json(zlib.decompress(row[0])) if row is not None else None
+        with self._lock:
+            if workout_plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return workout_plan
+
+    def find(self, format_name: str, client_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """IDs, client names and creation times of committed plans, newest first, optionally of one client."""
+        if not self.enabled:
+            return []
+        if client_name is None:
+            rows = self.connection().execute(
+                "SELECT plan_id, client_name, created FROM plans WHERE format = ? ORDER BY created DESC LIMIT ?",
+                (format_name, limit),
+            )
+        else:
+            rows = self.connection().execute(
+                "SELECT plan_id, client_name, created FROM plans WHERE format = ? AND client_name = ? "
+                "ORDER BY created DESC LIMIT ?",
+                (format_name, client_name, limit),
+            )
+        return [{"plan_id": plan_id, "client_name": name, "created": created} for plan_id, name, created in rows]
+
+    def write_loop(self) -> None:
+        """Commit queued plans until a None is queued (runs on the writer thread)."""
+        connection = self.connection()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Wait briefly for a group to form, so a burst is written in a few large transactions
+            deadline = time.monotonic() + self.linger_seconds
+            while len(batch) < self.batch_size and None not in batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self.commit(connection, batch)
+        connection.close()
+        del self._local.connection
+
+    def commit(self, connection: sqlite3.Connection, batch: List[tuple]) -> None:
+        """Write a group of plans in one transaction."""
+        rows = [
+            (format_name, plan_id, client_name, created, zlib.compress(encode_json(workout_plan), COMPRESS_LEVEL))
+            for format_name, plan_id, client_name, created, workout_plan in batch
+        ]
+        try:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?)", rows)
+            committed = True
+        except sqlite3.Error:
+            committed = False
+
+        with self._lock:
+            for item in batch:
+                # A newer write of the same plan stays pending until its own commit
+                if self._pending.get(item[:2]) is item:
+                    del self._pending[item[:2]]
+            if committed:
+                self.writes += len(rows)
+                self.commits += 1
+            else:
+                self.errors += len(rows)
+
+    def close(self) -> None:
+        """Write every queued plan and stop the writer (it starts again on the next put)."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return stored plan count, lookup hit/miss counters and write grouping (counts the table)."""
+        size = 0
+        if self.enabled:
+            size = self.connection().execute("SELECT count(*) FROM plans WHERE format != ?", (HEADER_FORMAT,)).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": 0,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "pending": len(self._pending),
+            "writes": self.writes,
+            "commits": self.commits,
+            "plans_per_commit": self.writes / self.commits if self.commits else 0.0,
+            "errors": self.errors,
+        }
+
+plan_store = PlanStore(PLAN_STORE_PATH, PLAN_STORE_BATCH_SIZE, PLAN_STORE_QUEUE_SIZE, PLAN_STORE_LINGER_MS / 1000)
+# Queued plans are written before the process exits
+atexit.register(plan_store.close)
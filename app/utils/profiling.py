@@ -0,0 +1,171 @@
+import cProfile
+import contextvars
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.utils.lru import LRUCache
+
+# Profiling is off unless an admin token is configured
+PROFILE_TOKEN = os.environ.get("WORKOUT_PROFILE_TOKEN", "")
+
+# Directory for .prof dumps (pstats format, e.g. for snakeviz); reports are always kept in memory
+PROFILE_DIR = os.environ.get("WORKOUT_PROFILE_DIR", "")
+
+# Number of functions listed in a text report
+PROFILE_REPORT_LINES = int(os.environ.get("WORKOUT_PROFILE_LINES", 60))
+
+# A request is profiled when it carries the token in this header or query parameter
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Profile reports are served under this path, which is never profiled itself
+PROFILE_REPORT_PATH = "/debug/profiles"
+
+# Recent text reports by profile ID
+profile_store = LRUCache(maxsize=32)
+
+# Profile of the request being handled, if it asked for one
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+def profiling_enabled() -> bool:
+    """Whether an admin token is configured."""
+    return bool(PROFILE_TOKEN)
+
+def token_matches(token: Optional[str]) -> bool:
+    """Check a token sent by a client against the configured admin token."""
+    if not PROFILE_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+class RawStats:
+    """Adapter that lets pstats.Stats load a stats dict collected in a worker."""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+class RequestProfile:
+    """
+    cProfile of one request, merged with the profiles of the pool tasks it ran.
+    Only one request is profiled at a time, since cProfile profilers cannot nest.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self, label: str):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.worker_stats = []
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> bool:
+        """Start profiling; returns False if another request is being profiled."""
+        if not self._active.acquire(blocking=False):
+            return False
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return True
+
+    def stop(self) -> None:
+        """Stop profiling and store the result."""
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started
+        self._active.release()
+        self.save()
+
+    def add_worker_stats(self, stats: Optional[Dict]) -> None:
+        """Merge the profile of a task that ran in a worker thread or process."""
+        if stats:
+            self.worker_stats.append(stats)
+
+    def stats(self) -> pstats.Stats:
+        """Combined stats of the request and its worker tasks."""
+        stats = pstats.Stats(self.profiler)
+        for worker_stats in self.worker_stats:
+            stats.add(RawStats(worker_stats))
+        return stats
+
+    def save(self) -> None:
+        """Keep a text report in memory and, with WORKOUT_PROFILE_DIR, dump the raw stats to disk."""
+        stats = self.stats()
+        if PROFILE_DIR:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{self.profile_id}.prof"))
+
+        stream = io.StringIO()
+        stream.write(f"{self.label}: {self.elapsed * 1000:.1f} ms, {len(self.worker_stats)} worker task(s)\n")
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        profile_store.put(self.profile_id, stream.getvalue())
+
+def profiled_call(fn: Callable, args: tuple) -> Tuple[Any, Optional[Dict]]:
+    """Run fn under its own profiler in a pool worker and return (result, stats dict)."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this interpreter; run without one
+        return fn(*args), None
+    try:
+        result = fn(*args)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests carrying the admin token and adds
+    an X-Profile-Id header; the report is served by /debug/profiles/{id}.
+    Install it only when profiling_enabled(), so normal requests pay nothing.
+    Other requests handled on the event loop at the same time show up in the profile too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def requested(self, scope) -> bool:
+        if scope["path"].startswith(PROFILE_REPORT_PATH):
+            return False
+        header = PROFILE_HEADER.lower().encode("latin-1")
+        for name, value in scope.get("headers", ()):
+            if name == header:
+                return token_matches(value.decode("latin-1"))
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return token_matches(query.get(PROFILE_QUERY_PARAM, [None])[0])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_profile = RequestProfile(f"{scope['method']} {scope['path']}")
+        if not request_profile.start():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.lower().encode("latin-1"), request_profile.profile_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        context_token = current_profile.set(request_profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            current_profile.reset(context_token)
+            request_profile.stop()
@@ -0,0 +1,118 @@
+import sys
+from array import array
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+# Fields stored as small integer codes in the catalog columns
+CODED_FIELDS = ("type", "muscle_group", "level", "equipment")
+
+# Optional prescription fields; a missing field is stored as None
+OPTIONAL_FIELDS = ("sets", "reps", "duration")
+
+class ExerciseRecord:
+    """
+    Compact, read-only catalog entry addressed by its integer id.
+    Supports the dict-style access (`ex["name"]`, `"sets" in ex`) the generators use.
+    """
+
+    __slots__ = ("id", "name") + CODED_FIELDS + OPTIONAL_FIELDS + ("progression",)
+
+    FIELDS = ("name",) + CODED_FIELDS + OPTIONAL_FIELDS
+
+    def __init__(self, exercise_id: int, name: str, type: str, muscle_group: str, level: str,
+                 equipment: str, sets: Optional[int] = None, reps: Optional[Any] = None,
+                 duration: Optional[str] = None):
+        self.id = exercise_id
+        self.name = name
+        self.type = type
+        self.muscle_group = muscle_group
+        self.level = level
+        self.equipment = equipment
+        self.sets = sets
+        self.reps = reps
+        self.duration = duration
+        # Prescriptions by (format, scheme) and week, attached when the catalog is compiled
+        self.progression = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ExerciseRecord.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in ExerciseRecord.FIELDS and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field value, or default when the exercise does not define it."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the exercise as it appears in the catalog file."""
+        return {field: getattr(self, field) for field in ExerciseRecord.FIELDS if getattr(self, field) is not None}
+
+    def __repr__(self) -> str:
+        return f"ExerciseRecord({self.id}, {self.name!r})"
+
+class CodeTable:
+    """Interns the distinct values of one field and assigns them integer codes."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        """Return the code for value, adding it to the table on first sight."""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        """Return the interned value for a code."""
+        return self.values[code]
+
+class ExerciseColumns:
+    """Parallel arrays of field codes, one entry per exercise id."""
+
+    def __init__(self):
+        self.tables: Dict[str, CodeTable] = {field: CodeTable() for field in CODED_FIELDS}
+        self.codes: Dict[str, array] = {field: array("H") for field in CODED_FIELDS}
+
+    def append(self, exercise: Dict[str, Any]) -> Tuple[str, ...]:
+        """Encode one exercise's coded fields and return their interned values."""
+        values = []
+        for field in CODED_FIELDS:
+            table = self.tables[field]
+            code = table.encode(exercise[field])
+            self.codes[field].append(code)
+            values.append(table.values[code])
+        return tuple(values)
+
+    def __len__(self) -> int:
+        return len(self.codes[CODED_FIELDS[0]])
+
+def compile_exercises(exercises: Iterable[Dict[str, Any]]) -> Tuple[List[ExerciseRecord], ExerciseColumns]:
+    """Compile raw exercise dicts into id-addressed records plus code columns."""
+    records = []
+    columns = ExerciseColumns()
+    for exercise_id, exercise in enumerate(exercises):
+        exercise_type, muscle_group, level, equipment = columns.append(exercise)
+        records.append(ExerciseRecord(
+            exercise_id,
+            exercise["name"],
+            exercise_type,
+            muscle_group,
+            level,
+            equipment,
+            exercise.get("sets"),
+            exercise.get("reps"),
+            exercise.get("duration"),
+        ))
+    return records, columns
@@ -0,0 +1,19 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+def encode_json(obj: Any) -> bytes:
+    """Encode plain dicts/lists (dates and str enums included) as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+def decode_json(data: bytes) -> Any:
+    """Decode JSON bytes (as written by encode_json)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
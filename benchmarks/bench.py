@@ -0,0 +1,310 @@
+"""
+Benchmarks for catalog loading, filtering, selection, plan generation,
+PDF rendering and the HTTP endpoints of both servers.
+
+    python benchmarks/bench.py                       # full run, results to stdout
+    python benchmarks/bench.py --output results.json # save machine-readable results
+    python benchmarks/bench.py --compare results.json --sizes 1000
+    python benchmarks/bench.py --only generate
+
+Each result records min/median/mean time per call in microseconds. With
+--compare, the median of every benchmark is compared against a previous run.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep benchmark plans and exports out of the default plan store and artifact
+# cache (both read their location when first imported)
+BENCH_DATA = tempfile.TemporaryDirectory(prefix="workout-bench-")
+os.environ["WORKOUT_PLAN_STORE"] = os.path.join(BENCH_DATA.name, "plans.sqlite3")
+os.environ["WORKOUT_ARTIFACT_DIR"] = os.path.join(BENCH_DATA.name, "artifacts")
+
+from app.models.models import UserProfile
+from app.utils import workout_generator as generator
+from app.utils.compression import CONTENT_CODINGS, compress
+from app.utils.candidate_pool import candidate_pool_cache, get_candidate_pool
+from app.utils.catalog import DEFAULT_EXERCISE_FILE, ExerciseCatalog
+
+LEVELS = ("beginner", "intermediate", "advanced")
+EQUIPMENT = ["dumbbells", "bench", "resistance_band"]
+
+def make_profile(days_per_week=3, experience="intermediate", equipment=EQUIPMENT, seed=1):
+    """Benchmark profile."""
+    return UserProfile(
+        name="Bench", age=30, gender="other", goal="muscle_gain",
+        experience=experience, equipment=equipment, days_per_week=days_per_week, seed=seed,
+    )
+
+def profile_payload(days_per_week=3, experience="intermediate"):
+    """Benchmark profile as a request body (no seed, so every call generates)."""
+    return {
+        "name": "Bench", "age": 30, "gender": "other", "goal": "muscle_gain",
+        "experience": experience, "equipment": EQUIPMENT, "days_per_week": days_per_week,
+    }
+
+class Runner:
+    """Times callables and collects the results."""
+
+    def __init__(self, min_time, max_runs, only):
+        self.min_time = min_time
+        self.max_runs = max_runs
+        self.only = only
+        self.results = []
+
+    def bench(self, name, fn, **params):
+        """Time fn until min_time has elapsed (at least 3, at most max_runs calls)."""
+        if self.only and not any(part in name for part in self.only):
+            return
+        result = {"name": name, "params": params}
+        try:
+            fn()  # warm up
+            samples = []
+            started = time.perf_counter()
+            while len(samples) < 3 or (time.perf_counter() - started < self.min_time and len(samples) < self.max_runs):
+                start = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - start) * 1e6)
+            result.update({
+                "runs": len(samples),
+                "min_us": min(samples),
+                "median_us": statistics.median(samples),
+                "mean_us": statistics.fmean(samples),
+            })
+            print(f"{name:<60} {result['median_us']:>12.1f} us  ({len(samples)} runs)", file=sys.stderr)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"{name:<60} {'ERROR':>12}  {result['error']}", file=sys.stderr)
+        self.results.append(result)
+
+def synthetic_catalog(size, seed=0):
+    """Catalog of `size` exercises with the same field mix as the real one."""
+    rng = random.Random(seed)
+    groups = ["chest", "shoulders", "back", "arms", "legs", "core", "full_body"]
+    equipment = ["bodyweight", "dumbbells", "bench", "resistance_band", "kettlebell", "barbell", "towel"]
+    types = ["main"] * 7 + ["warmup"] * 2 + ["cooldown"]
+    exercises = []
+    for i in range(size):
+        exercise = {
+            "name": f"Exercise {i}",
+            "muscle_group": rng.choice(groups),
+            "equipment": rng.choice(equipment),
+            "type": rng.choice(types),
+            "level": rng.choice(("beginner", "beginner", "intermediate", "advanced")),
+        }
+        if exercise["type"] == "cooldown" or rng.random() < 0.2:
+            exercise["duration"] = "30 sec"
+        else:
+            exercise["sets"] = rng.randint(2, 4)
+            exercise["reps"] = rng.choice((8, 10, 12, 15, "10 each side"))
+        exercises.append(exercise)
+    return exercises
+
+def bench_catalog(runner, label, path):
+    """Catalog load and the per-request catalog access."""
+    runner.bench(f"{label}/catalog_parse", lambda: ExerciseCatalog(path), catalog=label)
+    catalog = ExerciseCatalog(path, check_interval=0)
+    runner.bench(f"{label}/catalog_refresh_check", catalog.refresh, catalog=label)
+    return catalog.exercises
+
+def bench_selection(runner, label, exercises):
+    """filter_exercises and every select_* helper."""
+    runner.bench(f"{label}/filter_exercises", lambda: generator.filter_exercises(
+        exercises, EQUIPMENT, exercise_type="main", level="intermediate", muscle_group="chest"), catalog=label)
+    runner.bench(f"{label}/filter_exercises_linear", lambda: generator.filter_exercises(
+        list(exercises), EQUIPMENT, exercise_type="main", level="intermediate", muscle_group="chest"), catalog=label)
+    runner.bench(f"{label}/candidate_pool_build", lambda: (candidate_pool_cache.clear(),
+        get_candidate_pool(exercises, EQUIPMENT, "intermediate")), catalog=label)
+
+    for name in ("push", "pull", "leg", "core"):
+        select = getattr(generator, f"select_{name}_exercises")
+        runner.bench(f"{label}/select_{name}_exercises", lambda: select(exercises, EQUIPMENT, "intermediate", 3), catalog=label)
+    for name in ("warmup", "cooldown"):
+        select = getattr(generator, f"select_{name}_exercises")
+        runner.bench(f"{label}/select_{name}_exercises", lambda: select(exercises, EQUIPMENT, 3), catalog=label)
+
+def bench_generation(runner, label, exercises):
+    """generate_workout_plan / generate_plan_json for every days_per_week and level."""
+    for level in LEVELS:
+        pool = get_candidate_pool(exercises, EQUIPMENT, level)
+        for days in range(1, 8):
+            profile = make_profile(days, level)
+            runner.bench(f"{label}/generate_plan/{level}/{days}d",
+                         lambda: generator.generate_plan_json(profile, pool, validate=False),
+                         catalog=label, level=level, days_per_week=days)
+            if label == "default":
+                runner.bench(f"{label}/generate_workout_plan_models/{level}/{days}d",
+                             lambda: generator.generate_workout_plan(profile, pool),
+                             catalog=label, level=level, days_per_week=days)
+
+def bench_vector(runner, label, exercises):
+    """The optional NumPy batch engine."""
+    try:
+        from app.engine.vector_engine import VectorEngine
+        vector_engine = VectorEngine(generator.engine)
+    except ImportError:
+        return
+    profiles = [make_profile(1 + i % 7, LEVELS[i % 3], seed=i) for i in range(100)]
+    runner.bench(f"{label}/vector_batch_100_plans",
+                 lambda: vector_engine.generate_plans(profiles, exercises, validate=False), catalog=label)
+
+def bench_exports(runner):
+    """PDF rendering, JSON export and payload encoding of a 28-session plan."""
+    plan = generator.generate_plan_json(make_profile(7, "advanced"), validate=False)
+    runner.bench("default/generate_pdf/28_sessions", lambda: generator.generate_pdf(plan))
+    runner.bench("default/generate_pdf_compact/28_sessions", lambda: generator.generate_pdf(plan, "compact"))
+    runner.bench("default/export_plan_json/28_sessions", lambda: generator.export_plan_json(plan))
+    runner.bench("default/encode_plan_json/28_sessions", lambda: generator.encode_json(plan))
+    runner.bench("default/export_plan_json_compact/28_sessions", lambda: generator.export_plan_json(plan, "compact"))
+
+    for payload_format in generator.PAYLOAD_FORMATS:
+        # Record the payload size, raw and with each content coding, next to the encode time
+        content = generator.encode_json(generator.format_payload(plan, payload_format))
+        sizes = {f"{coding}_bytes": len(compress(content, coding)) for coding in CONTENT_CODINGS}
+        runner.bench(f"default/encode_plan_{payload_format}/28_sessions",
+                     lambda: generator.encode_json(generator.format_payload(plan, payload_format)),
+                     bytes=len(content), **sizes)
+        for coding in CONTENT_CODINGS:
+            runner.bench(f"default/compress_plan_{payload_format}_{coding}/28_sessions", lambda: compress(content, coding))
+
+def load_flask_app():
+    """Import the Flask app module from app.py (the `app` package shadows it as a module name)."""
+    spec = importlib.util.spec_from_file_location("flask_app", os.path.join(ROOT, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def generate_every_plan(engine):
+    """
+    Keep an engine from reusing plans: benchmark profiles are seeded, so repeated
+    calls would otherwise be plan cache or plan store hits (as in app/bulk.py's workers).
+    """
+    engine.plan_cache.maxsize = 0
+    engine.plan_cache.clear()
+    engine.store = None
+
+def bench_endpoints(runner):
+    """End-to-end requests through in-process test clients."""
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app as fastapi_app
+        clients = [("fastapi", TestClient(fastapi_app))]
+    except ImportError as e:
+        print(f"Skipping FastAPI endpoints: {e}", file=sys.stderr)
+        clients = []
+    try:
+        flask_app = load_flask_app()
+        generate_every_plan(flask_app.engine)
+        clients.append(("flask", flask_app.app.test_client()))
+    except ImportError as e:
+        print(f"Skipping Flask endpoints: {e}", file=sys.stderr)
+
+    # The Flask routes print every request; keep that out of the results
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run_endpoints(runner, clients)
+
+    if clients and clients[0][0] == "fastapi":
+        from app.utils.executors import shutdown_pools
+        shutdown_pools()
+
+def run_endpoints(runner, clients):
+    """Plan, PDF, JSON export and batch requests against each server."""
+    for server, client in clients:
+        for days in (3, 7):
+            payload = profile_payload(days)
+            for endpoint in ("/generate-workout-plan", "/generate-workout-pdf", "/export-workout-json"):
+                runner.bench(f"{server}{endpoint}/{days}d", lambda: check(client.post(endpoint, json=payload)),
+                             server=server, days_per_week=days)
+            # Smaller payloads: normalized JSON, then also gzipped
+            runner.bench(f"{server}/generate-workout-plan/normalized/{days}d",
+                         lambda: check(client.post("/generate-workout-plan?format=normalized", json=payload)),
+                         server=server, days_per_week=days)
+            runner.bench(f"{server}/generate-workout-plan/normalized_gzip/{days}d",
+                         lambda: check(client.post("/generate-workout-plan?format=normalized", json=payload,
+                                                   headers={"Accept-Encoding": "gzip"})),
+                         server=server, days_per_week=days)
+        batch = [profile_payload((3, 5, 7)[i % 3], LEVELS[i % 3]) for i in range(50)]
+        runner.bench(f"{server}/generate-workout-plans/batch/50", lambda: check(client.post("/generate-workout-plans/batch", json=batch)),
+                     server=server)
+
+def check(response):
+    """Fail the benchmark on a non-200 response."""
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return response
+
+def compare(results, baseline_path):
+    """Print median ratios against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"] if "median_us" in r}
+    print(f"\n{'benchmark':<60} {'baseline':>12} {'current':>12} {'ratio':>8}", file=sys.stderr)
+    for result in results:
+        before = baseline.get(result["name"])
+        if before and "median_us" in result:
+            ratio = result["median_us"] / before["median_us"]
+            print(f"{result['name']:<60} {before['median_us']:>12.1f} {result['median_us']:>12.1f} {ratio:>7.2f}x", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workout generator benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated synthetic catalog sizes (empty to skip)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend per benchmark")
+    parser.add_argument("--max-runs", type=int, default=1000, help="maximum calls per benchmark")
+    parser.add_argument("--only", default="", help="comma-separated substrings; run matching benchmarks only")
+    parser.add_argument("--skip-endpoints", action="store_true", help="skip the HTTP endpoint benchmarks")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results to compare medians against")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    runner = Runner(args.min_time, args.max_runs, [part for part in args.only.split(",") if part])
+    generate_every_plan(generator.engine)
+
+    exercises = bench_catalog(runner, "default", DEFAULT_EXERCISE_FILE)
+    bench_selection(runner, "default", exercises)
+    bench_generation(runner, "default", exercises)
+    bench_vector(runner, "default", exercises)
+    bench_exports(runner)
+    if not args.skip_endpoints:
+        bench_endpoints(runner)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in [int(size) for size in args.sizes.split(",") if size]:
+            label = f"synthetic_{size}"
+            path = os.path.join(tmp, f"{label}.json")
+            with open(path, "w") as f:
+                json.dump(synthetic_catalog(size), f)
+            exercises = bench_catalog(runner, label, path)
+            bench_selection(runner, label, exercises)
+            bench_generation(runner, label, exercises)
+            bench_vector(runner, label, exercises)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": runner.results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(runner.results, args.compare)
+
+if __name__ == "__main__":
+    main()
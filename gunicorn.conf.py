@@ -0,0 +1,47 @@
+import gc
+import multiprocessing
+import os
+
+# Production server settings, read by `gunicorn` from the working directory.
+# sync and gthread workers serve the Flask app (wsgi:app); uvicorn workers
+# serve the FastAPI app (app.main:app).
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+worker_kind = os.environ.get("WORKOUT_WORKER_CLASS", "gthread")
+if worker_kind not in WORKER_CLASSES:
+    raise ValueError(f"Unknown WORKOUT_WORKER_CLASS {worker_kind!r} (expected one of {', '.join(WORKER_CLASSES)})")
+
+worker_class = WORKER_CLASSES[worker_kind]
+wsgi_app = os.environ.get("WORKOUT_APP", "app.main:app" if worker_kind == "uvicorn" else "wsgi:app")
+
+bind = os.environ.get("WORKOUT_BIND", f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+
+# Plan generation and PDF rendering are CPU-bound, so default to one worker per CPU
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads per gthread worker (gunicorn would silently turn sync workers with threads into gthread)
+threads = int(os.environ.get("WORKOUT_THREADS", 4)) if worker_kind == "gthread" else 1
+
+timeout = int(os.environ.get("WORKOUT_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WORKOUT_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("WORKOUT_KEEPALIVE", 5))
+
+# Recycle workers after this many requests (0 disables), with jitter so they do not restart together
+max_requests = int(os.environ.get("WORKOUT_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("WORKOUT_MAX_REQUESTS_JITTER", 50 if max_requests else 0))
+
+# Import the app, and with it the parsed exercise catalog, once in the master
+# so forked workers share it copy-on-write instead of each parsing their own
+preload_app = os.environ.get("WORKOUT_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+accesslog = os.environ.get("WORKOUT_ACCESS_LOG", "-") or None
+loglevel = os.environ.get("WORKOUT_LOG_LEVEL", "info")
+
+def when_ready(server):
+    # Move the preloaded objects out of the collector's reach, so garbage
+    # collections in the workers do not write to (and copy) the shared pages
+    gc.freeze()
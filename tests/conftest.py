@@ -0,0 +1,36 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the suite off the real plan store and export cache (read when the app modules are imported)
+_data_dir = tempfile.mkdtemp(prefix="workout-tests-")
+os.environ.setdefault("WORKOUT_PLAN_STORE", os.path.join(_data_dir, "plans.sqlite3"))
+os.environ.setdefault("WORKOUT_ARTIFACT_DIR", os.path.join(_data_dir, "artifacts"))
+# Opt-in validation mode: every plan generated by the suite is checked against the pydantic WorkoutPlan schema
+os.environ.setdefault("WORKOUT_VALIDATE_MODELS", "1")
+
+@pytest.fixture(scope="session")
+def flask_app():
+    """The Flask app from app.py (the `app` package shadows it as a module name)."""
+    spec = importlib.util.spec_from_file_location("flask_app", os.path.join(ROOT, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def flask_client(flask_app):
+    return flask_app.app.test_client()
+
+@pytest.fixture(scope="session")
+def fastapi_client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
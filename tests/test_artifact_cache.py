@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from app.utils.artifact_cache import ArtifactCache, artifact_key, etag_for, etag_matches
+
+PROFILE = {
+    "name": "Cached", "age": 41, "gender": "female", "goal": "endurance", "experience": "beginner",
+    "equipment": ["resistance_band"], "days_per_week": 2, "seed": 5,
+}
+
+def test_artifact_key_covers_plan_version_and_options():
+    workout_plan = {"plan_id": "a", "sessions": []}
+    key = artifact_key("pdf", workout_plan, 1, "standard")
+    assert key == artifact_key("pdf", dict(workout_plan), 1, "standard")
+    assert key != artifact_key("pdf", workout_plan, 2, "standard")
+    assert key != artifact_key("pdf", workout_plan, 1, "compact")
+    assert key != artifact_key("pdf", dict(workout_plan, sessions=[{}]), 1, "standard")
+
+def test_etag_matches():
+    etag = etag_for("abc")
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+
+def test_put_get_and_evict_oldest(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=250)
+    assert cache.get("aa1", "pdf") is None
+    paths = [cache.put(key, "pdf", b"x" * 100) for key in ("aa1", "bb2")]
+    with open(cache.get("aa1", "pdf"), "rb") as f:
+        assert f.read() == b"x" * 100
+    # aa1 was used more recently than bb2, so bb2 goes first
+    os.utime(paths[0], (2000, 2000))
+    os.utime(paths[1], (1000, 1000))
+    cache.put("cc3", "pdf", b"y" * 100)
+    assert cache.get("bb2", "pdf") is None
+    assert cache.get("aa1", "pdf") is not None
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["bytes"] == 200 and stats["evictions"] == 1
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+
+def test_disabled_or_oversized(tmp_path):
+    assert ArtifactCache(str(tmp_path), max_bytes=0).put("aa1", "pdf", b"x") is None
+    assert ArtifactCache(str(tmp_path), max_bytes=10).put("aa1", "pdf", b"x" * 11) is None
+    assert not os.listdir(tmp_path)
+
+@pytest.mark.parametrize("path", ["/generate-workout-pdf", "/export-workout-json"])
+def test_fastapi_exports_revalidate(fastapi_client, path):
+    first = fastapi_client.post(path, json=PROFILE)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    # Served again from the artifact cache, byte for byte
+    second = fastapi_client.post(path, json=PROFILE)
+    assert second.headers["etag"] == etag and second.content == first.content
+    not_modified = fastapi_client.post(path, json=PROFILE, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+@pytest.mark.parametrize("path", ["/generate-workout-pdf", "/export-workout-json"])
+def test_flask_exports_revalidate(flask_client, path):
+    first = flask_client.post(path, json=PROFILE)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert flask_client.post(path, json=PROFILE).get_data() == first.get_data()
+    not_modified = flask_client.post(path, json=PROFILE, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    # A different layout is a different artifact
+    if path == "/generate-workout-pdf":
+        assert flask_client.post(path + "?layout=compact", json=PROFILE).headers["ETag"] != etag
+
+def test_open_survives_eviction(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=1000)
+    assert cache.open("aa1", "pdf") is None
+    path = cache.put("aa1", "pdf", b"%PDF-data")
+    with cache.open("aa1", "pdf") as f:
+        os.unlink(path)
+        assert f.read() == b"%PDF-data"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def evict_after_lookup(monkeypatch):
+    """Make every artifact cache hit lose its file to an eviction right after the lookup."""
+    from app.utils.artifact_cache import artifact_cache
+
+    for name in ("get", "open"):
+        def lookup_then_evict(key, extension, lookup=getattr(artifact_cache, name)):
+            artifact = lookup(key, extension)
+            if artifact is not None:
+                os.unlink(artifact_cache.path(key, extension))
+            return artifact
+        monkeypatch.setattr(artifact_cache, name, lookup_then_evict)
+
+def test_fastapi_serves_artifact_evicted_while_sending(fastapi_client, monkeypatch):
+    profile = dict(PROFILE, seed=55)
+    first = fastapi_client.post("/generate-workout-pdf", json=profile)
+    evict_after_lookup(monkeypatch)
+    second = fastapi_client.post("/generate-workout-pdf", json=profile)
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["content-length"] == str(len(first.content))
+
+def test_flask_serves_artifact_evicted_while_sending(flask_client, monkeypatch):
+    profile = dict(PROFILE, seed=56)
+    first = flask_client.post("/generate-workout-pdf", json=profile)
+    evict_after_lookup(monkeypatch)
+    second = flask_client.post("/generate-workout-pdf", json=profile)
+    assert second.status_code == 200
+    assert second.get_data() == first.get_data()
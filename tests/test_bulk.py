@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from app.bulk import main, parse_profile, read_chunks
+
+def profile(name, **fields):
+    values = {"name": name, "age": 30, "gender": "female", "goal": "strength", "experience": "beginner",
+              "equipment": ["dumbbells"], "days_per_week": 2, "seed": len(name)}
+    values.update(fields)
+    return values
+
+def write_jsonl(path, records):
+    path.write_text("".join((record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records))
+    return str(path)
+
+def read_plans(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def run_bulk(tmp_path, input_path, *options):
+    output = str(tmp_path / "plans.jsonl")
+    errors = str(tmp_path / "errors.jsonl")
+    status = main([input_path, "--output", output, "--errors", errors, "--workers", "1",
+                   "--chunk-size", "2", "--progress", "0", *options])
+    return status, output, errors
+
+def test_parse_csv_row_and_jsonl_line():
+    row = {"name": "Ann", "equipment": "dumbbells; bench ;", "age": " ", "days_per_week": "3"}
+    assert parse_profile(row) == {"name": "Ann", "equipment": ["dumbbells", "bench"], "days_per_week": "3"}
+    assert parse_profile('{"name": "Ann"}') == {"name": "Ann"}
+    with pytest.raises(ValueError):
+        parse_profile("[1, 2]")
+    with pytest.raises(ValueError):
+        parse_profile({"name": "Ann", None: ["extra"]})
+
+def test_read_chunks():
+    assert list(read_chunks(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+def test_jsonl_plans_in_input_order(tmp_path):
+    names = [f"Client {i}" for i in range(5)]
+    input_path = write_jsonl(tmp_path / "profiles.jsonl", [profile(name) for name in names])
+    status, output, errors = run_bulk(tmp_path, input_path, "--pdf-dir", str(tmp_path / "pdfs"))
+    assert status == 0
+    plans = read_plans(output)
+    assert [plan["client_name"] for plan in plans] == names
+    assert all(plan["plan_id"] and plan["sessions"] for plan in plans)
+    assert os.path.getsize(errors) == 0
+    for plan in plans:
+        with open(tmp_path / "pdfs" / plan["plan_id"][:2] / f"{plan['plan_id']}.pdf", "rb") as f:
+            assert f.read(5) == b"%PDF-"
+
+def test_failed_profiles_are_reported(tmp_path):
+    records = [profile("Good"), "not json", profile("Bad", goal="juggling"), "", profile("Also Good", weeks=99)]
+    input_path = write_jsonl(tmp_path / "profiles.jsonl", records)
+    status, output, errors = run_bulk(tmp_path, input_path)
+    assert status == 1
+    assert [plan["client_name"] for plan in read_plans(output)] == ["Good"]
+    errors = read_plans(errors)
+    # Line numbers count the blank line too
+    assert [error["line"] for error in errors] == [2, 3, 5]
+    assert errors[1]["error"].startswith("goal:")
+
+def test_csv_input(tmp_path):
+    path = tmp_path / "profiles.csv"
+    path.write_text(
+        "name,age,gender,goal,experience,equipment,days_per_week,seed\n"
+        "Csv One,25,male,endurance,intermediate,dumbbells;bench,3,1\n"
+        "Csv Two,61,female,strength,beginner,resistance_band,2,\n"
+    )
+    status, output, _ = run_bulk(tmp_path, str(path))
+    assert status == 0
+    plans = read_plans(output)
+    assert [plan["client_name"] for plan in plans] == ["Csv One", "Csv Two"]
+    assert plans[0]["seed"] == 1
+    # An empty seed cell falls back to a random seed
+    assert isinstance(plans[1]["seed"], int)
+    assert len(plans[0]["sessions"]) == 12
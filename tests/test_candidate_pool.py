@@ -0,0 +1,30 @@
+from app.utils.candidate_pool import candidate_pool_cache, get_candidate_pool
+from app.utils.catalog import DEFAULT_EXERCISE_FILE, ExerciseCatalog
+from app.utils.lru import LRUCache
+
+EQUIPMENT = ["dumbbells", "bench"]
+
+def test_lru_get_drops_invalid_entry_as_miss():
+    cache = LRUCache(maxsize=4)
+    cache.put("a", 1)
+    assert cache.get("a", valid=lambda value: value == 1) == 1
+    assert cache.get("a", "default", valid=lambda value: value == 2) == "default"
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_candidate_pool_is_cached_per_catalog():
+    candidate_pool_cache.clear()
+    exercises = ExerciseCatalog(DEFAULT_EXERCISE_FILE).exercises
+    pool = get_candidate_pool(exercises, EQUIPMENT, "intermediate")
+    assert get_candidate_pool(exercises, list(reversed(EQUIPMENT)), "intermediate") is pool
+    assert (candidate_pool_cache.hits, candidate_pool_cache.misses) == (1, 1)
+
+def test_candidate_pool_from_reloaded_catalog_counts_as_miss():
+    candidate_pool_cache.clear()
+    old = ExerciseCatalog(DEFAULT_EXERCISE_FILE).exercises
+    new = ExerciseCatalog(DEFAULT_EXERCISE_FILE).exercises
+    old_pool = get_candidate_pool(old, EQUIPMENT, "beginner")
+    new_pool = get_candidate_pool(new, EQUIPMENT, "beginner")
+    assert new_pool is not old_pool
+    assert candidate_pool_cache.stats()["hits"] == 0
+    assert candidate_pool_cache.stats()["misses"] == 2
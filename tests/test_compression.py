@@ -0,0 +1,111 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from app.engine.payloads import compact_plan, format_payload, normalize_plan
+from app.models.models import UserProfile
+from app.utils import workout_generator as generator
+from app.utils.compression import CONTENT_CODINGS, StreamCompressor, choose_encoding, compress, weak_etag
+
+PROFILE = {
+    "name": "Squeezed", "age": 27, "gender": "male", "goal": "muscle_gain", "experience": "advanced",
+    "equipment": ["dumbbells", "bench"], "days_per_week": 4, "seed": 8,
+}
+
+def test_choose_encoding():
+    preferred = CONTENT_CODINGS[0]
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("GZIP;q=0.5, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip;q=bad") is None
+    assert choose_encoding("*") == preferred
+    assert choose_encoding("*, gzip;q=0") == ("br" if preferred == "br" else None)
+    assert choose_encoding("br, gzip") == preferred
+
+def test_whole_and_streamed_gzip():
+    data = b'{"exercise": "squat"}\n' * 100
+    assert gzip.decompress(compress(data, "gzip")) == data
+
+    compressor = StreamCompressor("gzip")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    # Every chunk is flushed, so each line can be decoded as soon as it arrives
+    for line in data.splitlines(keepends=True)[:3]:
+        assert decompressor.decompress(compressor.compress(line)) == line
+    assert decompressor.decompress(compressor.finish()) == b""
+    assert weak_etag('"a"') == 'W/"a"' and weak_etag('W/"a"') == 'W/"a"'
+
+def test_payload_formats():
+    workout_plan = generator.generate_plan_json(UserProfile(**PROFILE), validate=False)
+    assert format_payload(workout_plan) is workout_plan
+
+    compact = format_payload(workout_plan, "compact")
+    for session in compact["sessions"]:
+        for exercises in session["sections"].values():
+            assert all(None not in exercise.values() for exercise in exercises)
+    assert compact == compact_plan(workout_plan)
+
+    normalized = normalize_plan(workout_plan)
+    assert len(normalized["exercises"]) == len({json.dumps(e, sort_keys=True) for e in normalized["exercises"]})
+    rebuilt = [
+        dict(session, sections={
+            name: [normalized["exercises"][index] for index in indexes]
+            for name, indexes in session["sections"].items()
+        })
+        for session in normalized["sessions"]
+    ]
+    assert rebuilt == compact["sessions"]
+    assert {key: value for key, value in normalized.items() if key not in ("exercises", "sessions")} == \
+        {key: value for key, value in workout_plan.items() if key != "sessions"}
+
+def test_fastapi_compresses_json(fastapi_client):
+    response = fastapi_client.post("/generate-workout-plan", json=PROFILE, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()["client_name"] == PROFILE["name"]
+
+    plain = fastapi_client.post("/generate-workout-plan", json=PROFILE, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+
+def test_fastapi_skips_small_bodies_and_pdfs(fastapi_client):
+    headers = {"Accept-Encoding": "gzip"}
+    assert "content-encoding" not in fastapi_client.get("/plans/unknown", headers=headers).headers
+    pdf = fastapi_client.post("/generate-workout-pdf", json=PROFILE, headers=headers)
+    assert "content-encoding" not in pdf.headers
+    assert pdf.content.startswith(b"%PDF")
+
+def test_fastapi_compressed_etag_is_weak(fastapi_client):
+    response = fastapi_client.post("/export-workout-json", json=PROFILE, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    not_modified = fastapi_client.post("/export-workout-json", json=PROFILE,
+                                       headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+def test_fastapi_compresses_streams(fastapi_client):
+    response = fastapi_client.post("/generate-workout-plan/stream", json=PROFILE, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1 + len(generator.generate_plan_json(UserProfile(**PROFILE), validate=False)["sessions"])
+
+def test_flask_compresses_json(flask_client):
+    response = flask_client.post("/generate-workout-plan?format=compact", json=PROFILE, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    workout_plan = json.loads(gzip.decompress(response.get_data()))
+    assert workout_plan["client_name"] == PROFILE["name"]
+
+    small = flask_client.get("/plans/unknown", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+@pytest.mark.parametrize("path", ["/generate-workout-plan", "/export-workout-json"])
+def test_unknown_payload_format(fastapi_client, flask_client, path):
+    assert fastapi_client.post(path + "?format=xml", json=PROFILE).status_code == 422
+    assert flask_client.post(path + "?format=xml", json=PROFILE).status_code == 400
@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+from app.utils.export_jobs import ExportJobQueue, QueueFull, export_jobs
+
+PROFILE = {
+    "name": "Queued", "age": 38, "gender": "male", "goal": "muscle_gain", "experience": "intermediate",
+    "equipment": ["dumbbells", "bench"], "days_per_week": 3, "seed": 17,
+}
+
+def make_plan(name):
+    return {"plan_id": name, "seed": 1, "client_name": name, "goal": "strength", "experience": "beginner", "sessions": []}
+
+def wait_for(job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while job.pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return job
+
+@pytest.fixture
+def job_queue():
+    job_queue = ExportJobQueue("test_jobs", max_workers=1, max_queue=1, history=8)
+    yield job_queue
+    job_queue.shutdown()
+
+def test_queue_full_rejects_and_jobs_finish(job_queue):
+    job = job_queue.submit(make_plan("First Queue Test"))
+    # The worker process is still starting, so the only queue slot is taken
+    with pytest.raises(QueueFull):
+        job_queue.submit(make_plan("Second Queue Test"))
+    # The same export joins the pending job instead of taking another slot
+    assert job_queue.submit(make_plan("First Queue Test")) is job
+
+    assert wait_for(job).status == "done"
+    assert job.path is not None or job.content.startswith(b"%PDF")
+    assert job.queue_seconds is not None and job.run_seconds >= 0
+    stats = job_queue.stats()
+    assert stats["in_flight"] == 0 and stats["completed"] == 1 and stats["rejected"] == 1
+    assert job_queue.get(job.job_id) is job
+
+def test_fastapi_job_queue_full(fastapi_client, monkeypatch):
+    monkeypatch.setattr(export_jobs, "max_queue", 0)
+    response = fastapi_client.post("/generate-workout-pdf/jobs", json=dict(PROFILE, seed=18))
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+def test_flask_job_queue_full(flask_client, monkeypatch):
+    monkeypatch.setattr(export_jobs, "max_queue", 0)
+    response = flask_client.post("/generate-workout-pdf/jobs", json=dict(PROFILE, seed=19))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+
+def test_fastapi_job_round_trip(fastapi_client):
+    submitted = fastapi_client.post("/generate-workout-pdf/jobs", json=PROFILE)
+    assert submitted.status_code in (200, 202)
+    status_url = submitted.json()["status_url"]
+
+    deadline = time.monotonic() + 60
+    response = fastapi_client.get(status_url)
+    while response.status_code == 202 and time.monotonic() < deadline:
+        assert response.json()["status"] in ("queued", "running")
+        time.sleep(0.05)
+        response = fastapi_client.get(status_url)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert "render;dur=" in response.headers["server-timing"]
+    assert fastapi_client.get(status_url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+    # A repeated export is answered from the finished job
+    assert fastapi_client.post("/generate-workout-pdf/jobs", json=PROFILE).status_code == 200
+    assert fastapi_client.get("/generate-workout-pdf/jobs/unknown").status_code == 404
+    export_jobs.shutdown()
+
+def test_resubmit_after_eviction_requeues(job_queue):
+    from app.utils.artifact_cache import artifact_cache
+    workout_plan = make_plan("Evicted Queue Test")
+    job = wait_for(job_queue.submit(workout_plan))
+    assert job.status == "done" and job.content is None
+    assert job_queue.submit(workout_plan) is job
+
+    os.unlink(artifact_cache.path(job.job_id, "pdf"))
+    requeued = job_queue.submit(workout_plan)
+    assert requeued is not job
+    assert wait_for(requeued).status == "done"
+    assert artifact_cache.get(requeued.job_id, "pdf") is not None
+    assert job_queue.get(job.job_id) is requeued
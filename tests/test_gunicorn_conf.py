@@ -0,0 +1,48 @@
+import os
+import runpy
+
+import pytest
+
+from conftest import ROOT
+
+CONFIG = os.path.join(ROOT, "gunicorn.conf.py")
+
+def load_config(monkeypatch, **env):
+    for name in ("WORKOUT_WORKER_CLASS", "WORKOUT_APP", "WORKOUT_THREADS", "WORKOUT_MAX_REQUESTS", "WORKOUT_PRELOAD"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+def test_default_serves_flask_with_gthread(monkeypatch):
+    config = load_config(monkeypatch)
+    assert config["worker_class"] == "gthread"
+    assert config["wsgi_app"] == "wsgi:app"
+    assert config["threads"] == 4
+    assert config["preload_app"] is True
+    assert config["max_requests_jitter"] == 0
+
+def test_uvicorn_worker_serves_fastapi(monkeypatch):
+    config = load_config(monkeypatch, WORKOUT_WORKER_CLASS="uvicorn")
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert config["wsgi_app"] == "app.main:app"
+    assert config["threads"] == 1
+    # The worker class and its app must import on a clean install of requirements.txt
+    module, _, name = config["worker_class"].rpartition(".")
+    assert hasattr(pytest.importorskip(module), name)
+
+def test_env_settings(monkeypatch):
+    config = load_config(monkeypatch, WORKOUT_WORKER_CLASS="sync", WORKOUT_MAX_REQUESTS="1000", WORKOUT_PRELOAD="no")
+    assert config["threads"] == 1
+    assert config["max_requests"] == 1000
+    assert config["max_requests_jitter"] == 50
+    assert config["preload_app"] is False
+
+def test_unknown_worker_class_fails(monkeypatch):
+    with pytest.raises(ValueError):
+        load_config(monkeypatch, WORKOUT_WORKER_CLASS="eventlet")
+
+def test_requirements_cover_the_uvicorn_worker():
+    with open(os.path.join(ROOT, "requirements.txt")) as f:
+        requirements = {line.split("==")[0].strip().lower() for line in f if line.strip()}
+    assert {"fastapi", "uvicorn", "pydantic", "gunicorn"} <= requirements
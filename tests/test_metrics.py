@@ -0,0 +1,48 @@
+from app.utils.metrics import CONTENT_TYPE, Counter, Histogram, format_labels, stage_timer
+
+PROFILE = {
+    "name": "Metrics", "age": 33, "gender": "other", "goal": "weight_loss", "experience": "beginner",
+    "equipment": [], "days_per_week": 2, "seed": 12,
+}
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "a")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+    assert 'test_seconds_sum{stage="a"} 5.55' in lines
+
+def test_counter_and_label_escaping():
+    counter = Counter("test_total", "Test", ("name",))
+    counter.inc('say "hi"\n')
+    counter.inc('say "hi"\n', amount=2)
+    assert counter.render()[-1] == 'test_total{name="say \\"hi\\"\\n"} 3'
+    assert format_labels((), ()) == ""
+
+def test_stage_timer_records_a_stage():
+    with stage_timer("test_stage"):
+        pass
+    from app.utils.metrics import render_metrics
+    assert 'workout_stage_duration_seconds_count{stage="test_stage"} 1' in render_metrics()
+
+def test_fastapi_metrics_label_routes_by_template(fastapi_client):
+    assert fastapi_client.post("/generate-workout-plan", json=PROFILE).status_code == 200
+    assert fastapi_client.get("/plans/does-not-exist").status_code == 404
+    response = fastapi_client.get("/metrics")
+    assert response.headers["content-type"] == CONTENT_TYPE
+    text = response.text
+    assert 'workout_requests_total{endpoint="/generate-workout-plan",method="POST",status="200"}' in text
+    assert 'workout_requests_total{endpoint="/plans/{plan_id}",method="GET",status="404"}' in text
+    assert 'workout_stage_duration_seconds_count{stage="sessions"}' in text
+    assert 'workout_cache_hits_total{cache="plan"}' in text
+
+def test_flask_metrics_label_routes_by_template(flask_client):
+    assert flask_client.post("/generate-workout-plan", json=PROFILE).status_code == 200
+    assert flask_client.get("/plans/does-not-exist").status_code == 404
+    text = flask_client.get("/metrics").get_data(as_text=True)
+    assert 'workout_requests_total{endpoint="/generate-workout-plan",method="POST",status="200"}' in text
+    assert 'workout_requests_total{endpoint="/plans/<plan_id>",method="GET",status="404"}' in text
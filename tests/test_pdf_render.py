@@ -0,0 +1,59 @@
+import io
+import zlib
+
+import pytest
+
+from app.engine.exports import generate_pdf
+from app.engine.pdf_render import pdf_string, pdf_text_string, text_width, win_ansi
+from app.models.models import UserProfile
+from app.utils import workout_generator as generator
+
+NAME = "Zoë Ångström – “test” 日本"
+
+def make_plan(name=NAME, days_per_week=4):
+    profile = UserProfile(name=name, age=35, gender="female", goal="strength", experience="advanced",
+                          equipment=["barbell", "bench"], days_per_week=days_per_week, seed=3)
+    return generator.generate_plan_json(profile, validate=False)
+
+def test_win_ansi_maps_cp1252_punctuation():
+    assert win_ansi("– — ‘’ “” • … €") == "\x96 \x97 \x91\x92 \x93\x94 \x95 \x85 \x80"
+    assert win_ansi("Zoë Ångström") == "Zoë Ångström"
+    # Characters outside WinAnsiEncoding still fall back to "?"
+    assert win_ansi("日本") == "??"
+
+def test_pdf_string_escapes_and_maps():
+    assert pdf_string("a (b) \\ – c") == "(a \\(b\\) \\\\ \x96 c)"
+    assert text_width("–", "regular", 10) == text_width("\x96", "regular", 10) > 0
+
+def test_metadata_title_keeps_any_script():
+    assert pdf_text_string("Plan") == b"(Plan)"
+    title = pdf_text_string(NAME)
+    assert title.startswith(b"<FEFF")
+    assert bytes.fromhex(title[5:-1].decode()).decode("utf-16-be") == NAME
+
+def page_streams(content):
+    streams = []
+    for chunk in content.split(b">>\nstream\n")[1:]:
+        streams.append(zlib.decompress(chunk.split(b"\nendstream")[0]))
+    return streams
+
+@pytest.mark.parametrize("layout", ["standard", "compact"])
+def test_pdf_output(layout):
+    content = generate_pdf(make_plan(), layout)
+    assert content.startswith(b"%PDF-1.4\n")
+    assert content.endswith(b"%%EOF\n")
+    streams = page_streams(content)
+    assert streams
+    assert b"Zo\xeb \xc5ngstr\xf6m \x96 \x93test\x94 ??" in streams[0]
+
+def test_compact_layout_uses_fewer_pages():
+    workout_plan = make_plan(name="Pages", days_per_week=5)
+    standard = generate_pdf(workout_plan, "standard")
+    compact = generate_pdf(workout_plan, "compact")
+    assert len(page_streams(compact)) < len(page_streams(standard))
+
+def test_pdf_parses_strictly():
+    pypdf = pytest.importorskip("pypdf")
+    reader = pypdf.PdfReader(io.BytesIO(generate_pdf(make_plan())), strict=True)
+    assert "Zoë Ångström – “test”" in reader.pages[0].extract_text()
+    assert reader.metadata.title == f"Workout Plan for {NAME}"
@@ -0,0 +1,123 @@
+import os
+
+from app.utils import workout_generator as generator
+from app.utils.plan_store import PlanStore, plan_store
+
+PROFILE = {
+    "name": "Stored", "age": 52, "gender": "male", "goal": "flexibility", "experience": "beginner",
+    "equipment": ["dumbbells"], "days_per_week": 3, "seed": 31,
+}
+
+def make_store(path):
+    return PlanStore(str(path), batch_size=16, queue_size=64, linger_seconds=0.001)
+
+def plan(plan_id, client_name="Ann"):
+    return {"plan_id": plan_id, "client_name": client_name, "sessions": [{"session": 1}]}
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "plans.sqlite3"
+    store = make_store(path)
+    store.put("full", plan("a"))
+    store.put("full", plan("b", "Bob"))
+    store.put("sparse", plan("a"))
+    # Queued plans are readable before they are committed
+    assert store.get("full", "a") == plan("a")
+    store.close()
+
+    # Another process sees the committed plans
+    other = make_store(path)
+    assert other.get("full", "b") == plan("b", "Bob")
+    assert other.get("full", "missing") is None
+    assert [row["plan_id"] for row in other.find("full")] == ["b", "a"]
+    assert [row["plan_id"] for row in other.find("full", client_name="Ann")] == ["a"]
+    assert len(other.find("full", limit=1)) == 1
+
+    stats = store.stats()
+    assert stats["size"] == 3
+    assert stats["writes"] == 3 and stats["pending"] == 0 and stats["errors"] == 0
+    assert other.stats()["hits"] == 1 and other.stats()["misses"] == 1
+
+def test_rewrite_replaces_plan(tmp_path):
+    store = make_store(tmp_path / "plans.sqlite3")
+    store.put("full", plan("a"))
+    store.put("full", dict(plan("a"), sessions=[]))
+    store.close()
+    assert store.get("full", "a")["sessions"] == []
+    assert store.stats()["size"] == 1
+
+def test_disabled_store(tmp_path):
+    store = PlanStore("", batch_size=16, queue_size=64, linger_seconds=0.001)
+    store.put("full", plan("a"))
+    assert store.get("full", "a") is None
+    assert store.find("full") == []
+    assert store.stats()["size"] == 0
+    assert not os.listdir(tmp_path)
+
+def forget_plans(engine):
+    """Drop an engine's in-process plans, so lookups must go to the store."""
+    plan_store.close()
+    engine.plan_cache.clear()
+    engine.plans.clear()
+
+def test_fastapi_serves_stored_plans(fastapi_client):
+    workout_plan = fastapi_client.post("/generate-workout-plan", json=PROFILE).json()
+    forget_plans(generator.engine)
+    hits = plan_store.hits
+
+    response = fastapi_client.get(f"/plans/{workout_plan['plan_id']}")
+    assert response.status_code == 200
+    assert response.json() == workout_plan
+    assert plan_store.hits == hits + 1
+    listed = fastapi_client.get("/plans", params={"client_name": PROFILE["name"]}).json()["plans"]
+    assert workout_plan["plan_id"] in [row["plan_id"] for row in listed]
+    pdf = fastapi_client.get(f"/plans/{workout_plan['plan_id']}/pdf")
+    assert pdf.status_code == 200 and pdf.content.startswith(b"%PDF")
+
+    assert fastapi_client.get("/plans/unknown").status_code == 404
+    assert fastapi_client.get("/plans/unknown/pdf").status_code == 404
+
+def test_flask_serves_stored_plans(flask_app, flask_client):
+    workout_plan = flask_client.post("/generate-workout-plan", json=PROFILE).get_json()
+    forget_plans(flask_app.engine)
+
+    response = flask_client.get(f"/plans/{workout_plan['plan_id']}")
+    assert response.status_code == 200
+    assert response.get_json() == workout_plan
+    assert flask_client.get("/plans/unknown").status_code == 404
+
+def test_registered_plans_are_rebuilt_in_another_process(tmp_path):
+    from app.engine.formats import FULL_FORMAT
+    from app.engine.planner import PlanEngine
+    from app.utils.lru import LRUCache
+
+    path = tmp_path / "plans.sqlite3"
+    lazy_plan = PlanEngine(FULL_FORMAT, LRUCache(), store=make_store(path)).plan(dict(PROFILE, weeks=8))
+    lazy_plan.engine.store.close()
+
+    # A second engine on its own store connection stands in for another worker process
+    other = PlanEngine(FULL_FORMAT, LRUCache(), store=make_store(path))
+    rebuilt = other.get_plan(lazy_plan.plan_id)
+    assert rebuilt.plan_id == lazy_plan.plan_id
+    assert (rebuilt.seed, rebuilt.start_date, rebuilt.weeks) == (lazy_plan.seed, lazy_plan.start_date, 8)
+    assert rebuilt.week(7) == lazy_plan.week(7)
+    assert other.load_plan(lazy_plan.plan_id)["sessions"] == lazy_plan.sessions()
+    assert other.get_plan("unknown") is None
+    # Only the generated plan is listed and counted, not the header
+    other.store.close()
+    assert [row["plan_id"] for row in other.find_plans()] == [lazy_plan.plan_id]
+    assert other.store.stats()["size"] == 1
+
+def test_flask_registered_plan_weeks_from_fastapi(flask_client, fastapi_client):
+    header = flask_client.post("/plans", json=dict(PROFILE, weeks=6)).get_json()
+    plan_store.close()
+    response = fastapi_client.get(f"/plans/{header['plan_id']}/weeks/6")
+    assert response.status_code == 200
+    assert response.json()["weeks"] == 6
+    assert len(response.json()["sessions"]) == PROFILE["days_per_week"]
+
+def test_fastapi_registered_plan_weeks_from_flask(fastapi_client, flask_app, flask_client):
+    header = fastapi_client.post("/plans", json=dict(PROFILE, weeks=5, seed=32)).json()
+    forget_plans(generator.engine)
+    response = flask_client.get(f"/plans/{header['plan_id']}/weeks/5")
+    assert response.status_code == 200
+    assert response.get_json()["week"] == 5
@@ -0,0 +1,64 @@
+import pytest
+
+from app.models.models import UserProfile, WorkoutPlan
+from app.utils import workout_generator as generator
+
+def make_profile(seed=42, **fields):
+    values = dict(name="Seeded", age=28, gender="female", goal="muscle_gain", experience="intermediate",
+                  equipment=["dumbbells", "bench"], days_per_week=3, seed=seed)
+    values.update(fields)
+    return UserProfile(**values)
+
+def test_same_seed_gives_same_plan():
+    generator.plan_cache.clear()
+    first = generator.generate_plan_json(make_profile(), validate=False)
+    generator.plan_cache.clear()
+    second = generator.generate_plan_json(make_profile(), validate=False)
+    assert first["plan_id"] == second["plan_id"]
+    assert first["seed"] == 42
+    assert first["sessions"] == second["sessions"]
+
+def test_different_seeds_give_different_plans():
+    first = generator.generate_plan_json(make_profile(seed=1), validate=False)
+    second = generator.generate_plan_json(make_profile(seed=2), validate=False)
+    assert first["plan_id"] != second["plan_id"]
+    assert first["sessions"] != second["sessions"]
+
+def test_seeded_plan_is_cached_by_plan_id():
+    generator.plan_cache.clear()
+    first = generator.generate_plan_json(make_profile(seed=5), validate=False)
+    assert generator.generate_plan_json(make_profile(seed=5), validate=False) is first
+
+def test_unseeded_plan_returns_its_seed():
+    workout_plan = generator.generate_plan_json(make_profile(seed=None), validate=False)
+    generator.plan_cache.clear()
+    again = generator.generate_plan_json(make_profile(seed=workout_plan["seed"]), validate=False)
+    assert again["sessions"] == workout_plan["sessions"]
+
+def test_every_producer_sets_plan_id_and_seed():
+    # WorkoutPlan requires both, so each producer's output must validate
+    plans = [
+        generator.generate_plan_json(make_profile(seed=9), validate=True),
+        generator.generate_plan_json(make_profile(seed=9, weeks=12), validate=True),
+    ]
+    try:
+        from app.engine.vector_engine import VectorEngine
+        plans.append(VectorEngine(generator.engine).generate_plan(make_profile(seed=9), validate=True))
+    except ImportError:
+        pass
+    for workout_plan in plans:
+        validated = WorkoutPlan(**workout_plan)
+        assert validated.plan_id == workout_plan["plan_id"]
+        assert validated.seed == 9
+
+def test_workout_plan_rejects_plans_without_identity():
+    workout_plan = dict(generator.generate_plan_json(make_profile(), validate=False))
+    del workout_plan["plan_id"]
+    with pytest.raises(ValueError):
+        WorkoutPlan(**workout_plan)
+
+def test_exercise_object_matches_plan_entries():
+    record = generator.load_exercises()[0]
+    for week in (1, 3):
+        exercise = generator.create_exercise_object(record, 5, week, "strength")
+        assert exercise.model_dump() == generator.create_exercise_dict(record, 5, week, "strength")
@@ -0,0 +1,50 @@
+import pytest
+
+from app.utils.executors import TaskPool
+
+PROFILE = {
+    "name": "Errors", "age": 29, "gender": "female", "goal": "strength", "experience": "intermediate",
+    "equipment": ["barbell"], "days_per_week": 3, "seed": 21,
+}
+
+BAD_PROFILES = [dict(PROFILE, weeks=99), dict(PROFILE, days_per_week="three")]
+
+@pytest.mark.parametrize("path", [
+    "/generate-workout-plan", "/generate-workout-pdf", "/generate-workout-pdf/jobs", "/export-workout-json",
+])
+@pytest.mark.parametrize("profile", BAD_PROFILES)
+def test_flask_rejects_unplannable_profiles(flask_client, path, profile):
+    response = flask_client.post(path, json=profile)
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+@pytest.mark.parametrize("profile", BAD_PROFILES)
+def test_flask_batch_rejects_unplannable_profiles(flask_client, profile):
+    response = flask_client.post("/generate-workout-plans/batch", json=[PROFILE, profile])
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("profile", BAD_PROFILES)
+def test_fastapi_rejects_unplannable_profiles(fastapi_client, profile):
+    assert fastapi_client.post("/generate-workout-plan", json=profile).status_code in (400, 422)
+
+def test_fastapi_plan_week(fastapi_client):
+    header = fastapi_client.post("/plans", json=dict(PROFILE, weeks=4)).json()
+    response = fastapi_client.get(f"/plans/{header['plan_id']}/weeks/2")
+    assert response.status_code == 200
+    week = response.json()
+    assert week["week"] == 2 and week["weeks"] == 4
+    assert len(week["sessions"]) == PROFILE["days_per_week"]
+    assert fastapi_client.get(f"/plans/{header['plan_id']}/weeks/5").status_code == 404
+
+def test_fastapi_plan_week_on_process_pool(fastapi_client, monkeypatch):
+    # WORKOUT_JSON_POOL=process: the week is rebuilt in the worker from plain values
+    process_pool = TaskPool("json_test", kind="process", max_workers=1)
+    monkeypatch.setattr("app.routers.workout.json_pool", process_pool)
+    try:
+        header = fastapi_client.post("/plans", json=dict(PROFILE, weeks=4, seed=22)).json()
+        response = fastapi_client.get(f"/plans/{header['plan_id']}/weeks/2")
+    finally:
+        process_pool.shutdown()
+    assert response.status_code == 200
+    monkeypatch.undo()
+    assert fastapi_client.get(f"/plans/{header['plan_id']}/weeks/2").json() == response.json()
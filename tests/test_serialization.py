@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from app.models.models import WorkoutPlan
+from app.utils import workout_generator as generator
+from app.utils.serialization import decode_json, encode_json
+
+PROFILE = {
+    "name": "Stream", "age": 40, "gender": "male", "goal": "endurance", "experience": "advanced",
+    "equipment": ["dumbbells"], "days_per_week": 4,
+}
+
+def ndjson_lines(body: bytes):
+    """Every line of an NDJSON body, decoded; the body must end with a newline."""
+    assert body.endswith(b"\n")
+    return [json.loads(line) for line in body.split(b"\n")[:-1]]
+
+def test_validation_mode_is_on_in_tests():
+    assert generator.engine.validate
+    assert generator.engine.validator is WorkoutPlan
+
+def test_validation_mode_rejects_invalid_plans(monkeypatch):
+    def broken_session(session_number, session_date, sections):
+        return {"session": session_number, "date": "not a date", "sections": sections}
+
+    monkeypatch.setattr(generator.engine.plan_format, "session", broken_session)
+    with pytest.raises(ValueError):
+        generator.generate_plan_json(dict(PROFILE, seed=1001))
+    # The fast path itself does not validate
+    generator.generate_plan_json(dict(PROFILE, seed=1002), validate=False)
+
+def test_plan_json_round_trips():
+    workout_plan = generator.generate_plan_json(dict(PROFILE, seed=3))
+    decoded = decode_json(encode_json(workout_plan))
+    assert decoded["plan_id"] == workout_plan["plan_id"]
+    assert decoded["goal"] == "endurance"
+    WorkoutPlan(**decoded)
+
+def test_fastapi_plan_stream_is_header_then_sessions(fastapi_client):
+    response = fastapi_client.post("/generate-workout-plan/stream", json=dict(PROFILE, seed=4))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = ndjson_lines(response.content)
+    assert set(lines[0]) == {"plan_id", "seed", "client_name", "goal", "experience"}
+    assert [line["session"] for line in lines[1:]] == list(range(1, 17))
+
+def test_fastapi_batch_stream_has_one_plan_per_line(fastapi_client):
+    profiles = [dict(PROFILE, seed=seed) for seed in range(5)]
+    response = fastapi_client.post("/generate-workout-plans/batch/stream", json=profiles)
+    lines = ndjson_lines(response.content)
+    assert [line["seed"] for line in lines] == list(range(5))
+    for line in lines:
+        WorkoutPlan(**line)
+
+def test_flask_batch_stream_reports_failures_in_band(flask_client):
+    # weeks passes the up-front field check but fails generation, after the stream has started
+    profiles = [dict(PROFILE, seed=6), dict(PROFILE, weeks=99), dict(PROFILE, seed=7)]
+    response = flask_client.post("/generate-workout-plans/batch/stream", json=profiles)
+    assert response.status_code == 200
+    lines = ndjson_lines(response.get_data())
+    assert lines[0]["seed"] == 6
+    assert "weeks" in lines[1]["error"]
+    assert len(lines) == 2
+
+def test_flask_plan_stream_is_header_then_sessions(flask_client):
+    response = flask_client.post("/generate-workout-plan/stream", json=dict(PROFILE, seed=8))
+    lines = ndjson_lines(response.get_data())
+    assert lines[0]["seed"] == 8
+    assert len(lines) == 1 + 16
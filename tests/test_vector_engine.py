@@ -0,0 +1,78 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.engine.formats import SPARSE_FORMAT
+from app.engine.planner import PlanEngine
+from app.engine.vector_engine import VectorEngine, get_vector_catalog, smallest_keys
+from app.models.models import UserProfile, WorkoutPlan
+from app.utils import workout_generator as generator
+from app.utils.candidate_pool import get_candidate_pool
+from app.utils.lru import LRUCache
+
+def make_profile(days_per_week=3, experience="intermediate", seed=7, **fields):
+    return UserProfile(
+        name="Vector", age=30, gender="other", goal="strength", experience=experience,
+        equipment=["dumbbells", "bench"], days_per_week=days_per_week, seed=seed, **fields
+    )
+
+def test_plans_validate_as_workout_plan():
+    vector_engine = VectorEngine(generator.engine)
+    profiles = [make_profile(days, level, seed=days) for days in range(1, 8) for level in ("beginner", "advanced")]
+    for workout_plan in vector_engine.generate_plans(profiles, validate=False):
+        WorkoutPlan(**workout_plan)
+
+def test_plans_follow_the_schedule_of_the_plan_engine():
+    profile = make_profile(4, "advanced", weeks=6)
+    vector_plan = VectorEngine(generator.engine).generate_plan(profile, validate=True)
+    engine_plan = generator.generate_plan_json(profile, validate=False)
+    assert len(vector_plan["sessions"]) == len(engine_plan["sessions"]) == 24
+    for vector_session, engine_session in zip(vector_plan["sessions"], engine_plan["sessions"]):
+        assert vector_session["date"] == engine_session["date"]
+        for section in ("warmup", "main", "cooldown", "circuit"):
+            assert len(vector_session["sections"][section] or []) == len(engine_session["sections"][section] or [])
+
+def test_seed_reproduces_plan_whatever_the_batch():
+    vector_engine = VectorEngine(generator.engine)
+    alone = vector_engine.generate_plan(make_profile(seed=11))
+    batched = vector_engine.generate_plans([make_profile(seed=3), make_profile(seed=11), make_profile(seed=5)])[1]
+    assert batched == alone
+    assert alone["seed"] == 11
+    # Same seed, different draws than the PlanEngine: the plan has an ID of its own
+    assert alone["plan_id"] != generator.generate_plan_json(make_profile(seed=11), validate=False)["plan_id"]
+
+def test_unseeded_profiles_get_a_seed():
+    workout_plan = VectorEngine(generator.engine).generate_plan(make_profile(seed=None))
+    assert isinstance(workout_plan["seed"], int)
+    WorkoutPlan(**workout_plan)
+
+def test_pools_use_the_engine_free_equipment():
+    exercises = [
+        {"name": f"{equipment} {exercise_type} {muscle_group}", "type": exercise_type, "muscle_group": muscle_group,
+         "equipment": equipment, "level": "beginner", "sets": 3, "reps": 10}
+        for equipment in ("bodyweight", "none", "dumbbells", "barbell")
+        for exercise_type in ("main", "warmup", "cooldown")
+        for muscle_group in ("chest", "legs", "core")
+    ]
+    free_equipment = ("bodyweight", "none")
+    vector_catalog = get_vector_catalog(exercises)
+    pools = vector_catalog.pools(["dumbbells"], "beginner", free_equipment)
+    pool = get_candidate_pool(exercises, ["dumbbells"], "beginner", free_equipment)
+    for group in ("chest", "legs", "core", "warmup", "cooldown"):
+        names = sorted(vector_catalog.exercises[i]["name"] for i in pools[group])
+        assert names == sorted(ex["name"] for ex in getattr(pool, group))
+        assert any(name.startswith("none ") for name in names)
+
+def test_sparse_engine_plans_have_no_null_fields():
+    engine = PlanEngine(SPARSE_FORMAT, LRUCache(maxsize=0), ("bodyweight", "none"))
+    workout_plan = VectorEngine(engine).generate_plan(make_profile(5, "advanced"))
+    for session in workout_plan["sessions"]:
+        for exercises in session["sections"].values():
+            assert all(None not in exercise.values() for exercise in exercises)
+
+def test_smallest_keys_draws_distinct_columns_in_key_order():
+    keys = np.random.default_rng(0).random((50, 20))
+    picked = smallest_keys(keys, 5)
+    assert picked.shape == (50, 5)
+    assert (np.sort(keys, axis=1)[:, :5] == np.take_along_axis(keys, picked, axis=1)).all()
+    assert smallest_keys(keys, 40).shape == (50, 20)
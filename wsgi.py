@@ -0,0 +1,12 @@
+import importlib.util
+import os
+
+# app.py is shadowed by the app/ package, so load it from its file path
+spec = importlib.util.spec_from_file_location(
+    "workout_flask_app", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+)
+flask_app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(flask_app)
+
+# WSGI entry point for gunicorn's sync and gthread workers
+app = flask_app.app